@@ -137,6 +137,10 @@ contract FtmStrategy is BaseStrategy {
                 //pop shortens array by 1 thereby deleting the last index
                 lenders.pop();
 
+                //the target split may point at the removed lender
+                delete targetAllocation;
+                delete lenderGasCosts[a];
+
                 //if balance to spend we might as well put it into the best lender
                 if (want.balanceOf(address(this)) > 0) {
                     adjustPosition(0);
@@ -267,6 +271,21 @@ contract FtmStrategy is BaseStrategy {
             uint256 _highest,
             uint256 _potential
         )
+    {
+        (_lowest, _lowestApr, , _highest, _potential) = _estimateAdjustPosition();
+    }
+
+    //same as estimateAdjustPosition and also returns the nav of the lowest lender so callers dont ask for it again
+    function _estimateAdjustPosition()
+        internal
+        view
+        returns (
+            uint256 _lowest,
+            uint256 _lowestApr,
+            uint256 _lowestNav,
+            uint256 _highest,
+            uint256 _potential
+        )
     {
         //all loose assets are to be invested
         uint256 looseAssets = want.balanceOf(address(this));
@@ -274,37 +293,41 @@ contract FtmStrategy is BaseStrategy {
         // our simple algo
         // get the lowest apr strat
         // cycle through and see who could take its funds plus want for the highest apr
+        // both in one pass so every lender is loaded from storage once
         _lowestApr = uint256(-1);
         _lowest = 0;
-        uint256 lowestNav = 0;
-        for (uint256 i = 0; i < lenders.length; i++) {
-            if (lenders[i].hasAssets()) {
-                uint256 apr = lenders[i].apr();
+        uint256 highestApr = 0;
+        _highest = 0;
+        uint256 count = lenders.length;
+        for (uint256 i = 0; i < count; i++) {
+            IGenericLender lender = lenders[i];
+            if (lender.hasAssets()) {
+                uint256 apr = lender.apr();
                 if (apr < _lowestApr) {
                     _lowestApr = apr;
                     _lowest = i;
-                    lowestNav = lenders[i].nav();
                 }
             }
-        }
-
-        uint256 toAdd = lowestNav.add(looseAssets);
 
-        uint256 highestApr = 0;
-        _highest = 0;
-
-        for (uint256 i = 0; i < lenders.length; i++) {
-            uint256 apr;
-            apr = lenders[i].aprAfterDeposit(looseAssets);
-
-            if (apr > highestApr) {
-                highestApr = apr;
+            uint256 aprAfter = lender.aprAfterDeposit(looseAssets);
+            if (aprAfter > highestApr) {
+                highestApr = aprAfter;
                 _highest = i;
             }
         }
 
+        //nav of the final pick only, not of every lender that was lowest along the way
+        if (_lowestApr != uint256(-1)) {
+            _lowestNav = lenders[_lowest].nav();
+        }
+
         //if we can improve apr by withdrawing we do so
-        _potential = lenders[_highest].aprAfterDeposit(toAdd);
+        //with nothing to move on top of the loose assets the answer is already known
+        if (_lowestNav == 0) {
+            _potential = highestApr;
+        } else {
+            _potential = lenders[_highest].aprAfterDeposit(_lowestNav.add(looseAssets));
+        }
     }
 
     //gives estiomate of future APR with a change of debt limit. Useful for governance to decide debt limits
@@ -412,6 +435,7 @@ contract FtmStrategy is BaseStrategy {
      * Key logic.
      *   The algorithm moves assets from lowest return to highest
      *   like a very slow idiots bubble sort
+     *   unless a target split has been set, then we move straight to it
      *   we ignore debt outstanding for an easy life
      */
     function adjustPosition(uint256 _debtOutstanding) internal override {
@@ -426,6 +450,11 @@ contract FtmStrategy is BaseStrategy {
             return;
         }
 
+        if (targetAllocation.length > 0) {
+            _rebalanceToTarget();
+            return;
+        }
+
         (uint256 lowest, uint256 lowestApr, uint256 highest, uint256 potential) = estimateAdjustPosition();
 
         if (potential > lowestApr) {
@@ -457,15 +486,8 @@ contract FtmStrategy is BaseStrategy {
         uint256 assets = want.balanceOf(address(this));
 
         for (uint256 i = 0; i < _newPositions.length; i++) {
-            bool found = false;
-
             //might be annoying and expensive to do this second loop but worth it for safety
-            for (uint256 j = 0; j < lenders.length; j++) {
-                if (address(lenders[j]) == _newPositions[i].lender) {
-                    found = true;
-                }
-            }
-            require(found, "NOT LENDER");
+            require(_isLender(_newPositions[i].lender), "NOT LENDER");
 
             share = share.add(_newPositions[i].share);
             uint256 toSend = assets.mul(_newPositions[i].share).div(1000);
@@ -476,6 +498,104 @@ contract FtmStrategy is BaseStrategy {
         require(share == 1000, "SHARE!=1000");
     }
 
+    //apr equalising split worked out off chain. see water_fill in scripts/allocation_model.py
+    lenderRatio[] public targetAllocation;
+
+    //share must add up to 1000. an empty array goes back to the default algorithm
+    function setTargetAllocation(lenderRatio[] memory _newPositions) external onlyAuthorized {
+        delete targetAllocation;
+        uint256 share = 0;
+
+        for (uint256 i = 0; i < _newPositions.length; i++) {
+            require(_isLender(_newPositions[i].lender), "NOT LENDER");
+            for (uint256 j = 0; j < i; j++) {
+                require(_newPositions[j].lender != _newPositions[i].lender, "DUPLICATE LENDER");
+            }
+            share = share.add(_newPositions[i].share);
+            targetAllocation.push(_newPositions[i]);
+        }
+
+        require(_newPositions.length == 0 || share == 1000, "SHARE!=1000");
+    }
+
+    function numTargets() public view returns (uint256) {
+        return targetAllocation.length;
+    }
+
+    function _isLender(address a) internal view returns (bool) {
+        for (uint256 i = 0; i < lenders.length; i++) {
+            if (address(lenders[i]) == a) {
+                return true;
+            }
+        }
+        return false;
+    }
+
+    //unlike manualAllocation only the difference between nav and target is moved
+    function _rebalanceToTarget() internal {
+        //every nav and share is read once. navs stay valid until we touch that lender
+        uint256[] memory navs = new uint256[](lenders.length);
+        uint256 total = want.balanceOf(address(this));
+        for (uint256 i = 0; i < lenders.length; i++) {
+            navs[i] = lenders[i].nav();
+            total = total.add(navs[i]);
+        }
+
+        lenderRatio[] memory targets = targetAllocation;
+        uint256[] memory shares = new uint256[](lenders.length);
+        uint256[] memory index = new uint256[](targets.length);
+        //setTargetAllocation lists every lender at most once
+        for (uint256 j = 0; j < targets.length; j++) {
+            for (uint256 i = 0; i < lenders.length; i++) {
+                if (address(lenders[i]) == targets[j].lender) {
+                    shares[i] = targets[j].share;
+                    index[j] = i;
+                    break;
+                }
+            }
+        }
+
+        //free up the excess first so there is want to top up the others
+        bool[] memory touched = new bool[](lenders.length);
+        for (uint256 i = 0; i < lenders.length; i++) {
+            uint256 target = total.mul(shares[i]).div(1000);
+            if (target == 0) {
+                if (lenders[i].hasAssets()) {
+                    lenders[i].withdrawAll();
+                    touched[i] = true;
+                }
+            } else if (navs[i] > target.add(withdrawalThreshold)) {
+                //dont bother moving dust
+                lenders[i].withdraw(navs[i] - target);
+                touched[i] = true;
+            }
+        }
+
+        uint256 largest = 0;
+        for (uint256 j = 0; j < targets.length; j++) {
+            if (targets[j].share > targets[largest].share) {
+                largest = j;
+            }
+
+            uint256 i = index[j];
+            uint256 target = total.mul(targets[j].share).div(1000);
+            uint256 nav = touched[i] ? lenders[i].nav() : navs[i];
+            uint256 bal = want.balanceOf(address(this));
+            if (target > nav && bal > 0) {
+                want.safeTransfer(targets[j].lender, Math.min(target - nav, bal));
+                lenders[i].deposit();
+            }
+        }
+
+        //rounding leftovers go to the biggest position
+        uint256 leftover = want.balanceOf(address(this));
+        if (leftover > 0) {
+            address lender = targets[largest].lender;
+            want.safeTransfer(lender, leftover);
+            IGenericLender(lender).deposit();
+        }
+    }
+
     //cycle through withdrawing from worst rate first
     function _withdrawSome(uint256 _amount) internal returns (uint256 amountWithdrawn) {
         if (lenders.length == 0) {
@@ -487,31 +607,32 @@ contract FtmStrategy is BaseStrategy {
             return 0;
         }
 
-        amountWithdrawn = 0;
-        //most situations this will only run once. Only big withdrawals will be a gas guzzler
-        uint256 j = 0;
-        while (amountWithdrawn < _amount) {
-            uint256 lowestApr = uint256(-1);
-            uint256 lowest = 0;
-            for (uint256 i = 0; i < lenders.length; i++) {
-                if (lenders[i].hasAssets()) {
-                    uint256 apr = lenders[i].apr();
-                    if (apr < lowestApr) {
-                        lowestApr = apr;
-                        lowest = i;
-                    }
+        //read every apr once, then drain lowest apr first
+        //a big withdrawal costs one pass over the lenders instead of one per lender touched
+        IGenericLender[] memory queue = new IGenericLender[](lenders.length);
+        uint256[] memory aprs = new uint256[](lenders.length);
+        uint256 count = 0;
+        for (uint256 i = 0; i < lenders.length; i++) {
+            if (lenders[i].hasAssets()) {
+                uint256 apr = lenders[i].apr();
+
+                //insertion sort, equal aprs keep lender order
+                uint256 j = count;
+                while (j > 0 && aprs[j - 1] > apr) {
+                    aprs[j] = aprs[j - 1];
+                    queue[j] = queue[j - 1];
+                    j--;
                 }
-            }
-            if (!lenders[lowest].hasAssets()) {
-                return amountWithdrawn;
-            }
-            amountWithdrawn = amountWithdrawn.add(lenders[lowest].withdraw(_amount - amountWithdrawn));
-            j++;
-            //dont want infinite loop
-            if (j >= 6) {
-                return amountWithdrawn;
+                aprs[j] = apr;
+                queue[j] = lenders[i];
+                count++;
             }
         }
+
+        amountWithdrawn = 0;
+        for (uint256 i = 0; i < count && amountWithdrawn < _amount; i++) {
+            amountWithdrawn = amountWithdrawn.add(queue[i].withdraw(_amount - amountWithdrawn));
+        }
     }
 
     /*
@@ -553,20 +674,69 @@ contract FtmStrategy is BaseStrategy {
         return amounts[amounts.length - 1];
     }
 
+    //gas of each lender's withdrawAll and deposit, measured by scripts/gas_calibration.py
+    struct lenderGas {
+        uint128 withdrawAll;
+        uint128 deposit;
+    }
+
+    mapping(address => lenderGas) public lenderGasCosts;
+    //gas a tend spends outside the two lender calls
+    uint256 public tendBaseGas;
+    //gas the keeper prices callCost with. 0 means callCost is the cost of any tend
+    uint256 public keeperCallGas;
+
+    function setLenderGas(
+        address _lender,
+        uint256 _withdrawAll,
+        uint256 _deposit
+    ) external onlyAuthorized {
+        require(_isLender(_lender), "NOT LENDER");
+        require(_withdrawAll <= uint128(-1) && _deposit <= uint128(-1), "GAS TOO HIGH");
+        lenderGasCosts[_lender] = lenderGas(uint128(_withdrawAll), uint128(_deposit));
+    }
+
+    function setTendGas(uint256 _tendBaseGas, uint256 _keeperCallGas) external onlyAuthorized {
+        tendBaseGas = _tendBaseGas;
+        keeperCallGas = _keeperCallGas;
+    }
+
+    //callCost rescaled to the gas of moving from lowest to highest, when both lenders are calibrated
+    function tendCallCost(
+        uint256 callCost,
+        uint256 lowest,
+        uint256 highest
+    ) public view returns (uint256) {
+        if (keeperCallGas == 0) {
+            return callCost;
+        }
+        lenderGas memory from = lenderGasCosts[address(lenders[lowest])];
+        lenderGas memory to = lenderGasCosts[address(lenders[highest])];
+        if (from.withdrawAll == 0 || to.deposit == 0) {
+            return callCost;
+        }
+        uint256 gas = tendBaseGas.add(from.withdrawAll).add(to.deposit);
+        return callCost.mul(gas).div(keeperCallGas);
+    }
+
     function tendTrigger(uint256 callCost) public view override returns (bool) {
         // make sure to call tendtrigger with same callcost as harvestTrigger
         if (harvestTrigger(callCost)) {
             return false;
         }
 
+        //a tend with a target set moves to the target, not from lowest to highest.
+        //whoever sets the target decides when to tend
+        if (targetAllocation.length > 0) {
+            return false;
+        }
+
         //now let's check if there is better apr somewhere else.
         //If there is and profit potential is worth changing then lets do it
-        (uint256 lowest, uint256 lowestApr, , uint256 potential) = estimateAdjustPosition();
+        (uint256 lowest, uint256 lowestApr, uint256 nav, uint256 highest, uint256 potential) = _estimateAdjustPosition();
 
         //if protential > lowestApr it means we are changing horses
         if (potential > lowestApr) {
-            uint256 nav = lenders[lowest].nav();
-
             //To calculate our potential profit increase we work out how much extra
             //we would make in a typical harvest interlude. That is maxReportingDelay
             //then we see if the extra profit is worth more than the gas cost * profitFactor
@@ -575,7 +745,7 @@ contract FtmStrategy is BaseStrategy {
             //apr is scaled by 1e18 so we downscale here
             uint256 profitIncrease = (nav.mul(potential) - nav.mul(lowestApr)).div(1e18).mul(maxReportDelay).div(SECONDSPERYEAR);
 
-            uint256 wantCallCost = ethToWant(callCost);
+            uint256 wantCallCost = ethToWant(tendCallCost(callCost, lowest, highest));
 
             return (wantCallCost.mul(profitFactor) < profitIncrease);
         }
@@ -0,0 +1,112 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "./GenericLender/GenericLenderBase.sol";
+
+interface ILenderStrategy {
+    function numLenders() external view returns (uint256);
+
+    function lenders(uint256 i) external view returns (address);
+}
+
+interface IHarvestablePlugin {
+    function harvestTrigger(uint256 callCost) external view returns (bool);
+
+    function harvest() external;
+}
+
+/********************
+ *
+ *   Harvests the lender plugins that are due and then the strategy in one transaction
+ *   Needs to be the keeper of the strategy and the keep3r of every plugin it harvests
+ *   scripts/harvest.py builds the batches
+ *
+ ********************* */
+
+contract LenderHarvester {
+    address public owner;
+    mapping(address => bool) public keepers;
+    //plugins with a harvest() but no harvestTrigger, like GenericAaveMorpho. harvested in every batch
+    mapping(address => bool) public alwaysHarvest;
+
+    event BatchHarvested(address indexed strategy, address[] plugins);
+
+    constructor() public {
+        owner = msg.sender;
+    }
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "!owner");
+        _;
+    }
+
+    modifier onlyKeepers() {
+        require(msg.sender == owner || keepers[msg.sender], "!keepers");
+        _;
+    }
+
+    function setOwner(address _owner) external onlyOwner {
+        require(_owner != address(0), "!owner");
+        owner = _owner;
+    }
+
+    function setKeeper(address _keeper, bool _allowed) external onlyOwner {
+        keepers[_keeper] = _allowed;
+    }
+
+    function setAlwaysHarvest(address _plugin, bool _always) external onlyOwner {
+        alwaysHarvest[_plugin] = _always;
+    }
+
+    //plugins on the strategy whose harvestTrigger is true, plus the alwaysHarvest ones.
+    //other plugins without a trigger are skipped
+    function duePlugins(address _strategy, uint256 _callCost) public view returns (address[] memory) {
+        ILenderStrategy strategy = ILenderStrategy(_strategy);
+        uint256 count = strategy.numLenders();
+        address[] memory due = new address[](count);
+        uint256 found = 0;
+
+        for (uint256 i = 0; i < count; i++) {
+            address plugin = strategy.lenders(i);
+            if (alwaysHarvest[plugin]) {
+                due[found] = plugin;
+                found++;
+                continue;
+            }
+            try IHarvestablePlugin(plugin).harvestTrigger(_callCost) returns (bool trigger) {
+                if (trigger) {
+                    due[found] = plugin;
+                    found++;
+                }
+            } catch {}
+        }
+
+        //shrink to the plugins found
+        assembly {
+            mstore(due, found)
+        }
+        return due;
+    }
+
+    //checks the triggers on chain
+    function harvest(address _strategy, uint256 _callCost) external onlyKeepers {
+        _harvest(_strategy, duePlugins(_strategy, _callCost));
+    }
+
+    //plugins picked off chain. saves the trigger calls
+    function harvestWith(address _strategy, address[] calldata _plugins) external onlyKeepers {
+        _harvest(_strategy, _plugins);
+    }
+
+    function _harvest(address _strategy, address[] memory _plugins) internal {
+        for (uint256 i = 0; i < _plugins.length; i++) {
+            IHarvestablePlugin(_plugins[i]).harvest();
+        }
+
+        //plugins first so the want they return is in this report
+        IBaseStrategy(_strategy).harvest();
+
+        emit BatchHarvested(_strategy, _plugins);
+    }
+}
@@ -0,0 +1,155 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "../Strategy.sol";
+
+/********************
+ *   Exposes Strategy._rebalanceToTarget and estimateAdjustPosition next to the versions
+ *   that asked the lenders again for every nav, so tests/Mock/test_allocation_gas.py can compare them.
+ *   With legacy set, harvest and tend run on the old estimateAdjustPosition
+ ********************* */
+
+contract AllocationHarness is Strategy {
+    using SafeMath for uint256;
+
+    bool public legacy;
+
+    constructor(address _vault) public Strategy(_vault) {}
+
+    function setLegacy(bool _legacy) external onlyAuthorized {
+        legacy = _legacy;
+    }
+
+    function _estimateAdjustPosition()
+        internal
+        view
+        override
+        returns (
+            uint256,
+            uint256,
+            uint256,
+            uint256,
+            uint256
+        )
+    {
+        if (legacy) {
+            return _legacyEstimateAdjustPosition();
+        }
+        return super._estimateAdjustPosition();
+    }
+
+    function rebalanceToTarget() external onlyAuthorized {
+        _rebalanceToTarget();
+    }
+
+    function legacyEstimateAdjustPosition()
+        external
+        view
+        returns (
+            uint256 _lowest,
+            uint256 _lowestApr,
+            uint256 _highest,
+            uint256 _potential
+        )
+    {
+        (_lowest, _lowestApr, , _highest, _potential) = _legacyEstimateAdjustPosition();
+    }
+
+    function _legacyEstimateAdjustPosition()
+        internal
+        view
+        returns (
+            uint256 _lowest,
+            uint256 _lowestApr,
+            uint256 lowestNav,
+            uint256 _highest,
+            uint256 _potential
+        )
+    {
+        uint256 looseAssets = want.balanceOf(address(this));
+
+        _lowestApr = uint256(-1);
+        _lowest = 0;
+        for (uint256 i = 0; i < lenders.length; i++) {
+            if (lenders[i].hasAssets()) {
+                uint256 apr = lenders[i].apr();
+                if (apr < _lowestApr) {
+                    _lowestApr = apr;
+                    _lowest = i;
+                    lowestNav = lenders[i].nav();
+                }
+            }
+        }
+
+        uint256 toAdd = lowestNav.add(looseAssets);
+
+        uint256 highestApr = 0;
+        _highest = 0;
+
+        for (uint256 i = 0; i < lenders.length; i++) {
+            uint256 apr;
+            apr = lenders[i].aprAfterDeposit(looseAssets);
+
+            if (apr > highestApr) {
+                highestApr = apr;
+                _highest = i;
+            }
+        }
+
+        _potential = lenders[_highest].aprAfterDeposit(toAdd);
+    }
+
+    function _legacyTargetShare(address a) internal view returns (uint256) {
+        for (uint256 i = 0; i < targetAllocation.length; i++) {
+            if (targetAllocation[i].lender == a) {
+                return targetAllocation[i].share;
+            }
+        }
+        return 0;
+    }
+
+    //reads every nav up to three times and scans targetAllocation in storage for each lender
+    function legacyRebalanceToTarget() external onlyAuthorized {
+        uint256 total = estimatedTotalAssets();
+
+        for (uint256 i = 0; i < lenders.length; i++) {
+            uint256 target = total.mul(_legacyTargetShare(address(lenders[i]))).div(1000);
+            if (target == 0) {
+                if (lenders[i].hasAssets()) {
+                    lenders[i].withdrawAll();
+                }
+            } else {
+                uint256 nav = lenders[i].nav();
+                if (nav > target.add(withdrawalThreshold)) {
+                    lenders[i].withdraw(nav - target);
+                }
+            }
+        }
+
+        uint256 largest = 0;
+        for (uint256 i = 0; i < targetAllocation.length; i++) {
+            lenderRatio memory position = targetAllocation[i];
+            if (position.share > targetAllocation[largest].share) {
+                largest = i;
+            }
+
+            uint256 target = total.mul(position.share).div(1000);
+            uint256 nav = IGenericLender(position.lender).nav();
+            uint256 bal = want.balanceOf(address(this));
+            if (target > nav && bal > 0) {
+                want.safeTransfer(position.lender, Math.min(target - nav, bal));
+                IGenericLender(position.lender).deposit();
+            }
+        }
+
+        uint256 leftover = want.balanceOf(address(this));
+        if (leftover > 0) {
+            address lender = targetAllocation[largest].lender;
+            want.safeTransfer(lender, leftover);
+            IGenericLender(lender).deposit();
+        }
+    }
+}
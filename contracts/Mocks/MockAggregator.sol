@@ -0,0 +1,71 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+
+import "../Interfaces/Chainlink/AggregatorV3Interface.sol";
+
+/********************
+ *   Chainlink feed with a settable answer and update time
+ *
+ ********************* */
+
+contract MockAggregator is AggregatorV3Interface {
+    uint8 public override decimals;
+    uint80 public roundId;
+    int256 public answer;
+    uint256 public updatedAt;
+
+    constructor(uint8 _decimals, int256 _answer) public {
+        decimals = _decimals;
+        setAnswer(_answer);
+    }
+
+    //new round at the current block
+    function setAnswer(int256 _answer) public {
+        roundId++;
+        answer = _answer;
+        updatedAt = block.timestamp;
+    }
+
+    function setUpdatedAt(uint256 _updatedAt) external {
+        updatedAt = _updatedAt;
+    }
+
+    function description() external view override returns (string memory) {
+        return "mock";
+    }
+
+    function version() external view override returns (uint256) {
+        return 4;
+    }
+
+    function getRoundData(uint80 _roundId)
+        external
+        view
+        override
+        returns (
+            uint80,
+            int256,
+            uint256,
+            uint256,
+            uint80
+        )
+    {
+        require(_roundId == roundId, "No data present");
+        return (roundId, answer, updatedAt, updatedAt, roundId);
+    }
+
+    function latestRoundData()
+        external
+        view
+        override
+        returns (
+            uint80,
+            uint256,
+            uint256,
+            uint256,
+            uint80
+        )
+    {
+        return (roundId, uint256(answer), updatedAt, updatedAt, roundId);
+    }
+}
@@ -0,0 +1,89 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import "./MockLender.sol";
+
+/********************
+ *   MockLender with a compound style jump rate model and a market that can run out of cash
+ *   Mirrored by KinkedRateModel in scripts/allocation_model.py
+ *
+ *   utilization = min(borrows / supply, 1)
+ *   borrowRate = baseRate + min(utilization, kink) * multiplier
+ *              + max(utilization - kink, 0) * jumpMultiplier
+ *   apr = borrowRate * utilization * (1 - reserveFactor)
+ *   withdrawals are capped at the cash left in the market, supply - borrows
+ *
+ ********************* */
+
+contract MockKinkedLender is MockLender {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 public jumpMultiplier;
+    uint256 public kink;
+    uint256 public reserveFactor;
+
+    constructor(
+        address _strategy,
+        string memory _name,
+        uint256 _externalSupply,
+        uint256 _borrows,
+        uint256 _baseRate,
+        uint256 _multiplier,
+        uint256 _jumpMultiplier,
+        uint256 _kink,
+        uint256 _reserveFactor
+    ) public MockLender(_strategy, _name, _externalSupply, _borrows, _baseRate, _multiplier) {
+        _setKink(_jumpMultiplier, _kink, _reserveFactor);
+    }
+
+    function setKink(
+        uint256 _jumpMultiplier,
+        uint256 _kink,
+        uint256 _reserveFactor
+    ) external management {
+        _setKink(_jumpMultiplier, _kink, _reserveFactor);
+    }
+
+    function _setKink(
+        uint256 _jumpMultiplier,
+        uint256 _kink,
+        uint256 _reserveFactor
+    ) internal {
+        require(_kink <= WAD && _reserveFactor <= WAD, "!wad");
+        jumpMultiplier = _jumpMultiplier;
+        kink = _kink;
+        reserveFactor = _reserveFactor;
+    }
+
+    //want that could be pulled out of the market right now
+    function liquidity() public view returns (uint256) {
+        uint256 supply = externalSupply.add(_nav());
+        return supply > borrows ? supply - borrows : 0;
+    }
+
+    function _apr(uint256 extraSupply) internal view override returns (uint256) {
+        uint256 supply = externalSupply.add(_nav()).add(extraSupply);
+        if (supply == 0) {
+            return 0;
+        }
+
+        uint256 utilization = Math.min(borrows.mul(WAD).div(supply), WAD);
+        uint256 borrowRate = baseRate.add(Math.min(utilization, kink).mul(multiplier).div(WAD));
+        if (utilization > kink) {
+            borrowRate = borrowRate.add((utilization - kink).mul(jumpMultiplier).div(WAD));
+        }
+        return borrowRate.mul(utilization).div(WAD).mul(WAD.sub(reserveFactor)).div(WAD);
+    }
+
+    function _withdraw(uint256 amount) internal override returns (uint256) {
+        amount = Math.min(amount, Math.min(_nav(), liquidity()));
+        want.safeTransfer(address(strategy), amount);
+        return amount;
+    }
+}
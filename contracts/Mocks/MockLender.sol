@@ -0,0 +1,130 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import "../GenericLender/GenericLenderBase.sol";
+
+/********************
+ *   A lender plugin that holds want itself and quotes a utilization based rate
+ *   Used to test the strategy logic on a local chain. Mirrored by scripts/allocation_model.py
+ *
+ *   supply = externalSupply + nav + deposit
+ *   utilization = min(borrows / supply, 1)
+ *   apr = (baseRate + utilization * multiplier) * utilization
+ *
+ ********************* */
+
+contract MockLender is GenericLenderBase {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 internal constant WAD = 1e18;
+
+    //funds supplied to the fake market by everyone but us
+    uint256 public externalSupply;
+    uint256 public borrows;
+    uint256 public baseRate;
+    uint256 public multiplier;
+
+    constructor(
+        address _strategy,
+        string memory _name,
+        uint256 _externalSupply,
+        uint256 _borrows,
+        uint256 _baseRate,
+        uint256 _multiplier
+    ) public GenericLenderBase(_strategy, _name) {
+        _setMarket(_externalSupply, _borrows, _baseRate, _multiplier);
+    }
+
+    function setMarket(
+        uint256 _externalSupply,
+        uint256 _borrows,
+        uint256 _baseRate,
+        uint256 _multiplier
+    ) external management {
+        _setMarket(_externalSupply, _borrows, _baseRate, _multiplier);
+    }
+
+    function _setMarket(
+        uint256 _externalSupply,
+        uint256 _borrows,
+        uint256 _baseRate,
+        uint256 _multiplier
+    ) internal {
+        externalSupply = _externalSupply;
+        borrows = _borrows;
+        baseRate = _baseRate;
+        multiplier = _multiplier;
+    }
+
+    function nav() external view override returns (uint256) {
+        return _nav();
+    }
+
+    function _nav() internal view returns (uint256) {
+        return want.balanceOf(address(this));
+    }
+
+    function apr() external view override returns (uint256) {
+        return _apr(0);
+    }
+
+    function weightedApr() external view override returns (uint256) {
+        return _apr(0).mul(_nav());
+    }
+
+    function aprAfterDeposit(uint256 amount) external view override returns (uint256) {
+        return _apr(amount);
+    }
+
+    function _apr(uint256 extraSupply) internal view virtual returns (uint256) {
+        uint256 supply = externalSupply.add(_nav()).add(extraSupply);
+        if (supply == 0) {
+            return 0;
+        }
+
+        uint256 utilization = Math.min(borrows.mul(WAD).div(supply), WAD);
+        uint256 borrowRate = baseRate.add(utilization.mul(multiplier).div(WAD));
+        return borrowRate.mul(utilization).div(WAD);
+    }
+
+    function withdraw(uint256 amount) external override management returns (uint256) {
+        return _withdraw(amount);
+    }
+
+    function _withdraw(uint256 amount) internal virtual returns (uint256) {
+        amount = Math.min(amount, _nav());
+        want.safeTransfer(address(strategy), amount);
+        return amount;
+    }
+
+    //emergency withdraw. sends balance plus amount to governance
+    function emergencyWithdraw(uint256 amount) external override onlyGovernance {
+        amount;
+        want.safeTransfer(vault.governance(), want.balanceOf(address(this)));
+    }
+
+    //funds are already where they need to be
+    function deposit() external override management {}
+
+    function withdrawAll() external override management returns (bool) {
+        uint256 invested = _nav();
+        uint256 returned = _withdraw(invested);
+        return returned >= invested;
+    }
+
+    function hasAssets() external view override returns (bool) {
+        return _nav() > 0;
+    }
+
+    function protectedTokens() internal view override returns (address[] memory) {
+        address[] memory protected = new address[](1);
+        protected[0] = address(want);
+        return protected;
+    }
+}
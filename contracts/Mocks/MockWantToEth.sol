@@ -0,0 +1,33 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "../WantToEthOracle/IWantToEth.sol";
+
+/********************
+ *   Price oracle with a settable want per eth
+ *
+ ********************* */
+
+contract MockWantToEth is IWantToEth {
+    using SafeMath for uint256;
+
+    uint256 public wantPerEth;
+
+    constructor(uint256 _wantPerEth) public {
+        wantPerEth = _wantPerEth;
+    }
+
+    function setPrice(uint256 _wantPerEth) external {
+        wantPerEth = _wantPerEth;
+    }
+
+    function ethToWant(uint256 input) external view override returns (uint256) {
+        return input.mul(wantPerEth).div(1e18);
+    }
+
+    function wantToEth(uint256 input) external view override returns (uint256) {
+        return input.mul(1e18).div(wantPerEth);
+    }
+}
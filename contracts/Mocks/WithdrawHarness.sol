@@ -0,0 +1,60 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "../Strategy.sol";
+
+/********************
+ *   Exposes Strategy._withdrawSome next to the rescanning loop it replaced
+ *   so tests/Mock/test_withdraw_gas.py can compare the two
+ ********************* */
+
+contract WithdrawHarness is Strategy {
+    using SafeMath for uint256;
+
+    constructor(address _vault) public Strategy(_vault) {}
+
+    function withdrawSome(uint256 _amount) external onlyAuthorized returns (uint256) {
+        return _withdrawSome(_amount);
+    }
+
+    //the pre-sorting version. rescans every lender on each of up to 6 passes
+    function legacyWithdrawSome(uint256 _amount) external onlyAuthorized returns (uint256 amountWithdrawn) {
+        if (lenders.length == 0) {
+            return 0;
+        }
+
+        //dont withdraw dust
+        if (_amount < withdrawalThreshold) {
+            return 0;
+        }
+
+        amountWithdrawn = 0;
+        //most situations this will only run once. Only big withdrawals will be a gas guzzler
+        uint256 j = 0;
+        while (amountWithdrawn < _amount) {
+            uint256 lowestApr = uint256(-1);
+            uint256 lowest = 0;
+            for (uint256 i = 0; i < lenders.length; i++) {
+                if (lenders[i].hasAssets()) {
+                    uint256 apr = lenders[i].apr();
+                    if (apr < lowestApr) {
+                        lowestApr = apr;
+                        lowest = i;
+                    }
+                }
+            }
+            if (!lenders[lowest].hasAssets()) {
+                return amountWithdrawn;
+            }
+            amountWithdrawn = amountWithdrawn.add(lenders[lowest].withdraw(_amount - amountWithdrawn));
+            j++;
+            //dont want infinite loop
+            if (j >= 6) {
+                return amountWithdrawn;
+            }
+        }
+    }
+}
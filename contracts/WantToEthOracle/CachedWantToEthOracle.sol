@@ -0,0 +1,138 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./IWantToEth.sol";
+
+interface IUniRouter {
+    function getAmountsOut(uint256 amountIn, address[] calldata path) external view returns (uint256[] memory amounts);
+}
+
+/********************
+ *
+ *   Caches the price of 1 eth in want so tendTrigger does not hit the router on every call
+ *   The price is read from `source` if set, otherwise from `router` along `path` (weth first, want last)
+ *   Within `ttl` of the last update the cached price is used, after that the live price
+ *   Keepers call update when needsUpdate is true, see scripts/keeper.py
+ *
+ ********************* */
+
+contract CachedWantToEthOracle is IWantToEth {
+    using SafeMath for uint256;
+
+    uint256 public constant MAX_BPS = 10_000;
+
+    //read together by ethToWant
+    uint128 public wantPerEth;
+    uint64 public updatedAt;
+    uint64 public ttl;
+
+    //change in bps that makes the cached price worth updating before the ttl runs out
+    uint256 public maxDeviation;
+
+    address public source;
+    address public router;
+    address[] public path;
+
+    address public owner;
+    mapping(address => bool) public keepers;
+
+    event PriceUpdated(uint256 wantPerEth);
+
+    constructor(
+        address _source,
+        address _router,
+        address[] memory _path,
+        uint64 _ttl,
+        uint256 _maxDeviation
+    ) public {
+        require(_source != address(0) || (_router != address(0) && _path.length >= 2), "!source");
+        require(_maxDeviation <= MAX_BPS, "!deviation");
+        source = _source;
+        router = _router;
+        path = _path;
+        ttl = _ttl;
+        maxDeviation = _maxDeviation;
+        owner = msg.sender;
+    }
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "!owner");
+        _;
+    }
+
+    modifier onlyKeepers() {
+        require(msg.sender == owner || keepers[msg.sender], "!keepers");
+        _;
+    }
+
+    function setOwner(address _owner) external onlyOwner {
+        require(_owner != address(0), "!owner");
+        owner = _owner;
+    }
+
+    function setKeeper(address _keeper, bool _allowed) external onlyOwner {
+        keepers[_keeper] = _allowed;
+    }
+
+    function setTtl(uint64 _ttl) external onlyOwner {
+        ttl = _ttl;
+    }
+
+    function setMaxDeviation(uint256 _maxDeviation) external onlyOwner {
+        require(_maxDeviation <= MAX_BPS, "!deviation");
+        maxDeviation = _maxDeviation;
+    }
+
+    //want for 1 eth straight from the source
+    function livePrice() public view returns (uint256) {
+        if (source != address(0)) {
+            return IWantToEth(source).ethToWant(1e18);
+        }
+        uint256[] memory amounts = IUniRouter(router).getAmountsOut(1e18, path);
+        return amounts[amounts.length - 1];
+    }
+
+    function isFresh() public view returns (bool) {
+        return updatedAt != 0 && block.timestamp <= uint256(updatedAt).add(ttl);
+    }
+
+    //true when the ttl ran out or the live price moved more than maxDeviation
+    function needsUpdate() external view returns (bool) {
+        if (!isFresh()) {
+            return true;
+        }
+        uint256 live = livePrice();
+        uint256 cached = wantPerEth;
+        uint256 diff = live > cached ? live - cached : cached - live;
+        return diff.mul(MAX_BPS) > cached.mul(maxDeviation);
+    }
+
+    function update() external onlyKeepers {
+        uint256 price = livePrice();
+        require(price > 0 && price <= uint128(-1), "!price");
+        wantPerEth = uint128(price);
+        updatedAt = uint64(block.timestamp);
+        emit PriceUpdated(price);
+    }
+
+    function _price() internal view returns (uint256) {
+        if (isFresh()) {
+            return wantPerEth;
+        }
+        return livePrice();
+    }
+
+    function ethToWant(uint256 input) external view override returns (uint256) {
+        return input.mul(_price()).div(1e18);
+    }
+
+    function wantToEth(uint256 input) external view override returns (uint256) {
+        uint256 price = _price();
+        if (price == 0) {
+            return 0;
+        }
+        return input.mul(1e18).div(price);
+    }
+}
@@ -0,0 +1,79 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./IWantToEth.sol";
+import "../Interfaces/Chainlink/AggregatorV3Interface.sol";
+
+interface IDecimals {
+    function decimals() external view returns (uint8);
+}
+
+/********************
+ *
+ *   Prices want in eth from chainlink feeds
+ *   Either a want/usd and an eth/usd feed, or a single want/eth feed when `_ethFeed` is 0
+ *   Feed and token decimals are folded into two scales at deployment
+ *   Reverts when a feed is older than its max age or has no answer, so a dead feed never prices a trigger
+ *
+ ********************* */
+
+contract ChainlinkWantToEthOracle is IWantToEth {
+    using SafeMath for uint256;
+
+    AggregatorV3Interface public immutable wantFeed;
+    AggregatorV3Interface public immutable ethFeed;
+    uint256 public immutable wantMaxAge;
+    uint256 public immutable ethMaxAge;
+
+    //ethToWant(x) = x * ethPrice * wantScale / (wantPrice * ethScale)
+    uint256 public immutable wantScale;
+    uint256 public immutable ethScale;
+
+    constructor(
+        address _want,
+        address _wantFeed,
+        uint256 _wantMaxAge,
+        address _ethFeed,
+        uint256 _ethMaxAge
+    ) public {
+        require(_wantFeed != address(0), "!feed");
+        wantFeed = AggregatorV3Interface(_wantFeed);
+        ethFeed = AggregatorV3Interface(_ethFeed);
+        wantMaxAge = _wantMaxAge;
+        ethMaxAge = _ethMaxAge;
+
+        uint256 wantFeedDecimals = AggregatorV3Interface(_wantFeed).decimals();
+        uint256 ethFeedDecimals = _ethFeed == address(0) ? 0 : AggregatorV3Interface(_ethFeed).decimals();
+
+        //want units per feed unit on one side, wei per feed unit on the other
+        wantScale = 10**(wantFeedDecimals.add(IDecimals(_want).decimals()));
+        ethScale = 10**(ethFeedDecimals.add(18));
+    }
+
+    function _read(AggregatorV3Interface _feed, uint256 _maxAge) internal view returns (uint256) {
+        (uint80 roundId, uint256 answer, , uint256 updatedAt, uint80 answeredInRound) = _feed.latestRoundData();
+        //the interface returns the int256 answer as uint256, negative answers show up as huge ones
+        require(answer > 0 && answer <= uint256(type(int256).max), "!answer");
+        require(updatedAt != 0 && answeredInRound >= roundId, "!round");
+        require(block.timestamp.sub(updatedAt) <= _maxAge, "STALE");
+        return answer;
+    }
+
+    //want price and eth price, both in feed units. eth is 1 for a want/eth feed
+    function prices() public view returns (uint256 wantPrice, uint256 ethPrice) {
+        wantPrice = _read(wantFeed, wantMaxAge);
+        ethPrice = address(ethFeed) == address(0) ? 1 : _read(ethFeed, ethMaxAge);
+    }
+
+    function ethToWant(uint256 input) external view override returns (uint256) {
+        (uint256 wantPrice, uint256 ethPrice) = prices();
+        return input.mul(ethPrice).mul(wantScale).div(wantPrice.mul(ethScale));
+    }
+
+    function wantToEth(uint256 input) external view override returns (uint256) {
+        (uint256 wantPrice, uint256 ethPrice) = prices();
+        return input.mul(wantPrice).mul(ethScale).div(ethPrice.mul(wantScale));
+    }
+}
@@ -0,0 +1,350 @@
+"""
+Pure python replica of the lender allocation logic in Strategy.sol.
+
+Every method mirrors the solidity function of the same name with the same
+integer maths (floor division, 1e18 scaled aprs), so what-if questions can be
+answered without a fork. tests/Mock/test_model_parity.py keeps it honest
+against the contracts.
+
+water_fill works out the apr equalising split that setTargetAllocation takes.
+"""
+
+MAX_UINT256 = 2 ** 256 - 1
+WAD = 10 ** 18
+
+
+class LinearRateModel:
+    """Same maths as contracts/Mocks/MockLender.sol"""
+
+    def __init__(self, external_supply, borrows, base_rate, multiplier):
+        self.external_supply = external_supply
+        self.borrows = borrows
+        self.base_rate = base_rate
+        self.multiplier = multiplier
+
+    def supply_rate(self, supply):
+        if supply == 0:
+            return 0
+        utilization = min(self.borrows * WAD // supply, WAD)
+        borrow_rate = self.base_rate + utilization * self.multiplier // WAD
+        return borrow_rate * utilization // WAD
+
+    def liquidity(self, position):
+        """how much of `position` can be withdrawn"""
+        return position
+
+
+class KinkedRateModel(LinearRateModel):
+    """Same maths as contracts/Mocks/MockKinkedLender.sol"""
+
+    def __init__(self, external_supply, borrows, base_rate, multiplier, jump_multiplier, kink, reserve_factor=0):
+        super().__init__(external_supply, borrows, base_rate, multiplier)
+        self.jump_multiplier = jump_multiplier
+        self.kink = kink
+        self.reserve_factor = reserve_factor
+
+    def supply_rate(self, supply):
+        if supply == 0:
+            return 0
+        utilization = min(self.borrows * WAD // supply, WAD)
+        borrow_rate = self.base_rate + min(utilization, self.kink) * self.multiplier // WAD
+        if utilization > self.kink:
+            borrow_rate += (utilization - self.kink) * self.jump_multiplier // WAD
+        return borrow_rate * utilization // WAD * (WAD - self.reserve_factor) // WAD
+
+    def liquidity(self, position):
+        cash = max(self.external_supply + position - self.borrows, 0)
+        return min(position, cash)
+
+
+class Lender:
+    """In-memory stand-in for an IGenericLender plugin"""
+
+    def __init__(self, name, rate_model, nav=0):
+        self.name = name
+        self.rate_model = rate_model
+        self.balance = nav
+
+    def nav(self):
+        return self.balance
+
+    def apr(self):
+        return self.apr_after_deposit(0)
+
+    def weighted_apr(self):
+        return self.apr() * self.nav()
+
+    def apr_after_deposit(self, amount):
+        return self.apr_at(self.balance + amount)
+
+    def apr_at(self, position):
+        """apr if the strategy held exactly `position` here"""
+        return self.rate_model.supply_rate(self.rate_model.external_supply + position)
+
+    def has_assets(self):
+        return self.balance > 0
+
+    def deposit(self, amount):
+        self.balance += amount
+
+    def withdraw(self, amount):
+        amount = min(amount, self.rate_model.liquidity(self.balance))
+        self.balance -= amount
+        return amount
+
+    def withdraw_all(self):
+        invested = self.balance
+        return self.withdraw(invested) >= invested
+
+
+class StrategyModel:
+    """
+    Mirror of Strategy.sol. `loose` is the want held by the strategy and
+    `total_debt` is what the vault thinks the strategy owes it.
+    """
+
+    def __init__(self, lenders, loose=0, total_debt=0, withdrawal_threshold=10 ** 16):
+        self.lenders = list(lenders)
+        self.loose = loose
+        self.total_debt = total_debt
+        self.withdrawal_threshold = withdrawal_threshold
+        self.emergency_exit = False
+        # (lender index, share per 1000) as passed to setTargetAllocation
+        self.target_allocation = []
+
+    def lent_total_assets(self):
+        return sum(lender.nav() for lender in self.lenders)
+
+    def estimated_total_assets(self):
+        return self.lent_total_assets() + self.loose
+
+    def estimated_apr(self):
+        bal = self.estimated_total_assets()
+        if bal == 0:
+            return 0
+        return sum(lender.weighted_apr() for lender in self.lenders) // bal
+
+    def estimate_adjust_position(self):
+        loose_assets = self.loose
+
+        lowest_apr = MAX_UINT256
+        lowest = 0
+        lowest_nav = 0
+        for i, lender in enumerate(self.lenders):
+            if lender.has_assets():
+                apr = lender.apr()
+                if apr < lowest_apr:
+                    lowest_apr = apr
+                    lowest = i
+                    lowest_nav = lender.nav()
+
+        to_add = lowest_nav + loose_assets
+
+        highest_apr = 0
+        highest = 0
+        for i, lender in enumerate(self.lenders):
+            apr = lender.apr_after_deposit(loose_assets)
+            if apr > highest_apr:
+                highest_apr = apr
+                highest = i
+
+        potential = self.lenders[highest].apr_after_deposit(to_add)
+        return lowest, lowest_apr, highest, potential
+
+    def adjust_position(self, debt_outstanding=0):
+        if self.emergency_exit or len(self.lenders) == 0:
+            return
+
+        if self.target_allocation:
+            self.rebalance_to_target()
+            return
+
+        lowest, lowest_apr, highest, potential = self.estimate_adjust_position()
+
+        if potential > lowest_apr:
+            self.loose += self.lenders[lowest].withdraw(self.lenders[lowest].nav())
+
+        if self.loose > 0:
+            self.lenders[highest].deposit(self.loose)
+            self.loose = 0
+
+    def set_target_allocation(self, ratios):
+        if ratios:
+            assert sum(share for _, share in ratios) == 1000, "SHARE!=1000"
+            assert len({i for i, _ in ratios}) == len(ratios), "DUPLICATE LENDER"
+        self.target_allocation = list(ratios)
+
+    def rebalance_to_target(self):
+        total = self.estimated_total_assets()
+        shares = dict(self.target_allocation)
+
+        for i, lender in enumerate(self.lenders):
+            target = total * shares.get(i, 0) // 1000
+            if target == 0:
+                if lender.has_assets():
+                    self.loose += lender.withdraw(lender.nav())
+            elif lender.nav() > target + self.withdrawal_threshold:
+                self.loose += lender.withdraw(lender.nav() - target)
+
+        largest = 0
+        for k, (i, share) in enumerate(self.target_allocation):
+            if share > self.target_allocation[largest][1]:
+                largest = k
+            target = total * share // 1000
+            nav = self.lenders[i].nav()
+            if target > nav and self.loose > 0:
+                amount = min(target - nav, self.loose)
+                self.lenders[i].deposit(amount)
+                self.loose -= amount
+
+        if self.loose > 0:
+            self.lenders[self.target_allocation[largest][0]].deposit(self.loose)
+            self.loose = 0
+
+    def withdraw_some(self, amount):
+        if len(self.lenders) == 0 or amount < self.withdrawal_threshold:
+            return 0
+
+        # aprs are read once and the lenders drained lowest first
+        queue = sorted(
+            (lender for lender in self.lenders if lender.has_assets()),
+            key=lambda lender: lender.apr(),
+        )
+
+        amount_withdrawn = 0
+        for lender in queue:
+            if amount_withdrawn >= amount:
+                break
+            withdrawn = lender.withdraw(amount - amount_withdrawn)
+            self.loose += withdrawn
+            amount_withdrawn += withdrawn
+        return amount_withdrawn
+
+    def prepare_return(self, debt_outstanding):
+        profit = 0
+        loss = 0
+        debt_payment = debt_outstanding
+
+        lent_assets = self.lent_total_assets()
+        loose_assets = self.loose
+        total = loose_assets + lent_assets
+
+        if lent_assets == 0:
+            if debt_payment > loose_assets:
+                debt_payment = loose_assets
+            return profit, loss, debt_payment
+
+        debt = self.total_debt
+
+        if total > debt:
+            profit = total - debt
+            amount_to_free = profit + debt_payment
+            if amount_to_free > 0 and loose_assets < amount_to_free:
+                self.withdraw_some(amount_to_free - loose_assets)
+                new_loose = self.loose
+                if new_loose < amount_to_free:
+                    if profit > new_loose:
+                        profit = new_loose
+                        debt_payment = 0
+                    else:
+                        debt_payment = min(new_loose - profit, debt_payment)
+        else:
+            loss = debt - total
+            amount_to_free = loss + debt_payment
+            if amount_to_free > 0 and loose_assets < amount_to_free:
+                self.withdraw_some(amount_to_free - loose_assets)
+                new_loose = self.loose
+                if new_loose < amount_to_free:
+                    if loss > new_loose:
+                        loss = new_loose
+                        debt_payment = 0
+                    else:
+                        debt_payment = min(new_loose - loss, debt_payment)
+
+        return profit, loss, debt_payment
+
+    def liquidate_position(self, amount_needed):
+        balance = self.loose
+        if balance >= amount_needed:
+            return amount_needed, 0
+        received = self.withdraw_some(amount_needed - balance) + balance
+        return min(received, amount_needed), 0
+
+    def harvest(self, debt_outstanding=0, credit=0):
+        """
+        One harvest as seen from the strategy. The vault side is reduced to
+        what report() does to the strategy: it takes profit + debtPayment,
+        books the loss and hands over `credit`.
+        """
+        profit, loss, debt_payment = self.prepare_return(debt_outstanding)
+
+        self.loose -= profit + debt_payment
+        self.total_debt = self.total_debt - loss - debt_payment + credit
+        self.loose += credit
+
+        self.adjust_position(debt_outstanding)
+        return profit, loss, debt_payment
+
+
+def water_fill(curves, total, iterations=128):
+    """
+    Splits `total` so every lender that gets funds ends on the same apr and
+    every lender left out could not beat it. `curves` are callables giving the
+    apr when the strategy holds a given position, which must not increase
+    with the position. Returns the amount for each curve, summing to total.
+    """
+    if total == 0 or not curves:
+        return [0] * len(curves)
+
+    def fill(curve, level):
+        # largest position that still earns at least `level`
+        if curve(0) < level:
+            return 0
+        lo, hi = 0, total
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if curve(mid) >= level:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    lo = min(curve(total) for curve in curves)
+    hi = max(curve(0) for curve in curves)
+    for _ in range(iterations):
+        if hi - lo <= 1:
+            break
+        mid = (lo + hi) // 2
+        if sum(fill(curve, mid) for curve in curves) >= total:
+            lo = mid
+        else:
+            hi = mid
+
+    # at `lo` the lenders can take at least total, trim back to it
+    amounts = [fill(curve, lo) for curve in curves]
+    excess = sum(amounts) - total
+    for i in sorted(range(len(curves)), key=lambda i: curves[i](amounts[i])):
+        cut = min(excess, amounts[i])
+        amounts[i] -= cut
+        excess -= cut
+    return amounts
+
+
+def target_ratios(amounts):
+    """Rounds a split to shares per 1000 that add up to exactly 1000"""
+    total = sum(amounts)
+    if total == 0:
+        return [0] * len(amounts)
+    shares = [a * 1000 // total for a in amounts]
+    # hand the rounding to the largest remainders
+    remainders = sorted(range(len(amounts)), key=lambda i: amounts[i] * 1000 % total, reverse=True)
+    for i in remainders[: 1000 - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+def optimal_allocation(model):
+    """water_fill over a StrategyModel's lenders, as setTargetAllocation ratios"""
+    total = model.estimated_total_assets()
+    amounts = water_fill([lender.apr_at for lender in model.lenders], total)
+    return [(i, share) for i, share in enumerate(target_ratios(amounts)) if share > 0]
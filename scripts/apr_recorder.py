@@ -0,0 +1,164 @@
+"""
+Records strategy and lender aprs to an append-only column store.
+
+    brownie run apr_recorder main data/aprs 0xStrategy,0xStrategy2 --network mainnet
+    brownie run apr_recorder main data/aprs 0xStrategy 15000000 15100000 100 --network mainnet
+
+With an end block the range is backfilled (needs an archive node), without one
+the recorder follows the chain head. `step` samples every n blocks, `interval`
+is how long to sleep between polls of the head.
+
+Each (strategy, lender) pair is its own series in <root>/<strategy>/<lender>/,
+one raw file per column:
+
+    block.u8    uint64   block number, strictly increasing
+    nav.f8      float64  nav of the lender, estimatedTotalAssets for the strategy
+    apr.f8      float64  apr() of the lender, estimatedAPR for the strategy. 1e18 = 100%,
+                         float so a reward spike past 1844% does not overflow
+
+The strategy itself is stored under the lender key "strategy". Series are read
+back as np.memmap so a query only touches the pages for the blocks it asks for.
+"""
+import json
+import os
+import time
+
+import numpy as np
+from brownie import web3
+
+COLUMNS = {"block": np.uint64, "nav": np.float64, "apr": np.float64}
+FILES = {"block": "block.u8", "nav": "nav.f8", "apr": "apr.f8"}
+STRATEGY = "strategy"
+
+
+def _path(root, strategy, lender, column):
+    return os.path.join(root, strategy, lender, FILES[column])
+
+
+class AprStore:
+    def __init__(self, root):
+        self.root = root
+        # last block written per series, so a restart never writes a block twice
+        self._last = {}
+
+    def _rows(self, strategy, lender):
+        sizes = []
+        for column, dtype in COLUMNS.items():
+            path = _path(self.root, strategy, lender, column)
+            sizes.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        rows = min(sizes)
+        # a crash between columns leaves some longer than others
+        if rows != max(sizes):
+            for column, dtype in COLUMNS.items():
+                path = _path(self.root, strategy, lender, column)
+                if not os.path.exists(path):
+                    continue
+                with open(path, "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+        return rows
+
+    def last_block(self, strategy, lender=STRATEGY):
+        key = (strategy, lender)
+        if key not in self._last:
+            rows = self._rows(strategy, lender)
+            self._last[key] = int(self._column(strategy, lender, "block", rows)[-1]) if rows else -1
+        return self._last[key]
+
+    def append(self, strategy, lender, block, nav, apr):
+        if block <= self.last_block(strategy, lender):
+            return False
+        os.makedirs(os.path.join(self.root, strategy, lender), exist_ok=True)
+        for column, value in (("block", block), ("nav", nav), ("apr", apr)):
+            with open(_path(self.root, strategy, lender, column), "ab") as f:
+                f.write(np.array([value], dtype=COLUMNS[column]).tobytes())
+        self._last[(strategy, lender)] = block
+        return True
+
+    def record(self, snapshot):
+        """appends a SnapshotReader.read() result"""
+        strategy, block = snapshot["strategy"], snapshot["block"]
+        # a failed read comes back as None, leave a gap rather than a zero
+        # that backtest and attribution would carry forward
+        if snapshot["estimatedTotalAssets"] is not None and snapshot["estimatedAPR"] is not None:
+            self.append(strategy, STRATEGY, block, snapshot["estimatedTotalAssets"], snapshot["estimatedAPR"])
+
+        names = self._names(strategy)
+        new = False
+        for lender in snapshot["lenders"]:
+            if lender.get("apr") is None or lender.get("nav") is None:
+                continue
+            self.append(strategy, lender["address"], block, lender["nav"], lender["apr"])
+            if lender["address"] not in names:
+                names[lender["address"]] = lender.get("lenderName")
+                new = True
+        if new:
+            self._save_names(strategy, names)
+
+    def _names(self, strategy):
+        path = os.path.join(self.root, strategy, "names.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_names(self, strategy, names):
+        os.makedirs(os.path.join(self.root, strategy), exist_ok=True)
+        with open(os.path.join(self.root, strategy, "names.json"), "w") as f:
+            json.dump(names, f, indent=2, sort_keys=True)
+
+    def strategies(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def lenders(self, strategy):
+        """lender address -> name for every lender ever recorded on the strategy"""
+        return self._names(strategy)
+
+    def _column(self, strategy, lender, column, rows):
+        if rows == 0:
+            return np.empty(0, dtype=COLUMNS[column])
+        return np.memmap(_path(self.root, strategy, lender, column), dtype=COLUMNS[column], mode="r", shape=(rows,))
+
+    def series(self, strategy, lender=STRATEGY, start=None, end=None):
+        """
+        Columns of one series for start <= block < end as memmap views. Copy
+        them (np.array) to keep them past the next append.
+        """
+        rows = self._rows(strategy, lender)
+        blocks = self._column(strategy, lender, "block", rows)
+        lo = 0 if start is None else int(np.searchsorted(blocks, start, "left"))
+        hi = rows if end is None else int(np.searchsorted(blocks, end, "left"))
+        return {column: self._column(strategy, lender, column, rows)[lo:hi] for column in COLUMNS}
+
+
+def record_range(store, readers, start, end, step=1):
+    for block in range(start, end + 1, step):
+        for reader in readers:
+            store.record(reader.read(block))
+
+
+def follow(store, readers, step=1, interval=12):
+    next_block = web3.eth.block_number
+    while True:
+        head = web3.eth.block_number
+        while next_block <= head:
+            for reader in readers:
+                store.record(reader.read(next_block))
+            next_block += step
+        time.sleep(interval)
+
+
+def main(root, strategies, start=None, end=None, step=1, interval=12):
+    # needs the project loaded, AprStore does not
+    from scripts.snapshot import SnapshotReader
+
+    readers = [SnapshotReader(s) for s in strategies.split(",")]
+    store = AprStore(root)
+    step = int(step)
+    if end is not None:
+        record_range(store, readers, int(start), int(end), step)
+        return
+    if start is not None:
+        record_range(store, readers, int(start), web3.eth.block_number, step)
+    follow(store, readers, step, float(interval))
@@ -0,0 +1,180 @@
+"""
+Splits each harvest's profit between the lenders that earned it.
+
+    python -m scripts.attribution data/events.sqlite data/aprs 0xStrategy
+    python -m scripts.attribution data/events.sqlite data/aprs 0xStrategy --csv attribution.csv
+
+Reads the events scripts/indexer.py stored and the lender navs
+scripts/apr_recorder.py recorded. A harvest window runs from one
+StrategyReported to the next, the first block left out and the last one in,
+navs read after each. For every lender over the window:
+
+    flow      want sent in by the strategy less want sent back to it
+    rewards   want bought with reward tokens, i.e. want the lender received
+              in a transaction where it sent another token to anything but
+              the zero address or the token itself (those are burns, e.g.
+              redeeming cTokens). _disposeOfComp, harvestStkAave and the
+              other reward sales all look like that
+    interest  nav at the end less nav at the start, less flow and rewards.
+              nan for a lender the recorder never saw
+
+What the lenders do not explain, the reported gain less loss minus their
+interest and rewards, is `slippage`: want lost moving between lenders,
+withdrawal fees and rounding.
+
+Navs are forward filled from the recorder, so record at least every
+harvest block to get exact numbers. Flows and rewards are running totals per
+lender, so any number of windows costs two searchsorted calls per lender.
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class Accumulator:
+    """running total of a per block quantity, summed over windows with two lookups"""
+
+    def __init__(self, blocks, values):
+        blocks = np.asarray(blocks, dtype=np.int64)
+        order = np.argsort(blocks, kind="stable")
+        self.blocks = blocks[order]
+        self.total = np.concatenate([[0.0], np.cumsum(np.asarray(values, dtype=np.float64)[order])])
+
+    def between(self, starts, ends):
+        """sums over start < block <= end"""
+        return (
+            self.total[np.searchsorted(self.blocks, ends, "right")]
+            - self.total[np.searchsorted(self.blocks, starts, "right")]
+        )
+
+
+def ledgers(transfers, strategy, lenders, want):
+    """{lender: (flow, rewards)} Accumulators from EventStore.transfers rows, in one pass"""
+    lenders = set(lenders)
+    # (lender, tx) where the lender sold something
+    sold = {
+        (sender, tx)
+        for _, tx, token, sender, receiver, _ in transfers
+        if token != want and sender in lenders and receiver not in (ZERO_ADDRESS, token)
+    }
+    flow = {lender: [] for lender in lenders}
+    rewards = {lender: [] for lender in lenders}
+    for block, tx, token, sender, receiver, value in transfers:
+        if token != want:
+            continue
+        if sender == strategy and receiver in lenders:
+            flow[receiver].append((block, float(value)))
+        elif sender in lenders and receiver == strategy:
+            flow[sender].append((block, -float(value)))
+        elif receiver in lenders and (receiver, tx) in sold:
+            rewards[receiver].append((block, float(value)))
+    return {lender: (_accumulate(flow[lender]), _accumulate(rewards[lender])) for lender in lenders}
+
+
+def _accumulate(rows):
+    return Accumulator([b for b, _ in rows], [v for _, v in rows])
+
+
+def nav_at(series, blocks):
+    """
+    nav at each block forward filled from an AprStore series, 0 before the
+    first sample and nan if the lender was never recorded
+    """
+    index = np.searchsorted(series["block"], blocks, "right") - 1
+    navs = np.asarray(series["nav"], dtype=np.float64)
+    if len(navs) == 0:
+        return np.full(len(blocks), np.nan)
+    return np.where(index >= 0, navs[np.clip(index, 0, None)], 0.0)
+
+
+def want_of(events, strategy):
+    """the token the vault pays the strategy in"""
+    vaults = set(events.contracts("vault", strategy))
+    for _, _, token, sender, receiver, _ in events.transfers([strategy]):
+        if sender in vaults and receiver == strategy and token not in vaults:
+            return token
+    return None
+
+
+def attribute(events, aprs, strategy, want=None):
+    """
+    Per harvest window: `block` (H,), `profit` (H,), `interest`, `rewards`
+    and `flow` (H, lenders) and `slippage` (H,). The first report only
+    opens the first window.
+    """
+    want = want or want_of(events, strategy)
+    if want is None:
+        raise ValueError(f"no want transfer from the vault to {strategy}, pass want")
+
+    reports = events.events(subject=strategy, event="StrategyReported")
+    blocks = np.array([r["block"] for r in reports], dtype=np.int64)
+    profit = np.array([float(r["args"]["gain"]) - float(r["args"]["loss"]) for r in reports])
+    starts, ends = blocks[:-1], blocks[1:]
+
+    lenders = sorted(set(events.contracts("lender", strategy)) | set(aprs.lenders(strategy)))
+    accumulated = ledgers(events.transfers([strategy] + lenders), strategy, lenders, want)
+    shape = (len(ends), len(lenders))
+    interest, rewards, flow = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    for i, lender in enumerate(lenders):
+        flows, sales = accumulated[lender]
+        flow[:, i] = flows.between(starts, ends)
+        rewards[:, i] = sales.between(starts, ends)
+        series = aprs.series(strategy, lender)
+        nav = nav_at(series, blocks)
+        interest[:, i] = np.diff(nav) - flow[:, i] - rewards[:, i]
+
+    profit = profit[1:]
+    return {
+        "lenders": lenders,
+        "block": ends,
+        "profit": profit,
+        "interest": interest,
+        "rewards": rewards,
+        "flow": flow,
+        # a lender without navs is left out rather than poisoning every window
+        "slippage": profit - np.nansum(interest, axis=1) - rewards.sum(axis=1),
+    }
+
+
+def write_csv(result, path, names):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["block", "lender", "interest", "rewards", "flow"])
+        for h, block in enumerate(result["block"]):
+            for i, lender in enumerate(result["lenders"]):
+                writer.writerow([block, names.get(lender) or lender, *(result[k][h, i] for k in ("interest", "rewards", "flow"))])
+            writer.writerow([block, "slippage", result["slippage"][h], "", ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("events", help="scripts/indexer.py database")
+    parser.add_argument("aprs", help="scripts/apr_recorder.py store")
+    parser.add_argument("strategy")
+    parser.add_argument("--want", help="want token, found from the vault transfers if left out")
+    parser.add_argument("--csv", help="write every window and lender here")
+    args = parser.parse_args()
+
+    from scripts.apr_recorder import AprStore
+    from scripts.indexer import EventStore
+
+    aprs = AprStore(args.aprs)
+    result = attribute(EventStore(args.events), aprs, args.strategy, args.want)
+    names = aprs.lenders(args.strategy)
+    if args.csv:
+        write_csv(result, args.csv, names)
+
+    print(f"{len(result['block'])} harvests, profit {result['profit'].sum():,.0f}")
+    print(f"{'lender':<44} {'interest':>24} {'rewards':>24}")
+    for i, lender in enumerate(result["lenders"]):
+        interest, rewards = result["interest"][:, i].sum(), result["rewards"][:, i].sum()
+        print(f"{names.get(lender) or lender:<44} {interest:>24,.0f} {rewards:>24,.0f}")
+    print(f"{'slippage':<44} {result['slippage'].sum():>24,.0f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
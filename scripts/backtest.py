@@ -0,0 +1,392 @@
+"""
+Replays allocation policies over historical lender rates and reports what
+each would have earned net of gas.
+
+    python -m scripts.backtest data/aprs 0xStrategy --total 10000000e6 --gas-gwei 30
+
+A lender's history is any curve from rate_curves.py whose state fields are
+arrays with one entry per sample, so `apr_after_deposit(position)` prices the
+whole window at once. Curves describe the market without the strategy in it.
+Aprs from apr_recorder.py only have the apr we got, those are replayed with
+RecordedApr, which ignores our size.
+
+Positions only change at a tend or a harvest, so between two actions the
+interest is one numpy pass per lender. Triggers are evaluated over the whole
+window up to the next harvest at once and the first sample that fires ends
+it. Harvests happen every `harvest_interval` seconds like maxReportDelay.
+Profit stays invested, the vault is assumed to lend it straight back.
+"""
+import argparse
+import copy
+import json
+import sys
+
+import numpy as np
+
+WAD = 1e18
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+# used when no benchmark file is given, roughly a 3 lender strategy
+DEFAULT_GAS = {"harvest": 700_000, "tend": 450_000}
+
+
+class RecordedApr:
+    """a lender paying what was recorded, whatever we put in"""
+
+    def __init__(self, apr):
+        self.apr = apr
+
+    def apr_after_deposit(self, amounts):
+        return np.zeros_like(np.asarray(amounts, dtype=np.float64)) + self.apr
+
+
+class LenderHistory:
+    def __init__(self, name, curve, samples):
+        self.name = name
+        self.curve = curve
+        self._series = [k for k, v in vars(curve).items() if isinstance(v, np.ndarray) and v.shape[:1] == (samples,)]
+
+    def at(self, index):
+        """the curve with its state at one sample or a slice of them"""
+        curve = copy.copy(self.curve)
+        for k in self._series:
+            setattr(curve, k, getattr(self.curve, k)[index])
+        return curve
+
+    def apr(self, position, index):
+        return self.at(index).apr_after_deposit(position)
+
+
+def from_store(store, strategy, blocks):
+    """RecordedApr histories for every lender the recorder saw, forward filled onto `blocks`"""
+    histories = []
+    for lender, name in sorted(store.lenders(strategy).items()):
+        series = store.series(strategy, lender)
+        index = np.searchsorted(series["block"], blocks, "right") - 1
+        recorded = np.asarray(series["apr"][np.clip(index, 0, None)], dtype=np.float64)
+        # zero before the lender was added
+        apr = np.where(index >= 0, recorded, 0.0)
+        histories.append(LenderHistory(name or lender, RecordedApr(apr), len(blocks)))
+    return histories
+
+
+def gas_from_benchmark(path, lenders):
+    """harvest and tend gas for `lenders` lenders from scripts/benchmark.py output"""
+    with open(path) as f:
+        gas = json.load(f)["gas"]
+    count = str(min(max(lenders, 1), max(int(c) for c in gas["harvest"])))
+    return {"harvest": gas["harvest"][count], "tend": gas["tend"][count]}
+
+
+def tend_gas_from_registry(path, chain_id, strategy, lenders):
+    """
+    A tend out of the dearest lender to withdraw from into the dearest to
+    deposit into, from the scripts/gas_calibration.py registry. None if the
+    registry has not seen the strategy's chain.
+    """
+    from scripts import gas_registry
+
+    registry = gas_registry.load(path)
+    base = gas_registry.tend_base_gas(registry, chain_id, strategy)
+    withdraw_all = [gas_registry.gas_at(registry, chain_id, lender, "withdrawAll") for lender in lenders]
+    deposit = [gas_registry.gas_at(registry, chain_id, lender, "deposit") for lender in lenders]
+    withdraw_all, deposit = [g for g in withdraw_all if g], [g for g in deposit if g]
+    if base is None or not withdraw_all or not deposit:
+        return None
+    return base + max(withdraw_all) + max(deposit)
+
+
+def water_fill(curves, total, points=257, iterations=64):
+    """
+    Float version of allocation_model.water_fill on a grid of positions, fast
+    enough to run at every action. `curves` are priced at one sample.
+    """
+    if total <= 0:
+        return np.zeros(len(curves))
+    grid = np.linspace(0, total, points)
+    aprs = np.minimum.accumulate(np.array([c.apr_after_deposit(grid) for c in curves]), axis=1)
+
+    def fill(level):
+        # largest position still earning `level`, the grid reversed so interp sees increasing aprs
+        return np.array([np.interp(level, apr[::-1], grid[::-1]) for apr in aprs])
+
+    lo, hi = aprs[:, -1].min(), aprs[:, 0].max()
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        if fill(mid).sum() >= total:
+            lo = mid
+        else:
+            hi = mid
+
+    amounts = fill(lo)
+    marginal = np.array([np.interp(a, grid, apr) for a, apr in zip(amounts, aprs)])
+    excess = amounts.sum() - total
+    if excess < 0:
+        amounts[np.argmax(marginal)] -= excess
+        return amounts
+    for i in np.argsort(marginal, kind="stable"):
+        cut = min(excess, amounts[i])
+        amounts[i] -= cut
+        excess -= cut
+    return amounts
+
+
+class Policy:
+    name = "policy"
+
+    def trigger(self, bt, positions, window):
+        """bool per sample in `window` (a slice), true where a tend is due"""
+        raise NotImplementedError
+
+    def allocate(self, bt, positions, loose, t):
+        """positions after a tend or harvest at sample t"""
+        raise NotImplementedError
+
+
+class StrategyPolicy(Policy):
+    """Strategy.sol as deployed: estimateAdjustPosition, adjustPosition and tendTrigger"""
+
+    name = "strategy"
+
+    def __init__(self, profit_factor=100, max_report_delay=86400):
+        self.profit_factor = profit_factor
+        self.max_report_delay = max_report_delay
+
+    def trigger(self, bt, positions, window):
+        funded = np.flatnonzero(positions > 0)
+        if len(funded) == 0:
+            return np.zeros(window.stop - window.start, dtype=bool)
+        current = np.array([h.apr(p, window) for h, p in zip(bt.lenders, positions)])
+
+        # lowest funded apr, ties to the first like the contract's strict <
+        lowest_k = np.argmin(current[funded], axis=0)
+        columns = np.arange(current.shape[1])
+        lowest_apr = current[funded][lowest_k, columns]
+        lowest_nav = positions[funded][lowest_k]
+        # apr after depositing nothing is the current apr
+        highest = np.argmax(current, axis=0)
+
+        # every (lowest, highest) pair, then pick the one each sample uses
+        potentials = np.array(
+            [[h.apr(positions[j] + positions[i], window) for j, h in enumerate(bt.lenders)] for i in funded]
+        )
+        potential = potentials[lowest_k, highest, columns]
+
+        profit_increase = lowest_nav * (potential - lowest_apr) / WAD * self.max_report_delay / SECONDS_PER_YEAR
+        call_cost = bt.gas_cost("tend", window)
+        return (potential > lowest_apr) & (call_cost * self.profit_factor < profit_increase)
+
+    def allocate(self, bt, positions, loose, t):
+        positions = positions.copy()
+        lowest_apr, lowest = np.inf, 0
+        for i, (h, p) in enumerate(zip(bt.lenders, positions)):
+            if p > 0:
+                apr = h.apr(p, t)
+                if apr < lowest_apr:
+                    lowest_apr, lowest = apr, i
+
+        after_deposit = [h.apr(p + loose, t) for h, p in zip(bt.lenders, positions)]
+        highest = int(np.argmax(after_deposit))
+        potential = bt.lenders[highest].apr(positions[highest] + positions[lowest] + loose, t)
+
+        if potential > lowest_apr:
+            loose += positions[lowest]
+            positions[lowest] = 0
+        positions[highest] += loose
+        return positions
+
+
+class WaterFillPolicy(Policy):
+    """spreads funds so every funded lender pays the same, see setTargetAllocation"""
+
+    name = "water-fill"
+
+    def __init__(self, profit_factor=100, max_report_delay=86400):
+        self.profit_factor = profit_factor
+        self.max_report_delay = max_report_delay
+
+    def trigger(self, bt, positions, window):
+        funded = positions > 0
+        if not funded.any():
+            return np.zeros(window.stop - window.start, dtype=bool)
+        current = np.array([h.apr(p, window) for h, p in zip(bt.lenders, positions)])
+        worst = np.where(funded[:, None], current, np.inf)
+        worst_k = np.argmin(worst, axis=0)
+        gap = current.max(axis=0) - worst[worst_k, np.arange(current.shape[1])]
+
+        # rates meet somewhere in the middle, count half the gap on the worst position
+        profit_increase = positions[worst_k] * gap / 2 / WAD * self.max_report_delay / SECONDS_PER_YEAR
+        return bt.gas_cost("tend", window) * self.profit_factor < profit_increase
+
+    def allocate(self, bt, positions, loose, t):
+        return water_fill([h.at(t) for h in bt.lenders], positions.sum() + loose)
+
+
+class ThresholdPolicy(Policy):
+    """everything in the one lender that pays most for all of it, moved when another beats it by `threshold`"""
+
+    name = "threshold"
+
+    def __init__(self, threshold=1e16):
+        self.threshold = threshold
+
+    def _scores(self, bt, total, window):
+        return np.array([h.apr(total, window) for h in bt.lenders])
+
+    def trigger(self, bt, positions, window):
+        scores = self._scores(bt, positions.sum(), window)
+        return scores.max(axis=0) > scores[int(np.argmax(positions))] + self.threshold
+
+    def allocate(self, bt, positions, loose, t):
+        total = positions.sum() + loose
+        moved = np.zeros(len(bt.lenders))
+        scores = self._scores(bt, total, slice(t, t + 1))[:, 0]
+        moved[int(np.argmax(scores))] = total
+        return moved
+
+
+class MomentumPolicy(ThresholdPolicy):
+    """ThresholdPolicy on aprs averaged over the last `lookback` samples, so short spikes are not chased"""
+
+    name = "momentum"
+
+    def __init__(self, threshold=1e16, lookback=300):
+        super().__init__(threshold)
+        self.lookback = lookback
+
+    def _scores(self, bt, total, window):
+        start = max(window.start - self.lookback + 1, 0)
+        aprs = np.array([h.apr(total, slice(start, window.stop)) for h in bt.lenders])
+        sums = np.concatenate([np.zeros((len(aprs), 1)), np.cumsum(aprs, axis=1)], axis=1)
+        ends = np.arange(window.start, window.stop) - start + 1
+        begins = np.maximum(ends - self.lookback, 0)
+        return (sums[:, ends] - sums[:, begins]) / (ends - begins)
+
+
+class Backtest:
+    """
+    `timestamps` are the seconds of each sample and `lenders` the
+    LenderHistory of each plugin on the same samples. `gas_price` is in wei,
+    per sample or fixed, and `want_per_eth` converts gas to want (1e18 for
+    weth, 1e6 * eth price for usdc).
+    """
+
+    def __init__(self, timestamps, lenders, total, gas_price, want_per_eth=1e18, gas=None, harvest_interval=86400):
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.lenders = list(lenders)
+        self.total = float(total)
+        self.gas_price = gas_price
+        self.want_per_eth = want_per_eth
+        self.gas = dict(gas or DEFAULT_GAS)
+        self.harvest_interval = harvest_interval
+        # seconds each sample's rates are earned for
+        self.dt = np.append(np.diff(self.timestamps), 0.0)
+
+    def gas_cost(self, action, index):
+        """want spent on `action` at a sample or a window of them"""
+        gas_price = self.gas_price[index] if isinstance(self.gas_price, np.ndarray) else self.gas_price
+        return self.gas[action] * gas_price * self.want_per_eth / 1e18
+
+    def accrue(self, positions, start, stop):
+        window = slice(start, stop)
+        earned = np.zeros(len(positions))
+        for i, (h, p) in enumerate(zip(self.lenders, positions)):
+            if p > 0:
+                earned[i] = p * np.dot(h.apr(p, window), self.dt[window]) / WAD / SECONDS_PER_YEAR
+        return positions + earned
+
+    def _next_harvest(self, t):
+        return max(int(np.searchsorted(self.timestamps, self.timestamps[t] + self.harvest_interval)), t + 1)
+
+    def run(self, policy):
+        last = len(self.timestamps) - 1
+        positions = policy.allocate(self, np.zeros(len(self.lenders)), self.total, 0)
+        gas = self.gas_cost("harvest", 0)
+        actions = [(0, "harvest")]
+
+        t = 0
+        next_harvest = self._next_harvest(0)
+        while t < last:
+            end = min(next_harvest, last)
+            fired = np.flatnonzero(policy.trigger(self, positions, slice(t + 1, end))) if end > t + 1 else []
+            stop = t + 1 + int(fired[0]) if len(fired) else end
+            positions = self.accrue(positions, t, stop)
+            t = stop
+            if not len(fired) and t == last and next_harvest > last:
+                break
+
+            action = "tend" if len(fired) else "harvest"
+            gas += self.gas_cost(action, t)
+            actions.append((t, action))
+            positions = policy.allocate(self, positions, 0, t)
+            if action == "harvest":
+                next_harvest = self._next_harvest(t)
+
+        seconds = self.timestamps[-1] - self.timestamps[0]
+        earned = positions.sum() - self.total
+        return {
+            "policy": policy.name,
+            "gross_apr": float(earned / self.total * SECONDS_PER_YEAR / seconds),
+            "net_apr": float((earned - gas) / self.total * SECONDS_PER_YEAR / seconds),
+            "gas": float(gas),
+            "harvests": sum(1 for _, a in actions if a == "harvest"),
+            "tends": sum(1 for _, a in actions if a == "tend"),
+            "actions": actions,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("store", help="apr_recorder.py store")
+    parser.add_argument("strategy")
+    parser.add_argument("--total", type=float, required=True, help="want to allocate, in wei")
+    parser.add_argument("--start", type=int, help="first block, defaults to the first recorded")
+    parser.add_argument("--end", type=int, help="last block, defaults to the last recorded")
+    parser.add_argument("--step", type=int, default=1, help="blocks between samples")
+    parser.add_argument("--block-time", type=float, default=12)
+    parser.add_argument("--gas-gwei", type=float, default=30)
+    parser.add_argument("--want-per-eth", type=float, default=1e18)
+    parser.add_argument("--benchmark", help="scripts/benchmark.py output for the harvest and tend gas")
+    parser.add_argument("--registry", help="scripts/gas_calibration.py output for the tend gas")
+    parser.add_argument("--chain-id", type=int, default=1, help="chain to read from the registry")
+    parser.add_argument("--harvest-interval", type=float, default=86400)
+    args = parser.parse_args()
+
+    from scripts.apr_recorder import AprStore
+
+    store = AprStore(args.store)
+    recorded = store.series(args.strategy)["block"]
+    start = args.start if args.start is not None else int(recorded[0])
+    end = args.end if args.end is not None else int(recorded[-1])
+    blocks = np.arange(start, end + 1, args.step)
+
+    lenders = from_store(store, args.strategy, blocks)
+    gas = gas_from_benchmark(args.benchmark, len(lenders)) if args.benchmark else dict(DEFAULT_GAS)
+    if args.registry:
+        tend = tend_gas_from_registry(args.registry, args.chain_id, args.strategy, list(store.lenders(args.strategy)))
+        if tend is None:
+            sys.exit(f"{args.registry} has no tend for {args.strategy} on chain {args.chain_id}")
+        gas["tend"] = tend
+    bt = Backtest(
+        (blocks - start) * args.block_time,
+        lenders,
+        args.total,
+        args.gas_gwei * 1e9,
+        args.want_per_eth,
+        gas,
+        args.harvest_interval,
+    )
+
+    print(f"{'policy':<12} {'gross apr':>10} {'net apr':>10} {'harvests':>9} {'tends':>6}")
+    delay = args.harvest_interval
+    policies = [StrategyPolicy(max_report_delay=delay), WaterFillPolicy(max_report_delay=delay), ThresholdPolicy(), MomentumPolicy()]
+    for policy in policies:
+        result = bt.run(policy)
+        print(
+            f"{result['policy']:<12} {result['gross_apr']:>10.4%} {result['net_apr']:>10.4%} "
+            f"{result['harvests']:>9} {result['tends']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Gas benchmark for the strategy with 1 to 10 mock lenders on a local chain.
+
+    brownie run benchmark main --network development
+    brownie run benchmark main benchmarks/gas.json benchmarks/gas-baseline.json 0.05 --network development
+
+Every deployment starts from the same snapshot. Results are written as json
+keyed by operation then lender count. If a baseline file is given, any
+operation that got more than `threshold` more expensive fails the run.
+"""
+import json
+import os
+import sys
+
+from brownie import EthToEthOracle, MockLender, MockToken, Strategy, accounts, chain, config, project, web3
+from brownie._config import _get_data_folder
+
+FORMAT_VERSION = 1
+LENDER_COUNTS = range(1, 11)
+OPERATIONS = ["harvest", "tend", "withdraw", "manualAllocation", "estimatedFutureAPR"]
+
+DEPOSIT = 1_000_000 * 10 ** 18
+
+# cycled through so the lenders quote different aprs
+MARKETS = [
+    (1_000_000 * 10 ** 18, 600_000 * 10 ** 18, 2 * 10 ** 16, 10 * 10 ** 16),
+    (300_000 * 10 ** 18, 250_000 * 10 ** 18, 0, 8 * 10 ** 16),
+    (5_000_000 * 10 ** 18, 2_000_000 * 10 ** 18, 1 * 10 ** 16, 20 * 10 ** 16),
+    (2_000_000 * 10 ** 18, 500_000 * 10 ** 18, 3 * 10 ** 16, 5 * 10 ** 16),
+]
+
+
+def load_vault_container():
+    path = _get_data_folder().joinpath("packages", config["dependencies"][0])
+    return project.load(path, "YearnVaults").Vault
+
+
+def deploy(Vault, count):
+    whale, strategist, guardian, gov, keeper = accounts[0], accounts[1], accounts[2], accounts[3], accounts[4]
+
+    currency = whale.deploy(MockToken, "Mock Dollar", "mUSD", 18)
+    currency.mint(whale, 100 * DEPOSIT, {"from": whale})
+
+    vault = guardian.deploy(Vault)
+    vault.initialize(currency, gov, gov, "", "", {"from": guardian})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.setManagementFee(0, {"from": gov})
+
+    strategy = strategist.deploy(Strategy, vault)
+    strategy.setKeeper(keeper, {"from": gov})
+    strategy.setPriceOracle(strategist.deploy(EthToEthOracle), {"from": gov})
+    for i in range(count):
+        lender = strategist.deploy(MockLender, strategy, f"Mock{i}", *MARKETS[i % len(MARKETS)])
+        strategy.addLender(lender, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(DEPOSIT, {"from": whale})
+    return currency, vault, strategy
+
+
+def measure(Vault, count):
+    whale, gov = accounts[0], accounts[3]
+    currency, vault, strategy = deploy(Vault, count)
+    gas = {}
+
+    # first harvest moves the deposit into the best lender
+    strategy.harvest({"from": gov})
+
+    # spread evenly so tend and withdraw have to look at every lender
+    share = 1000 // count
+    positions = [[strategy.lenders(i), share] for i in range(count)]
+    positions[0][1] += 1000 - share * count
+    gas["manualAllocation"] = strategy.manualAllocation(positions, {"from": gov}).gas_used
+
+    gas["estimatedFutureAPR"] = strategy.estimatedFutureAPR.transact(2 * DEPOSIT, {"from": gov}).gas_used
+
+    # some profit so harvest has to free funds
+    for i in range(count):
+        currency.transfer(strategy.lenders(i), 1_000 * 10 ** 18, {"from": whale})
+    chain.sleep(3600)
+    gas["harvest"] = strategy.harvest({"from": gov}).gas_used
+
+    currency.transfer(strategy, 10_000 * 10 ** 18, {"from": whale})
+    gas["tend"] = strategy.tend({"from": gov}).gas_used
+
+    gas["withdraw"] = vault.withdraw(vault.balanceOf(whale) // 2, {"from": whale}).gas_used
+    return gas
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for operation, counts in results["gas"].items():
+        for count, used in counts.items():
+            before = baseline["gas"].get(operation, {}).get(count)
+            if before and used > before * (1 + threshold):
+                regressions.append((operation, count, before, used))
+    return regressions
+
+
+def main(output="benchmarks/gas.json", baseline=None, threshold=0.05):
+    Vault = load_vault_container()
+    results = {"version": FORMAT_VERSION, "chainId": web3.eth.chain_id, "gas": {op: {} for op in OPERATIONS}}
+
+    chain.snapshot()
+    for count in LENDER_COUNTS:
+        gas = measure(Vault, count)
+        chain.revert()
+        for operation in OPERATIONS:
+            results["gas"][operation][str(count)] = gas[operation]
+        print(f"{count} lenders: {gas}")
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"written to {output}")
+
+    if baseline is None:
+        return
+    with open(baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != FORMAT_VERSION:
+        sys.exit(f"baseline format {baseline.get('version')} is not {FORMAT_VERSION}")
+
+    regressions = compare(results, baseline, float(threshold))
+    for operation, count, before, used in regressions:
+        print(f"REGRESSION {operation} with {count} lenders: {before} -> {used} (+{(used - before) / before:.1%})")
+    if regressions:
+        sys.exit(1)
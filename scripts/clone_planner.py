@@ -0,0 +1,161 @@
+"""
+Finds deployed implementations to clone instead of deploying a lender or
+strategy from scratch.
+
+    brownie run deploy main deployments/ftm-wftm.yaml estimate --network ftm-main
+
+A candidate matches when its runtime bytecode, with the solidity metadata
+stripped, hashes the same as the compiled contract. EIP-1167 proxies are
+followed to their implementation so we never clone a clone. Candidates come
+from the spec's `implementations`, every deployments/*.state.json entry for
+the active network and brownie's own deployment map.
+
+deploy.py calls plan_step for every strategy and lender step without
+`clone_from`. Set `clone: false` on a step to always deploy it.
+"""
+import glob
+import json
+import os
+
+import yaml
+from brownie import network, project, web3
+from eth_utils import keccak
+
+# how each plugin clones itself. GenericLenderBase._clone under the hood
+CLONE_FUNCTIONS = {
+    "GenericAaveV3": "cloneAaveLender",
+    "GenericCompoundV3": "cloneCompoundV3Lender",
+    "GenericAaveMorpho": "cloneMorphoAaveLender",
+    "GenericCream": "cloneCreamLender",
+}
+
+EIP1167_PREFIX = bytes.fromhex("363d3d373d3d3d363d73")
+EIP1167_SUFFIX = bytes.fromhex("5af43d82803e903d91602b57fd5bf3")
+
+
+def strip_metadata(code):
+    """drops the cbor metadata solc appends, its length is in the last 2 bytes"""
+    code = bytes(code)
+    if len(code) < 2:
+        return code
+    length = int.from_bytes(code[-2:], "big")
+    if length + 2 > len(code):
+        return code
+    return code[: -(length + 2)]
+
+
+def code_hash(code):
+    return keccak(strip_metadata(code)).hex()
+
+
+def eip1167_target(code):
+    code = bytes(code)
+    if len(code) == 45 and code.startswith(EIP1167_PREFIX) and code.endswith(EIP1167_SUFFIX):
+        return web3.to_checksum_address(code[10:30])
+    return None
+
+
+# constructor args -> clone args, by contract
+def _aave_v3(step, args, source):
+    strategy, w_native, base_router, second_router, name, incentivised = args["args"]
+    # the clone reuses the source's WNATIVE
+    if source.WNATIVE().lower() != str(w_native).lower():
+        return None
+    return [strategy, base_router, second_router, name, incentivised]
+
+
+def _strategy_name_token(step, args, source):
+    return list(args["args"])
+
+
+CLONE_ARGS = {
+    "GenericAaveV3": _aave_v3,
+    "GenericCompoundV3": _strategy_name_token,
+    "GenericAaveMorpho": _strategy_name_token,
+    "GenericCream": _strategy_name_token,
+}
+
+
+def candidates(contract_name, spec=None, deployments_dir="deployments"):
+    found = list((spec or {}).get("implementations", {}).get(contract_name, []))
+
+    active = network.show_active()
+    for path in glob.glob(os.path.join(deployments_dir, "*.state.json")):
+        spec_path = path[: -len(".state.json")] + ".yaml"
+        if not os.path.exists(spec_path):
+            continue
+        with open(spec_path) as f:
+            steps = yaml.safe_load(f).get("steps", {})
+        with open(path) as f:
+            outputs = json.load(f).get(active, {})
+        found += [outputs[n] for n, s in steps.items() if s.get("contract") == contract_name and outputs.get(n)]
+
+    deployment_map = os.path.join("build", "deployments", "map.json")
+    if os.path.exists(deployment_map):
+        with open(deployment_map) as f:
+            found += json.load(f).get(str(web3.eth.chain_id), {}).get(contract_name, [])
+
+    # keep order, drop repeats
+    return list(dict.fromkeys(web3.to_checksum_address(a) for a in found))
+
+
+def find_implementation(container, addresses):
+    """first candidate running the same code as the compiled container"""
+    target = code_hash(bytes.fromhex(container._build["deployedBytecode"]))
+    for address in addresses:
+        code = web3.eth.get_code(address)
+        implementation = eip1167_target(code)
+        if implementation is not None:
+            address, code = implementation, web3.eth.get_code(implementation)
+        if code and code_hash(code) == target:
+            return address
+    return None
+
+
+def plan_step(name, step, args, acct, spec=None):
+    """
+    Returns the step rewritten to clone when a matching implementation exists,
+    along with a gas estimate for each option. None means no estimate.
+    """
+    container = project.get_loaded_projects()[0][step["contract"]]
+    if step["type"] == "strategy":
+        ctor_args = [args["vault"]]
+    else:
+        ctor_args = list(args["args"])
+
+    try:
+        deploy_gas = container.deploy.estimate_gas(*ctor_args, {"from": acct})
+    except Exception:
+        deploy_gas = None
+    estimate = {"deploy": deploy_gas, "clone": None, "source": None}
+
+    source_address = find_implementation(container, candidates(step["contract"], spec))
+    if source_address is None:
+        return step, estimate
+    source = container.at(source_address)
+
+    if step["type"] == "strategy":
+        clone_args = [args["vault"], args.get("strategist", acct), args.get("rewards", acct), args.get("keeper", acct)]
+        clone_step = dict(step, clone_from=source_address)
+        estimate["clone"] = source.clone.estimate_gas(*clone_args, {"from": acct})
+    else:
+        translate = CLONE_ARGS.get(step["contract"])
+        clone_args = translate(step, args, source) if translate else None
+        if clone_args is None:
+            return step, estimate
+        clone_step = dict(step, clone_from=source_address, clone_args=clone_args)
+        estimate["clone"] = getattr(source, CLONE_FUNCTIONS[step["contract"]]).estimate_gas(*clone_args, {"from": acct})
+
+    estimate["source"] = source_address
+    return clone_step, estimate
+
+
+def report(name, estimate):
+    deploy, clone = estimate["deploy"], estimate["clone"]
+    line = f"  {name}: deploy {deploy if deploy is not None else '?'} gas"
+    if estimate["source"]:
+        line += f", clone of {estimate['source']} {clone} gas"
+        if deploy is not None:
+            line += f" (saves {deploy - clone})"
+    print(line)
+
@@ -1,112 +1,236 @@
-from functools import partialmethod
-from pathlib import Path
-from pdb import pm
-import yaml
-import click
+"""
+Declarative deployment of vaults, strategies and lender plugins.
+
+    brownie run deploy main deployments/ftm-wftm.yaml --network ftm-main
+    brownie run deploy main deployments/ftm-wftm.yaml plan --network ftm-main
+    brownie run deploy main deployments/ftm-wftm.yaml estimate --network ftm-main
+
+Each step in the spec names what it needs from other steps with `$step`.
+Steps are grouped into waves by those references. Every transaction in a
+wave is broadcast with required_confs=0, so brownie hands out consecutive
+nonces without waiting. The wave is confirmed before the next wave starts.
+Finished steps are recorded next to the spec in <spec>.state.json, so a rerun
+picks up where the last one stopped.
+
+Step types
+    vault     registry.newExperimentalVault(token, governance, guardian, rewards, name, symbol)
+    strategy  deploy `contract`, or clone `clone_from` if given
+    lender    deploy `contract` with `args`, or `clone_from` via its clone function with `clone_args`
+    call      `target`.`function`(*args) from the deployer, e.g. addLender or setKeeper
+
+Strategy and lender steps without `clone_from` are cloned from a deployed
+implementation with the same bytecode when there is one, see clone_planner.py.
+`estimate` prints the gas for deploying and cloning each of them.
+"""
+import json
 import os
-from brownie import interface, config, accounts, Contract, project, FtmStrategy, GenericAaveV3, network, web3
-from eth_utils import is_checksum_address
 
-yearnDep = config["dependencies"][0]
-Vault = project.load(yearnDep).Vault
+import yaml
+from brownie import Contract, accounts, network, project
 
-acct = accounts.load("yd")
+from scripts.clone_planner import CLONE_FUNCTIONS, plan_step, report
 
-dev = acct
-token = Contract("0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83")
-gov = "0x72a34AbafAB09b15E7191822A679f28E067C4a16"
-rewards = "0x89716Ad7EDC3be3B35695789C475F3e7A3Deb12a"
-registry = Contract("0x727fe1759430df13655ddb0731dE0D0FDE929b04")
-vault = Vault.at("0x27cbf0fddb356a2d1EBdef604Cfa90F8f300d34E")
-strategy = None
+# step fields that are not arguments
+SETTINGS = ("type", "contract", "function", "clone")
 
-param = { "from": acct}
 
-def clone_vault():
-    print(f"You are using the '{network.show_active()}' network")
-    dev = acct
-    print(f"You are using: 'dev' [{dev.address}]")
-   
-
-    name = input(f"Set description ['{token.name()} yVault']: ") or ""
-    symbol = input(f"Set symbol ['yv{token.symbol()}']: ") or ""
-    print(
-        f"""
-    Vault Parameters
-     token: {token.address}
-  governer: {gov}
-   rewards: {rewards}
-      name: '{token.name() + 'yVault'}'
-    symbol: '{'yv' + token.symbol()}'
+def _references(value):
+    if isinstance(value, str):
+        return {value[1:]} if value.startswith("$") else set()
+    if isinstance(value, list):
+        return set().union(*map(_references, value)) if value else set()
+    if isinstance(value, dict):
+        return set().union(*map(_references, value.values())) if value else set()
+    return set()
+
+
+def resolve(value, outputs):
+    if isinstance(value, str) and value.startswith("$"):
+        return outputs[value[1:]]
+    if isinstance(value, list):
+        return [resolve(v, outputs) for v in value]
+    if isinstance(value, dict):
+        return {k: resolve(v, outputs) for k, v in value.items()}
+    return value
+
+
+def waves(steps, done=()):
     """
-    )
-    if input("Deploy New Vault? y/[N]: ").lower() != "y":
-        return
-    print("Cloning Vault...")
-    tx = registry.newExperimentalVault(
-        token,
-        gov,
-        gov,
-        rewards,
-        name,
-        symbol,
-        param
-    )
-    global vault 
-    vault = Vault.at(tx.return_value)
-    print(f"Vault Cloned to {vault.address}")
-
-    
-
-def clone_strat():
-    if input(f"Clone New Strategy for vault at {vault.address}? y/[N]: ").lower() != "y":
-        return
-
-    print("Cloning the Gen Lender base strategy")
-    to_clone = FtmStrategy.at("0xDf262B43bea0ACd0dD5832cf2422e0c9b2C539dc")
-    tx = to_clone.clone(
-        vault.address,
-        gov,
-        rewards,
-        gov,
-        param)
-
-    global strategy
-    strategy = FtmStrategy.at(tx.return_value)
-    print(f"Strategy cloned to {strategy.address}")
-  
-    
-def deploy_v3():
-    if input(f"Deploy New plugin for Strategy at {strategy.address}? y/[N]: ").lower() != "y":
-        return
-
-    print("Deploying new Aave V3 Gen Lender...")
-    router = "0xF491e7B69E4244ad4002BC14e878a34207E38c29" #spooky
-    router2 = "0x16327E3FbDaCA3bcF7E38F5Af2599D2DDc33aE52" #spirit swap
-    name = "AaveV3GenLender"
-    
-    v3 = GenericAaveV3.deploy(
-        strategy.address,
-        token, #Wnative is want
-        router,
-        router2,
-        name,
-        False,
-        param,
-        publish_source=True
-    )
-
-    print(f"V3 deployed to {v3.address}")
-
-
-
-def main():
-    #print(project.load(yearnDep))
-    #global dev
-    #dev = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
-    print(f"You are using: 'dev' [{dev.address}]")
-
-    print("Cloning Vault")
-    #clone_vault()
-    clone_strat()
-    deploy_v3()
+    Orders the steps into lists that only depend on earlier lists. Steps in
+    `done` count as finished already.
+    """
+    remaining = {name: _references(step) - set(done) for name, step in steps.items() if name not in done}
+    for name, needs in remaining.items():
+        unknown = needs - set(steps)
+        if unknown:
+            raise ValueError(f"{name} references unknown steps {sorted(unknown)}")
+
+    ordered = []
+    while remaining:
+        ready = sorted(name for name, needs in remaining.items() if not needs)
+        if not ready:
+            raise ValueError(f"dependency cycle between {sorted(remaining)}")
+        ordered.append(ready)
+        for name in ready:
+            del remaining[name]
+        for needs in remaining.values():
+            needs.difference_update(ready)
+    return ordered
+
+
+def _container(name):
+    return project.get_loaded_projects()[0][name]
+
+
+def submit(step, args, tx_params):
+    """broadcasts the step and returns the pending transaction"""
+    kind = step["type"]
+    if kind == "vault":
+        registry = Contract(args["registry"])
+        return registry.newExperimentalVault(
+            args["token"],
+            args["governance"],
+            args.get("guardian", args["governance"]),
+            args["rewards"],
+            args.get("name", ""),
+            args.get("symbol", ""),
+            tx_params,
+        )
+
+    if kind == "strategy":
+        container = _container(step["contract"])
+        if "clone_from" in step:
+            source = container.at(args["clone_from"])
+            deployer = tx_params["from"]
+            roles = [args.get(role, deployer) for role in ("strategist", "rewards", "keeper")]
+            return source.clone(args["vault"], *roles, tx_params)
+        return container.deploy(args["vault"], tx_params)
+
+    if kind == "lender":
+        container = _container(step["contract"])
+        if "clone_from" in step:
+            source = container.at(args["clone_from"])
+            return getattr(source, CLONE_FUNCTIONS[step["contract"]])(*args["clone_args"], tx_params)
+        return container.deploy(*args["args"], tx_params)
+
+    if kind == "call":
+        target = _container(step["contract"]).at(args["target"]) if "contract" in step else Contract(args["target"])
+        return getattr(target, step["function"])(*args.get("args", []), tx_params)
+
+    raise ValueError(f"unknown step type {kind}")
+
+
+def output(step, tx):
+    """the address a finished step produced, None for calls"""
+    kind = step["type"]
+    if kind == "vault":
+        return tx.events["NewExperimentalVault"]["vault"]
+    if kind in ("strategy", "lender"):
+        if "clone_from" in step:
+            return tx.events["Cloned"]["clone"]
+        return tx.contract_address
+    return None
+
+
+def _known(spec, spec_path):
+    """static addresses from the spec plus the outputs of finished steps"""
+    known = dict(spec.get("addresses", {}))
+    known.update(_load_state(spec_path))
+    return known
+
+
+def plan(spec_path):
+    with open(spec_path) as f:
+        spec = yaml.safe_load(f)
+    for i, wave in enumerate(waves(spec["steps"], _known(spec, spec_path))):
+        print(f"wave {i}: {', '.join(wave)}")
+
+
+def _state_path(spec_path):
+    return os.path.splitext(spec_path)[0] + ".state.json"
+
+
+def _load_state(spec_path):
+    path = _state_path(spec_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        state = json.load(f)
+    return state.get(network.show_active(), {})
+
+
+def _save_state(spec_path, steps, outputs):
+    path = _state_path(spec_path)
+    state = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+    state[network.show_active()] = {k: v for k, v in outputs.items() if k in steps}
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def _arguments(step, outputs):
+    return resolve({k: v for k, v in step.items() if k not in SETTINGS}, outputs)
+
+
+def _clone_first(name, step, outputs, acct, spec):
+    if step["type"] not in ("strategy", "lender") or "clone_from" in step or not step.get("clone", True):
+        return step, None
+    return plan_step(name, step, _arguments(step, outputs), acct, spec)
+
+
+def estimate(spec_path, spec, acct):
+    """gas for deploying vs cloning each step whose inputs already exist, nothing is sent"""
+    outputs = _known(spec, spec_path)
+    for wave in waves(spec["steps"], outputs):
+        for name in wave:
+            step = spec["steps"][name]
+            if not _references(step) <= set(outputs):
+                print(f"  {name}: waiting on {', '.join(sorted(_references(step) - set(outputs)))}")
+                continue
+            _, gas = _clone_first(name, step, outputs, acct, spec)
+            if gas is not None:
+                report(name, gas)
+
+
+def main(spec_path, mode="deploy"):
+    if mode == "plan":
+        return plan(spec_path)
+
+    with open(spec_path) as f:
+        spec = yaml.safe_load(f)
+    acct = accounts.load(spec.get("account", "yd"))
+    print(f"You are using the '{network.show_active()}' network")
+    print(f"You are using: 'dev' [{acct.address}]")
+    if mode == "estimate":
+        return estimate(spec_path, spec, acct)
+
+    steps = spec["steps"]
+    # finished calls are recorded as None
+    outputs = _known(spec, spec_path)
+
+    for i, wave in enumerate(waves(steps, outputs)):
+        print(f"wave {i}: {', '.join(wave)}")
+        pending = {}
+        for name in wave:
+            step, gas = _clone_first(name, steps[name], outputs, acct, spec)
+            if gas is not None:
+                report(name, gas)
+            steps[name] = step
+            pending[name] = submit(step, _arguments(step, outputs), {"from": acct, "required_confs": 0})
+
+        # every step that mined is recorded before a revert stops the run,
+        # so a rerun only resends the failed ones
+        failed = []
+        for name, tx in pending.items():
+            tx.wait(1)
+            if tx.status != 1:
+                print(f"  {name}: reverted in {tx.txid}")
+                failed.append(name)
+                continue
+            outputs[name] = output(steps[name], tx)
+            print(f"  {name}: {outputs[name] or tx.txid}")
+        _save_state(spec_path, steps, outputs)
+        if failed:
+            raise RuntimeError(f"wave {i}: {', '.join(failed)} reverted")
@@ -0,0 +1,232 @@
+"""
+Measures the gas of every lender plugin and writes it to the gas registry,
+see scripts/gas_registry.py for the format.
+
+    brownie run gas_calibration main --network development
+    brownie run gas_calibration main gas/registry.json 0xStrategy,0xStrategy2 --network mainnet-fork
+    brownie run gas_calibration apply 0xStrategy gas/registry.json --network mainnet
+
+Without strategies a strategy is deployed on the local chain with a
+MockLender and a MockKinkedLender. With them, on a fork, the strategies are
+impersonated so the real plugins run against the real markets. Nothing
+leaves the fork.
+
+A keeper tend is sent first, then every lender is emptied into the strategy.
+For each lender and each of SIZES whole tokens, from the same snapshot:
+aprAfterDeposit(size) is estimated as a call, then deposit, withdraw of
+half, harvest a day later (plugins that have one) and withdrawAll are sent.
+What the tend used beyond its withdrawAll and deposit is its base gas.
+Results merge into the registry file so runs on other chains add to it.
+
+`apply` loads the registry into a strategy with setLenderGas and setTendGas
+for tendTrigger. Lenders that were never measured are priced from their
+plugin. `keeper_call_gas` has to be the gas the keeper prices callCost
+with, trigger_gas in scripts/keeper.py.
+"""
+from brownie import (
+    Contract,
+    MockKinkedLender,
+    MockLender,
+    Strategy,
+    accounts,
+    chain,
+    interface,
+    project,
+    web3,
+)
+from brownie.exceptions import VirtualMachineError
+
+from scripts import gas_registry
+from scripts.clone_planner import code_hash, eip1167_target
+from scripts.keeper import DEFAULT_TRIGGER_GAS
+
+# every tx pays this, a call from the strategy does not
+INTRINSIC_GAS = 21_000
+
+# whole tokens
+SIZES = (100, 10_000, 1_000_000)
+
+# long enough for the plugins to have rewards to sell
+HARVEST_DELAY = 86400
+
+PLUGINS = [
+    "GenericAaveV3",
+    "GenericCompoundV3",
+    "GenericAaveMorpho",
+    "GenericCream",
+    "GenericAave",
+    "GenericDyDx",
+    "GenericIronBank",
+    "GenericScream",
+    "EthCream",
+    "AlphaHomoLender",
+    "MockLender",
+    "MockKinkedLender",
+]
+
+HARVEST_ABI = [{"name": "harvest", "type": "function", "stateMutability": "nonpayable", "inputs": [], "outputs": []}]
+
+# the mock strategy's lenders, a compound style market just under its kink
+KINKED_MARKET = (1_000_000 * 10 ** 18, 780_000 * 10 ** 18, 0, 5 * 10 ** 16, 109 * 10 ** 16, 80 * 10 ** 16, 10 * 10 ** 16)
+
+
+def plugin_name(address):
+    """the compiled plugin running at address, following clones. None if unknown"""
+    code = web3.eth.get_code(address)
+    implementation = eip1167_target(code)
+    if implementation is not None:
+        code = web3.eth.get_code(implementation)
+    found = code_hash(code)
+    loaded = project.get_loaded_projects()[0]
+    for name in PLUGINS:
+        if name in loaded.keys() and code_hash(bytes.fromhex(loaded[name]._build["deployedBytecode"])) == found:
+            return name
+    return None
+
+
+def _harvestable(name):
+    if name is None:
+        return False
+    container = project.get_loaded_projects()[0][name]
+    return any(item.get("name") == "harvest" for item in container.abi)
+
+
+def _fund(address):
+    """gas money for an impersonated contract, whichever local node this is"""
+    balance = hex(10 ** 20)
+    for method in ("evm_setAccountBalance", "anvil_setBalance", "hardhat_setBalance"):
+        if "error" not in web3.provider.make_request(method, [address, balance]):
+            return
+    # older ganache cannot, it takes the zero gas price brownie sends on development
+
+
+def _gas(tx):
+    return tx.gas_used - INTRINSIC_GAS
+
+
+def _strategy(address):
+    return Contract.from_abi("Strategy", str(address), Strategy.abi)
+
+
+def deploy_mocks():
+    """a strategy with one of each mock lender and the deposit lent out"""
+    from scripts.benchmark import deploy, load_vault_container
+
+    strategist, gov = accounts[1], accounts[3]
+    currency, vault, strategy = deploy(load_vault_container(), 0)
+    strategy.addLender(strategist.deploy(MockLender, strategy, "Mock", *KINKED_MARKET[:4]), {"from": gov})
+    strategy.addLender(strategist.deploy(MockKinkedLender, strategy, "MockKinked", *KINKED_MARKET), {"from": gov})
+    strategy.harvest({"from": gov})
+    return strategy
+
+
+def send_tend(strategy):
+    """tends like the keeper would and returns what the tend moved and used"""
+    lowest, lowest_apr, highest, potential = strategy.estimateAdjustPosition()
+    want = interface.ERC20(strategy.want())
+    moved = {"loose": want.balanceOf(strategy), "withdrawn": 0, "highest": strategy.lenders(highest)}
+    if potential > lowest_apr:
+        # adjustPosition only pulls out of the lowest when it is changing lenders
+        moved["lowest"] = strategy.lenders(lowest)
+        moved["withdrawn"] = interface.IGenericLender(moved["lowest"]).nav()
+
+    _fund(strategy.keeper())
+    keeper = accounts.at(strategy.keeper(), force=True)
+    moved["gas"] = strategy.tend({"from": keeper}).gas_used
+    return moved
+
+
+def measure(lender, want, acct, amount, harvestable):
+    """{operation: gas} for one size, sent from the strategy"""
+    gas = {"aprAfterDeposit": lender.aprAfterDeposit.estimate_gas(amount, {"from": acct}) - INTRINSIC_GAS}
+    want.transfer(lender, amount, {"from": acct})
+    gas["deposit"] = _gas(lender.deposit({"from": acct}))
+    gas["withdraw"] = _gas(lender.withdraw(amount // 2, {"from": acct}))
+    if harvestable:
+        chain.sleep(HARVEST_DELAY)
+        try:
+            gas["harvest"] = _gas(Contract.from_abi("Plugin", lender.address, HARVEST_ABI).harvest({"from": acct}))
+        except VirtualMachineError:
+            # nothing to claim on this market, leave the size out
+            pass
+    gas["withdrawAll"] = _gas(lender.withdrawAll({"from": acct}))
+    return gas
+
+
+def calibrate(registry, strategy, sizes=SIZES):
+    strategy = _strategy(strategy)
+    want = interface.ERC20(strategy.want())
+    unit = 10 ** want.decimals()
+    chain_id, block = web3.eth.chain_id, web3.eth.block_number
+    tend = send_tend(strategy)
+
+    _fund(strategy.address)
+    acct = accounts.at(strategy.address, force=True)
+    lenders = [interface.IGenericLender(strategy.lenders(i)) for i in range(strategy.numLenders())]
+    for lender in lenders:
+        if lender.hasAssets():
+            lender.withdrawAll({"from": acct})
+    available = want.balanceOf(strategy)
+
+    chain.snapshot()
+    for lender in lenders:
+        name = plugin_name(lender.address)
+        gas = {op: {} for op in gas_registry.OPERATIONS}
+        for size in sizes:
+            if size * unit > available:
+                print(f"  {lender.lenderName()}: only {available / unit:,.0f} to deposit, skipping {size:,}")
+                continue
+            for op, used in measure(lender, want, acct, size * unit, _harvestable(name)).items():
+                gas[op][size] = used
+            chain.revert()
+        gas_registry.record_lender(registry, chain_id, block, lender.address, name, lender.lenderName(), strategy.address, gas)
+        print(f"  {lender.lenderName()} ({name}) [{lender.address}]: {gas}")
+
+    moved = 0
+    if "lowest" in tend:
+        moved += gas_registry.gas_at(registry, chain_id, tend["lowest"], "withdrawAll", tend["withdrawn"] / unit) or 0
+    deposited = tend["loose"] + tend["withdrawn"]
+    if deposited > 0:
+        moved += gas_registry.gas_at(registry, chain_id, tend["highest"], "deposit", deposited / unit) or 0
+    base = max(tend["gas"] - moved, 0)
+    gas_registry.record_strategy(registry, chain_id, strategy.address, base)
+    print(f"  tend base gas {base}")
+
+
+def main(output="gas/registry.json", strategies=None):
+    registry = gas_registry.load(output)
+    if strategies is None:
+        strategies = [deploy_mocks().address]
+    else:
+        strategies = strategies.split(",")
+    for strategy in strategies:
+        print(f"calibrating {strategy}")
+        calibrate(registry, strategy)
+    gas_registry.save(registry, output)
+    print(f"written to {output}")
+
+
+def apply(strategy, path="gas/registry.json", keeper_call_gas=DEFAULT_TRIGGER_GAS, account="yd"):
+    registry = gas_registry.load(path)
+    chain_id = web3.eth.chain_id
+    base = gas_registry.tend_base_gas(registry, chain_id, str(strategy))
+    if base is None:
+        raise ValueError(f"no tend has been measured on chain {chain_id}, run main on a fork first")
+
+    acct = accounts.load(account)
+    strategy = _strategy(strategy)
+    unit = 10 ** interface.ERC20(strategy.want()).decimals()
+    # a tend deposits about everything the strategy has
+    total = strategy.estimatedTotalAssets() / unit
+
+    for i in range(strategy.numLenders()):
+        lender = strategy.lenders(i)
+        name = plugin_name(lender)
+        nav = interface.IGenericLender(lender).nav() / unit
+        withdraw_all = gas_registry.gas_at(registry, chain_id, lender, "withdrawAll", nav or total, name)
+        deposit = gas_registry.gas_at(registry, chain_id, lender, "deposit", total, name)
+        if withdraw_all is None or deposit is None:
+            print(f"  {lender}: not in {path}, tendTrigger keeps using callCost for it")
+            continue
+        strategy.setLenderGas(lender, withdraw_all, deposit, {"from": acct})
+    strategy.setTendGas(base, int(keeper_call_gas), {"from": acct})
@@ -0,0 +1,125 @@
+"""
+Reads and writes the gas table scripts/gas_calibration.py produces.
+
+Everything is per chain id, sizes are whole tokens so plugins on wants with
+different decimals line up:
+
+    {
+      "version": 2,
+      "chains": {
+        "1": {
+          "block": 17000000,
+          "sizes": [100, 10000, 1000000],
+          "strategies": {"0xStrategy": {"tendBaseGas": 95000}},
+          "lenders": {
+            "0xLender": {"plugin": "GenericAaveV3", "lenderName": "AaveV3", "strategy": "0xStrategy",
+                         "gas": {"deposit": {"100": 180000, ...}, "withdrawAll": {...}, ...}}
+          },
+          "plugins": {"GenericAaveV3": {"deposit": {"100": 180000, ...}, ...}}
+        }
+      }
+    }
+
+Operations are OPERATIONS, a size the lender could not be given is missing.
+A plugin keeps the most any of its lenders used, so a lender that was never
+measured is priced from its plugin on the safe side.
+
+No brownie in here, the keeper and the backtester read it too.
+"""
+import json
+import math
+import os
+
+FORMAT_VERSION = 2
+OPERATIONS = ["deposit", "withdraw", "withdrawAll", "harvest", "aprAfterDeposit"]
+
+
+def empty():
+    return {"version": FORMAT_VERSION, "chains": {}}
+
+
+def load(path):
+    if not os.path.exists(path):
+        return empty()
+    with open(path) as f:
+        registry = json.load(f)
+    if registry.get("version") != FORMAT_VERSION:
+        raise ValueError(f"gas registry format {registry.get('version')} is not {FORMAT_VERSION}")
+    return registry
+
+
+def save(registry, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+
+
+def _chain(registry, chain_id):
+    return registry["chains"].setdefault(
+        str(chain_id), {"block": 0, "sizes": [], "strategies": {}, "lenders": {}, "plugins": {}}
+    )
+
+
+def record_lender(registry, chain_id, block, address, plugin, lender_name, strategy, gas):
+    """
+    Adds one lender's measurements, `gas` is {operation: {size: gas}}.
+    Replaces what was there for the lender and folds it into its plugin.
+    """
+    chain = _chain(registry, chain_id)
+    chain["block"] = max(chain["block"], int(block))
+    gas = {op: {str(size): used for size, used in sizes.items()} for op, sizes in gas.items()}
+    chain["lenders"][address] = {"plugin": plugin, "lenderName": lender_name, "strategy": strategy, "gas": gas}
+    chain["sizes"] = sorted({int(s) for sizes in gas.values() for s in sizes} | set(chain["sizes"]))
+
+    if plugin is None:
+        return
+    merged = chain["plugins"].setdefault(plugin, {})
+    for op, sizes in gas.items():
+        for size, used in sizes.items():
+            if used is None:
+                continue
+            merged.setdefault(op, {})[size] = max(used, merged.get(op, {}).get(size, 0))
+
+
+def record_strategy(registry, chain_id, strategy, tend_base_gas):
+    _chain(registry, chain_id)["strategies"][strategy] = {"tendBaseGas": int(tend_base_gas)}
+
+
+def _nearest(sizes, op, size):
+    measured = {int(s): used for s, used in sizes.get(op, {}).items() if used is not None}
+    if not measured:
+        return None
+    if size is None:
+        return max(measured.values())
+    # on a log scale, gas grows with the number of digits if at all
+    nearest = min(measured, key=lambda s: abs(math.log(s) - math.log(max(size, 1))))
+    return measured[nearest]
+
+
+def gas_at(registry, chain_id, lender, op, size=None, plugin=None):
+    """
+    Gas of `op` on `lender` at the measured size nearest to `size` whole
+    tokens, the most measured if size is None. Falls back to the lender's
+    plugin, or `plugin` for a lender that is not in the table. None if
+    nothing was measured.
+    """
+    chain = registry["chains"].get(str(chain_id))
+    if chain is None:
+        return None
+    entry = chain["lenders"].get(lender)
+    if entry is not None:
+        used = _nearest(entry["gas"], op, size)
+        if used is not None:
+            return used
+        plugin = entry["plugin"]
+    if plugin is None or plugin not in chain["plugins"]:
+        return None
+    return _nearest(chain["plugins"][plugin], op, size)
+
+
+def tend_base_gas(registry, chain_id, strategy):
+    """base gas measured on `strategy`, else the most any strategy on the chain used"""
+    strategies = registry["chains"].get(str(chain_id), {}).get("strategies", {})
+    if strategy in strategies:
+        return strategies[strategy]["tendBaseGas"]
+    return max((s["tendBaseGas"] for s in strategies.values()), default=None)
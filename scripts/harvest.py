@@ -1,51 +1,91 @@
-from functools import partialmethod
-from pathlib import Path
-from pdb import pm
-import yaml
-import click
-import os
-from brownie import interface, config, accounts, Contract, project, OptStrategy, GenericAaveV3, network, web3
-from eth_utils import is_checksum_address
+"""
+Harvests the due plugins and then the strategy in one transaction through
+LenderHarvester.
 
-yearnDep = config["dependencies"][0]
-Vault = project.load(yearnDep).Vault
+    brownie run harvest main 0xHarvester --network optimism-main
+    brownie run harvest main 0xHarvester 0xStrategy --network optimism-main
+    brownie run harvest setup --network optimism-main
 
-acct = accounts.load("yd")
+`setup` deploys the harvester and hands it the strategy keeper and the plugin
+keep3r roles, then prints the address to pass to `main`. The account needs
+management on the strategy and plugins. A plugin with a keep3r but no
+harvestTrigger (GenericAaveMorpho) is put on the harvester's alwaysHarvest
+list, plugins with neither are left out.
+"""
+from brownie import Contract, LenderHarvester, OptStrategy, accounts, interface, web3
+from brownie.exceptions import VirtualMachineError
 
-dev = acct
-#token = Contract("0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83")
-#gov = "0x72a34AbafAB09b15E7191822A679f28E067C4a16"
-#rewards = "0x89716Ad7EDC3be3B35695789C475F3e7A3Deb12a"
-#registry = Contract("0x727fe1759430df13655ddb0731dE0D0FDE929b04")
-#vault = Vault.at("0x27cbf0fddb356a2d1EBdef604Cfa90F8f300d34E")
-strategy = OptStrategy.at("0x2e98053f4A1b2595bfaA4d0Ad0a450F8DEb8BBCC") #None
+STRATEGY = "0x2e98053f4A1b2595bfaA4d0Ad0a450F8DEb8BBCC"
 
-param = { "from": acct}
+# gas a harvest is expected to use, priced into the plugin triggers
+HARVEST_GAS = 1_000_000
 
-def harvest_lender():
+# the keep3r parts of GenericAaveV3, GenericCompoundV3 and GenericAaveMorpho.
+# GenericAaveMorpho has no harvestTrigger
+PLUGIN_ABI = [
+    {
+        "name": "harvestTrigger",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "callCost", "type": "uint256"}],
+        "outputs": [{"name": "", "type": "bool"}],
+    },
+    {
+        "name": "keep3r",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "address"}],
+    },
+    {
+        "name": "setKeep3r",
+        "type": "function",
+        "stateMutability": "nonpayable",
+        "inputs": [{"name": "_keep3r", "type": "address"}],
+        "outputs": [],
+    },
+]
 
-    print("Harvesting the Gen Lender base strategy")
-    strategy.harvest(param)
 
-    print("Harvested plug in")
-  
-    
-def harvest_plugin():
+def due_plugins(harvester, strategy, call_cost):
+    due = harvester.duePlugins(strategy, call_cost)
+    for plugin in due:
+        print(f"  {interface.IGenericLender(plugin).lenderName()} [{plugin}] is due")
+    return list(due)
 
-    print("HArvesting new Aave V3 Gen Lender...")
-    v3 = GenericAaveV3.at("0x4806cf1caD561AC271F64dA86423Ea06255E4e06")
 
-    v3.harvest(param)
+def setup(strategy=STRATEGY):
+    acct = accounts.load("yd")
+    strategy = OptStrategy.at(strategy)
+    harvester = acct.deploy(LenderHarvester)
 
-    print(f"Harvested plug in")
+    strategy.setKeeper(harvester, {"from": acct})
+    for i in range(strategy.numLenders()):
+        plugin = Contract.from_abi("Plugin", strategy.lenders(i), PLUGIN_ABI)
+        try:
+            plugin.keep3r()
+        except (ValueError, VirtualMachineError):
+            # no keep3r, nothing for the harvester to call
+            continue
+        try:
+            plugin.harvestTrigger(0)
+        except (ValueError, VirtualMachineError):
+            # harvest() but no trigger, harvested in every batch
+            harvester.setAlwaysHarvest(plugin, True, {"from": acct})
+        plugin.setKeep3r(harvester, {"from": acct})
 
-def main():
-    #print(project.load(yearnDep))
-    #global dev
-    #dev = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
-    print(f"You are using: 'dev' [{dev.address}]")
+    print(f"LenderHarvester at {harvester}, run: brownie run harvest main {harvester} {strategy}")
 
-    print("Cloning Vault")
-    #clone_vault()
-    harvest_plugin()
-    harvest_lender()
+
+def main(harvester, strategy=STRATEGY):
+    acct = accounts.load("yd")
+    print(f"You are using: 'dev' [{acct.address}]")
+    harvester = LenderHarvester.at(harvester)
+    strategy = OptStrategy.at(strategy)
+
+    print(f"Harvesting {strategy.name()} [{strategy}]")
+    plugins = due_plugins(harvester, strategy, HARVEST_GAS * web3.eth.gas_price)
+
+    # the batch is built here so the transaction skips the trigger calls
+    tx = harvester.harvestWith(strategy, plugins, {"from": acct})
+    print(f"Harvested {len(plugins)} plugins and the strategy, gas used {tx.gas_used}")
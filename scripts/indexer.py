@@ -0,0 +1,359 @@
+"""
+Indexes the events of our strategies, their lenders and vaults into sqlite.
+
+    python -m scripts.indexer data/events.sqlite 0xStrategy 0xStrategy2 --rpc $RPC_URL --start 15000000
+    python -m scripts.indexer data/events.sqlite 0xStrategy --rpc $RPC_URL --follow --confirmations 3
+
+Indexed events
+    Harvested, Cloned           from the strategies and lenders
+    Deposit, Withdraw           from their vaults
+    StrategyReported            from the vaults, for our strategies only
+    Transfer                    of any token, from or to a strategy or lender
+
+Logs are fetched `batch` blocks at a time, the range is halved whenever the
+node refuses it. The vault and lenders of every strategy are looked up at
+the head on each pass and kept in `contracts`, so a lender that was removed
+is still followed.
+
+Every block that produced an event, and the last block of every range, is
+kept in `blocks` with its hash. That is the checkpoint: a restart carries on
+after the highest block. Before each range the stored hashes are compared
+with the chain from the top down. Everything above the highest block that
+still matches is deleted and indexed again, which is how a reorg is undone.
+
+Args are stored as json, `subject` is the strategy or lender the event is
+about so queries by it hit an index:
+
+    SELECT block, args FROM events
+    WHERE subject = ? AND event = 'StrategyReported' ORDER BY block
+
+Decode args with json.loads like EventStore.events does. sqlite's json
+functions return uint256 amounts past 2**63 as a float.
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import time
+
+from web3 import Web3
+from web3._utils.events import get_event_data
+
+log = logging.getLogger("indexer")
+
+DEFAULT_BATCH = 2_000
+# stored blocks compared against the chain before giving up on finding the fork point
+REORG_DEPTH = 256
+
+
+def _event(name, *inputs):
+    return {
+        "name": name,
+        "type": "event",
+        "anonymous": False,
+        "inputs": [{"name": n, "type": t, "indexed": indexed} for n, t, indexed in inputs],
+    }
+
+
+def _view(name, inputs, output):
+    return {
+        "name": name,
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "", "type": t} for t in inputs],
+        "outputs": [{"name": "", "type": output}],
+    }
+
+
+# BaseStrategy and Vault of yearn-vaults 0.4.3, Cloned from the strategies and GenericLenderBase
+OWN_EVENTS = [
+    _event(
+        "Harvested",
+        ("profit", "uint256", False),
+        ("loss", "uint256", False),
+        ("debtPayment", "uint256", False),
+        ("debtOutstanding", "uint256", False),
+    ),
+    _event("Cloned", ("clone", "address", True)),
+]
+VAULT_EVENTS = [
+    _event("Deposit", ("recipient", "address", True), ("shares", "uint256", False), ("amount", "uint256", False)),
+    _event("Withdraw", ("recipient", "address", True), ("shares", "uint256", False), ("amount", "uint256", False)),
+]
+REPORTED = _event(
+    "StrategyReported",
+    ("strategy", "address", True),
+    ("gain", "uint256", False),
+    ("loss", "uint256", False),
+    ("debtPaid", "uint256", False),
+    ("totalGain", "uint256", False),
+    ("totalLoss", "uint256", False),
+    ("totalDebt", "uint256", False),
+    ("debtAdded", "uint256", False),
+    ("debtRatio", "uint256", False),
+)
+TRANSFER = _event("Transfer", ("from", "address", True), ("to", "address", True), ("value", "uint256", False))
+
+STRATEGY_ABI = [
+    _view("vault", [], "address"),
+    _view("numLenders", [], "uint256"),
+    _view("lenders", ["uint256"], "address"),
+]
+
+
+def topic(event):
+    signature = f"{event['name']}({','.join(i['type'] for i in event['inputs'])})"
+    return Web3.keccak(text=signature).hex().removeprefix("0x")
+
+
+def _address_topic(address):
+    return "0x" + "0" * 24 + address[2:].lower()
+
+
+def _hex(value):
+    return value.hex().removeprefix("0x") if isinstance(value, (bytes, bytearray)) else value.removeprefix("0x")
+
+
+TOPICS = {topic(e): e for e in OWN_EVENTS + VAULT_EVENTS + [REPORTED, TRANSFER]}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    address TEXT NOT NULL,
+    event TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_subject ON events (subject, event, block);
+CREATE INDEX IF NOT EXISTS events_address ON events (address, event, block);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contracts (
+    address TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    strategy TEXT
+);
+"""
+
+
+class EventStore:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def checkpoint(self):
+        """highest indexed block, None before the first range"""
+        row = self.db.execute("SELECT MAX(number) FROM blocks").fetchone()
+        return row[0]
+
+    def recent_blocks(self, depth=REORG_DEPTH):
+        return self.db.execute("SELECT number, hash FROM blocks ORDER BY number DESC LIMIT ?", (depth,)).fetchall()
+
+    def rollback(self, block):
+        """forgets everything above `block`"""
+        with self.db:
+            self.db.execute("DELETE FROM events WHERE block > ?", (block,))
+            self.db.execute("DELETE FROM blocks WHERE number > ?", (block,))
+
+    def add_contracts(self, rows):
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO contracts VALUES (?, ?, ?)", rows)
+
+    def contracts(self, kind=None, strategy=None):
+        query, params = "SELECT address FROM contracts WHERE 1", []
+        for clause, value in (("kind = ?", kind), ("strategy = ?", strategy)):
+            if value is not None:
+                query += f" AND {clause}"
+                params.append(value)
+        return [r[0] for r in self.db.execute(query, params)]
+
+    def write(self, events, blocks):
+        """one range, events and the block hashes they were read at in one transaction"""
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", events)
+            self.db.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", blocks)
+
+    def transfers(self, subjects):
+        """(block, tx, token, from, to, value) of every Transfer about `subjects`, in chain order"""
+        marks = ",".join("?" * len(subjects))
+        query = (
+            f"SELECT block, tx, address, args FROM events WHERE event = 'Transfer' AND subject IN ({marks}) "
+            "ORDER BY block, log_index"
+        )
+        # decoded here, json_extract would round values past 2**63
+        rows = []
+        for block, tx, token, args in self.db.execute(query, list(subjects)):
+            args = json.loads(args)
+            rows.append((block, tx, token, args["from"], args["to"], args["value"]))
+        return rows
+
+    def events(self, subject=None, event=None, start=None, end=None):
+        query, params = "SELECT block, log_index, tx, address, event, subject, args FROM events WHERE 1", []
+        for clause, value in (("subject = ?", subject), ("event = ?", event), ("block >= ?", start), ("block <= ?", end)):
+            if value is not None:
+                query += f" AND {clause}"
+                params.append(value)
+        rows = self.db.execute(query + " ORDER BY block, log_index", params)
+        return [dict(zip(("block", "logIndex", "tx", "address", "event", "subject"), r[:6]), args=json.loads(r[6])) for r in rows]
+
+
+class Indexer:
+    def __init__(self, w3, store, strategies, batch=DEFAULT_BATCH, confirmations=0):
+        self.w3 = w3
+        self.store = store
+        self.strategies = [Web3.to_checksum_address(s) for s in strategies]
+        self.batch = batch
+        self.confirmations = confirmations
+
+    def discover(self):
+        rows = []
+        for address in self.strategies:
+            strategy = self.w3.eth.contract(address, abi=STRATEGY_ABI)
+            rows.append((address, "strategy", address))
+            rows.append((strategy.functions.vault().call(), "vault", address))
+            for i in range(strategy.functions.numLenders().call()):
+                rows.append((strategy.functions.lenders(i).call(), "lender", address))
+        self.store.add_contracts(rows)
+
+    def _filters(self):
+        strategies = self.store.contracts("strategy")
+        own = strategies + self.store.contracts("lender")
+        vaults = self.store.contracts("vault")
+        own_topics = [_address_topic(a) for a in own]
+        filters = [
+            {"address": own, "topics": [["0x" + topic(e) for e in OWN_EVENTS]]},
+            {"address": vaults, "topics": [["0x" + topic(e) for e in VAULT_EVENTS]]},
+            {"address": vaults, "topics": ["0x" + topic(REPORTED), [_address_topic(a) for a in strategies]]},
+            {"address": None, "topics": ["0x" + topic(TRANSFER), own_topics]},
+            {"address": None, "topics": ["0x" + topic(TRANSFER), None, own_topics]},
+        ]
+        # an empty address list would match every contract
+        return [{k: v for k, v in f.items() if v is not None} for f in filters if f["address"] != [] and own_topics]
+
+    def _logs(self, start, end):
+        logs = {}
+        for params in self._filters():
+            for entry in self.w3.eth.get_logs(dict(params, fromBlock=start, toBlock=end)):
+                logs[(entry["blockNumber"], entry["logIndex"])] = entry
+        return [logs[k] for k in sorted(logs)]
+
+    def _row(self, entry, own):
+        event = TOPICS[_hex(entry["topics"][0])]
+        decoded = get_event_data(self.w3.codec, event, entry)
+        args = dict(decoded["args"])
+        address = entry["address"]
+        if event["name"] == "StrategyReported":
+            subject = args["strategy"]
+        elif event["name"] == "Transfer":
+            subject = args["to"] if args["to"] in own else args["from"]
+        else:
+            subject = address
+        return (
+            entry["blockNumber"],
+            entry["logIndex"],
+            "0x" + _hex(entry["transactionHash"]),
+            address,
+            event["name"],
+            subject,
+            json.dumps(args),
+        )
+
+    def _header(self, number):
+        block = self.w3.eth.get_block(number)
+        return (number, "0x" + _hex(block["hash"]), block["timestamp"])
+
+    def index_range(self, start, end):
+        """
+        Fetches and stores start..end. False if a log's block was replaced
+        while reading, the caller checks for a reorg and tries again.
+        """
+        logs = self._logs(start, end)
+        own = set(self.store.contracts("strategy") + self.store.contracts("lender"))
+        headers = {n: self._header(n) for n in sorted({e["blockNumber"] for e in logs} | {end})}
+        for entry in logs:
+            if "0x" + _hex(entry["blockHash"]) != headers[entry["blockNumber"]][1]:
+                return False
+        self.store.write([self._row(e, own) for e in logs], list(headers.values()))
+        return True
+
+    def unwind(self):
+        """rolls back to the highest stored block still on the chain, returns it"""
+        recent = self.store.recent_blocks()
+        for number, stored in recent:
+            if "0x" + _hex(self.w3.eth.get_block(number)["hash"]) == stored:
+                if number != recent[0][0]:
+                    log.warning("reorg, rolling back to block %s", number)
+                    self.store.rollback(number)
+                return number
+        if recent:
+            raise RuntimeError(f"none of the last {len(recent)} stored blocks are on the chain, reindex from scratch")
+        return None
+
+    def sync(self, start=None, end=None):
+        """indexes up to `end`, the confirmed head by default. Returns the last block indexed"""
+        self.discover()
+        last = self.unwind()
+        if end is None:
+            end = self.w3.eth.block_number - self.confirmations
+        if last is None:
+            if start is None:
+                raise ValueError("nothing indexed yet, give a start block")
+            last = start - 1
+
+        batch = self.batch
+        while last < end:
+            stop = min(last + batch, end)
+            try:
+                complete = self.index_range(last + 1, stop)
+            except Exception as e:
+                # too many results or too wide a range for the node
+                if batch == 1:
+                    raise
+                batch = max(batch // 2, 1)
+                log.info("range %s-%s refused (%s), trying %s blocks", last + 1, stop, e, batch)
+                continue
+            if not complete:
+                last = self.unwind()
+                continue
+            log.info("indexed %s-%s", last + 1, stop)
+            last = stop
+            batch = min(batch * 2, self.batch)
+        return last
+
+    def follow(self, start=None, interval=12):
+        while True:
+            self.sync(start)
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db")
+    parser.add_argument("strategies", nargs="+")
+    parser.add_argument("--rpc", required=True)
+    parser.add_argument("--start", type=int, help="first block, only needed for a new database")
+    parser.add_argument("--end", type=int)
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--confirmations", type=int, default=0)
+    parser.add_argument("--follow", action="store_true", help="keep indexing new blocks")
+    parser.add_argument("--interval", type=float, default=12)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    w3 = Web3(Web3.HTTPProvider(args.rpc, request_kwargs={"timeout": 60}))
+    indexer = Indexer(w3, EventStore(args.db), args.strategies, args.batch, args.confirmations)
+    if args.follow:
+        indexer.follow(args.start, args.interval)
+    else:
+        indexer.sync(args.start, args.end)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
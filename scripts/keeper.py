@@ -0,0 +1,286 @@
+"""
+Keeper for generic lender strategies and their plugins on any number of chains.
+
+    python -m scripts.keeper keeper.yaml [--once] [--dry-run]
+
+Every poll checks each strategy's harvestTrigger and tendTrigger and the
+harvestTrigger of each plugin concurrently, then queues whatever is due.
+Each chain has a single sender that owns the keeper's nonce, so transactions
+for many strategies go out back to back without waiting on each other.
+Plugins are sent before their strategy so the rewards they sell are picked up
+by the same report. Cached price oracles (CachedWantToEthOracle) are updated
+whenever their needsUpdate is true.
+
+    poll_interval: 60
+    chains:
+      optimism:
+        rpc: https://mainnet.optimism.io
+        key_env: OPT_KEEPER_KEY      # env var holding the keeper private key
+        trigger_gas: 1000000         # gas used to price callCost for the triggers
+        gas_registry: gas/registry.json  # optional, plugin harvest gas from scripts/gas_calibration.py
+        max_gas_price_gwei: 0.1      # skip the cycle above this
+        strategies:
+          - address: "0x2e98053f4A1b2595bfaA4d0Ad0a450F8DEb8BBCC"
+            # optional, defaults to every lender on the strategy
+            plugins: ["0x4806cf1caD561AC271F64dA86423Ea06255E4e06"]
+        oracles: ["0x..."]           # optional, CachedWantToEthOracle to refresh
+
+The keeper account has to be the strategy keeper and the plugin keep3r (or
+strategist/governance), and a keeper on the oracles. A strategy with a gas
+table (scripts/gas_calibration.py) rescales callCost from its keeperCallGas,
+which has to match trigger_gas.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+import yaml
+from web3 import Web3
+
+from scripts import gas_registry
+
+log = logging.getLogger("keeper")
+
+# 1m gas like DEFAULT_CALL_COST in snapshot.py
+DEFAULT_TRIGGER_GAS = 1_000_000
+# receipts that take longer are assumed dropped and the nonce is resynced once
+# nothing else is waiting to be mined
+RECEIPT_TIMEOUT = 600
+
+
+def _fn(name, inputs=(), outputs=(), mutability="view"):
+    return {
+        "name": name,
+        "type": "function",
+        "stateMutability": mutability,
+        "inputs": [{"name": "", "type": t} for t in inputs],
+        "outputs": [{"name": "", "type": t} for t in outputs],
+    }
+
+
+STRATEGY_ABI = [
+    _fn("harvestTrigger", ["uint256"], ["bool"]),
+    _fn("tendTrigger", ["uint256"], ["bool"]),
+    _fn("numLenders", [], ["uint256"]),
+    _fn("lenders", ["uint256"], ["address"]),
+    _fn("harvest", mutability="nonpayable"),
+    _fn("tend", mutability="nonpayable"),
+]
+PLUGIN_ABI = [
+    _fn("harvestTrigger", ["uint256"], ["bool"]),
+    _fn("harvest", mutability="nonpayable"),
+]
+ORACLE_ABI = [
+    _fn("needsUpdate", [], ["bool"]),
+    _fn("update", mutability="nonpayable"),
+]
+
+
+class ChainKeeper:
+    def __init__(self, name, settings, dry_run=False):
+        self.name = name
+        self.w3 = Web3(Web3.HTTPProvider(settings["rpc"], request_kwargs={"timeout": 60}))
+        self.account = self.w3.eth.account.from_key(os.environ[settings["key_env"]])
+        self.trigger_gas = settings.get("trigger_gas", DEFAULT_TRIGGER_GAS)
+        cap = settings.get("max_gas_price_gwei")
+        self.max_gas_price = Web3.to_wei(cap, "gwei") if cap is not None else None
+        path = settings.get("gas_registry")
+        self.registry = gas_registry.load(path) if path else None
+        self.chain_id = None
+        self.dry_run = dry_run
+
+        self.strategies = []
+        for entry in settings["strategies"]:
+            strategy = self.w3.eth.contract(Web3.to_checksum_address(entry["address"]), abi=STRATEGY_ABI)
+            self.strategies.append((strategy, entry.get("plugins")))
+        self.oracles = [
+            self.w3.eth.contract(Web3.to_checksum_address(a), abi=ORACLE_ABI) for a in settings.get("oracles", [])
+        ]
+
+        self.queue = asyncio.Queue()
+        # (address, function) already queued or waiting for a receipt
+        self.in_flight = set()
+        self.nonce = None
+        # sent and waiting for a receipt
+        self.unconfirmed = 0
+        # a transaction was dropped, resync the nonce when unconfirmed reaches 0
+        self.stale = False
+
+    async def _call(self, fn, *args):
+        return await asyncio.to_thread(fn(*args).call)
+
+    async def _plugins(self, strategy, configured):
+        if configured is not None:
+            addresses = configured
+        else:
+            count = await self._call(strategy.functions.numLenders)
+            addresses = await asyncio.gather(*[self._call(strategy.functions.lenders, i) for i in range(count)])
+        return [self.w3.eth.contract(Web3.to_checksum_address(a), abi=PLUGIN_ABI) for a in addresses]
+
+    async def _trigger(self, contract, name, call_cost, plugin=False):
+        try:
+            return await self._call(getattr(contract.functions, name), call_cost)
+        except Exception as e:
+            if plugin:
+                # not every plugin has a harvestTrigger
+                log.debug("%s %s.%s reverted: %s", self.name, contract.address, name, e)
+            else:
+                log.warning("%s %s.%s failed: %s", self.name, contract.address, name, e)
+            return False
+
+    def plugin_call_cost(self, plugin, gas_price):
+        """callCost for a plugin harvestTrigger, its measured harvest gas when the registry has it"""
+        gas = None
+        if self.registry is not None:
+            gas = gas_registry.gas_at(self.registry, self.chain_id, plugin, "harvest")
+        return gas_price * (gas or self.trigger_gas)
+
+    async def _check_strategy(self, strategy, configured, gas_price):
+        call_cost = gas_price * self.trigger_gas
+        plugins = await self._plugins(strategy, configured)
+        checks = [self._trigger(p, "harvestTrigger", self.plugin_call_cost(p.address, gas_price), True) for p in plugins]
+        checks += [self._trigger(strategy, "harvestTrigger", call_cost), self._trigger(strategy, "tendTrigger", call_cost)]
+        *plugins_due, harvest, tend = await asyncio.gather(*checks)
+
+        due = [(plugin, "harvest") for plugin, is_due in zip(plugins, plugins_due) if is_due]
+        # a harvest also adjusts the position so tend is only needed on its own
+        if harvest:
+            due.append((strategy, "harvest"))
+        elif tend:
+            due.append((strategy, "tend"))
+        return due
+
+    async def _check_oracle(self, oracle):
+        try:
+            due = await self._call(oracle.functions.needsUpdate)
+        except Exception as e:
+            log.warning("%s oracle %s check failed: %s", self.name, oracle.address, e)
+            return []
+        return [(oracle, "update")] if due else []
+
+    async def poll(self):
+        gas_price = await asyncio.to_thread(lambda: self.w3.eth.gas_price)
+        if self.max_gas_price is not None and gas_price > self.max_gas_price:
+            log.info("%s gas price %s gwei above cap, skipping", self.name, Web3.from_wei(gas_price, "gwei"))
+            return
+        if self.registry is not None and self.chain_id is None:
+            self.chain_id = await asyncio.to_thread(lambda: self.w3.eth.chain_id)
+
+        # queued ahead of the strategies so the update is mined before their harvests
+        for due in await asyncio.gather(*[self._check_oracle(o) for o in self.oracles]):
+            await self._queue(due)
+
+        results = await asyncio.gather(
+            *[self._check_strategy(s, plugins, gas_price) for s, plugins in self.strategies], return_exceptions=True
+        )
+        for (strategy, _), due in zip(self.strategies, results):
+            if isinstance(due, Exception):
+                log.warning("%s %s check failed: %s", self.name, strategy.address, due)
+                continue
+            await self._queue(due)
+
+    async def _queue(self, due):
+        for contract, function in due:
+            key = (contract.address, function)
+            if key not in self.in_flight:
+                self.in_flight.add(key)
+                await self.queue.put((contract, function))
+
+    def _fees(self):
+        block = self.w3.eth.get_block("latest")
+        if block.get("baseFeePerGas") is None:
+            return {"gasPrice": self.w3.eth.gas_price}
+        tip = self.w3.eth.max_priority_fee
+        return {"maxFeePerGas": 2 * block["baseFeePerGas"] + tip, "maxPriorityFeePerGas": tip}
+
+    def _send(self, contract, function):
+        if self.nonce is None:
+            self.nonce = self.w3.eth.get_transaction_count(self.account.address, "pending")
+
+        fn = getattr(contract.functions, function)()
+        tx = fn.build_transaction({"from": self.account.address, "nonce": self.nonce, **self._fees()})
+        tx["gas"] = int(self.w3.eth.estimate_gas(tx) * 1.2)
+        signed = self.account.sign_transaction(tx)
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        tx_hash = self.w3.eth.send_raw_transaction(raw)
+        self.nonce += 1
+        return tx_hash
+
+    async def _confirm(self, key, tx_hash):
+        try:
+            receipt = await asyncio.to_thread(self.w3.eth.wait_for_transaction_receipt, tx_hash, RECEIPT_TIMEOUT)
+            log.info("%s %s.%s mined, status %s gas %s", self.name, *key, receipt["status"], receipt["gasUsed"])
+        except Exception as e:
+            log.warning("%s %s.%s not mined: %s", self.name, *key, e)
+            self.stale = True
+        finally:
+            self.in_flight.discard(key)
+            self.unconfirmed -= 1
+            # the later transactions hold nonces above the dropped one, so only
+            # read the pending count again once they are all resolved
+            if self.stale and self.unconfirmed == 0:
+                self.nonce = None
+                self.stale = False
+
+    async def sender(self):
+        """the only task that sends from this chain's keeper account"""
+        while True:
+            contract, function = await self.queue.get()
+            key = (contract.address, function)
+            try:
+                if self.dry_run:
+                    log.info("%s would call %s.%s", self.name, *key)
+                    self.in_flight.discard(key)
+                    continue
+                tx_hash = await asyncio.to_thread(self._send, contract, function)
+                self.unconfirmed += 1
+                log.info("%s sent %s.%s %s", self.name, *key, tx_hash.hex())
+                asyncio.create_task(self._confirm(key, tx_hash))
+            except Exception as e:
+                log.warning("%s %s.%s failed: %s", self.name, *key, e)
+                self.in_flight.discard(key)
+                # whatever went wrong, read the nonce again before the next send,
+                # or once the transactions already out are mined
+                if self.unconfirmed:
+                    self.stale = True
+                else:
+                    self.nonce = None
+            finally:
+                self.queue.task_done()
+
+
+async def run(config, once=False, dry_run=False):
+    keepers = [ChainKeeper(name, settings, dry_run) for name, settings in config["chains"].items()]
+    senders = [asyncio.create_task(k.sender()) for k in keepers]
+
+    while True:
+        results = await asyncio.gather(*[k.poll() for k in keepers], return_exceptions=True)
+        for keeper, result in zip(keepers, results):
+            if isinstance(result, Exception):
+                log.warning("%s poll failed: %s", keeper.name, result)
+        if once:
+            await asyncio.gather(*[k.queue.join() for k in keepers])
+            break
+        await asyncio.sleep(config.get("poll_interval", 60))
+
+    for task in senders:
+        task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config")
+    parser.add_argument("--once", action="store_true", help="poll once, send and exit")
+    parser.add_argument("--dry-run", action="store_true", help="log what is due without sending")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    asyncio.run(run(config, args.once, args.dry_run))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Monte Carlo of how much a withdrawal gets back when lenders are short of cash.
+
+    python -m scripts.liquidity_stress stress.json --scenarios 1000000
+
+liquidatePosition pays from loose want first, then _withdrawSome drains the
+lenders lowest apr first and stops once it has enough. A lender can only hand
+over what its market has in cash, so a large withdrawal during a utilization
+spike comes back short. Every scenario draws a withdrawal size and the cash
+of each market, and the whole batch is drained at once with cumulative sums.
+
+The spec is json, without the comments:
+
+    {
+      "loose": 0,
+      "withdrawal_threshold": 1e16,
+      "withdrawal": [1, 8],               # beta(a, b) share of total assets withdrawn
+      "event_probability": 0.05,          # chance all markets are stressed together
+      "lenders": [
+        {"name": "Cream", "nav": 4e24, "apr": 3e16,
+         "supply": 40e24,                 # market supply without us
+         "utilization": [30, 10],         # beta(a, b) utilization on a normal day
+         "stressed_utilization": [50, 1]} # and during an event
+      ]
+    }
+
+Borrows are utilization * (supply + nav), so cash is what is left of that.
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+QUANTILES = [0.5, 0.95, 0.99, 0.999]
+
+
+def drain(needed, available, aprs, has_assets, loose=0, withdrawal_threshold=0):
+    """
+    Vectorised liquidatePosition. `needed` is (scenarios,), `available`,
+    `aprs` and `has_assets` are (scenarios, lenders) or (lenders,). Returns
+    what was received and how many lender withdraw calls it took.
+    """
+    needed = np.asarray(needed, dtype=np.float64)
+    scenarios = len(needed)
+    available = np.broadcast_to(np.asarray(available, dtype=np.float64), (scenarios, np.shape(available)[-1]))
+    aprs = np.broadcast_to(np.asarray(aprs), available.shape)
+    has_assets = np.broadcast_to(np.asarray(has_assets, dtype=bool), available.shape)
+
+    # lowest apr first, equal aprs in lender order like the insertion sort
+    order = np.argsort(aprs, axis=1, kind="stable")
+    available = np.take_along_axis(np.where(has_assets, available, 0.0), order, axis=1)
+    queued = np.take_along_axis(has_assets, order, axis=1)
+
+    short = needed - loose
+    # _withdrawSome ignores dust
+    need = np.where(short < withdrawal_threshold, 0.0, np.maximum(short, 0.0))
+
+    drained = np.cumsum(available, axis=1)
+    before = drained - available
+    withdrawn = np.minimum(need, drained[:, -1])
+    # a lender is called while what came before it is short
+    calls = ((before < need[:, None]) & queued).sum(axis=1)
+
+    # in full when the lenders covered the rest, keeps float rounding out of the shortfall
+    received = np.where(withdrawn >= short, needed, withdrawn + np.minimum(loose, needed))
+    return received, calls
+
+
+class StressTest:
+    def __init__(self, spec, seed=None):
+        self.spec = spec
+        self.lenders = spec["lenders"]
+        self.rng = np.random.default_rng(seed)
+
+        self.nav = np.array([float(l["nav"]) for l in self.lenders])
+        self.apr = np.array([float(l["apr"]) for l in self.lenders])
+        self.supply = np.array([float(l["supply"]) for l in self.lenders])
+        self.loose = float(spec.get("loose", 0))
+        self.withdrawal_threshold = float(spec.get("withdrawal_threshold", 0))
+
+    def _utilization(self, key, scenarios):
+        a = np.array([l[key][0] for l in self.lenders], dtype=np.float64)
+        b = np.array([l[key][1] for l in self.lenders], dtype=np.float64)
+        return self.rng.beta(a, b, size=(scenarios, len(self.lenders)))
+
+    def sample(self, scenarios):
+        """(withdrawals, cash available to us per lender) for each scenario"""
+        total = self.nav.sum() + self.loose
+        a, b = self.spec.get("withdrawal", [1, 8])
+        withdrawals = total * self.rng.beta(a, b, size=scenarios)
+
+        utilization = self._utilization("utilization", scenarios)
+        stressed = self.rng.random(scenarios) < self.spec.get("event_probability", 0)
+        if stressed.any():
+            utilization[stressed] = self._utilization("stressed_utilization", int(stressed.sum()))
+
+        market = self.supply + self.nav
+        cash = market * (1 - utilization)
+        return withdrawals, np.minimum(self.nav, cash)
+
+    def run(self, scenarios, chunk=250_000):
+        """shortfall and lender calls per scenario, sampled and drained `chunk` at a time"""
+        shortfall = np.empty(scenarios)
+        calls = np.empty(scenarios, dtype=np.int64)
+        for start in range(0, scenarios, chunk):
+            stop = min(start + chunk, scenarios)
+            withdrawals, available = self.sample(stop - start)
+            received, used = drain(
+                withdrawals, available, self.apr, self.nav > 0, self.loose, self.withdrawal_threshold
+            )
+            shortfall[start:stop] = withdrawals - received
+            calls[start:stop] = used
+        return shortfall, calls
+
+
+def summarize(shortfall, calls, total):
+    short = shortfall > 0
+    tail = np.sort(shortfall)[int(len(shortfall) * 0.99) :]
+    return {
+        "scenarios": len(shortfall),
+        "short_probability": float(short.mean()),
+        "mean_shortfall": float(shortfall.mean()),
+        "shortfall_quantiles": {str(q): float(np.quantile(shortfall, q)) for q in QUANTILES},
+        # mean of the worst 1%
+        "expected_shortfall_99": float(tail.mean()) if len(tail) else 0.0,
+        "worst_share_of_assets": float(shortfall.max() / total) if total else 0.0,
+        "calls_mean": float(calls.mean()),
+        "calls": {str(n): int(c) for n, c in enumerate(np.bincount(calls))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("spec")
+    parser.add_argument("--scenarios", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--debt-ratio", type=float, default=1.0, help="scale every lender nav, 0.5 halves them")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    for lender in spec["lenders"]:
+        lender["nav"] = float(lender["nav"]) * args.debt_ratio
+
+    stress = StressTest(spec, args.seed)
+    shortfall, calls = stress.run(args.scenarios)
+    print(json.dumps(summarize(shortfall, calls, stress.nav.sum() + stress.loose), indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
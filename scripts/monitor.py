@@ -0,0 +1,270 @@
+"""
+Streams the nav and apr changes of our lenders block by block.
+
+    python -m scripts.monitor 0xStrategy 0xStrategy2 --rpc wss://...
+    python -m scripts.monitor 0xStrategy --rpc http://127.0.0.1:8545 --webhook https://alerts.example/hook
+
+nav() and apr() of every lender are first run through eth_createAccessList
+to learn which storage slots they read: the lender's own, its aToken,
+cToken or comet balance and the market state behind the rate. On each new
+block those slots are read in one batch of eth_getStorageAt and only the
+lenders with a changed slot are called again. The slots of a lender whose
+values changed are looked up again, its code may have taken another branch.
+
+Interest that accrues with the timestamp changes no storage, so every lender
+is also read at least every `max_age` blocks. A node without
+eth_createAccessList leaves a lender without slots and it is read every
+block. The strategies are asked for their lenders every `rediscover` blocks.
+
+A websocket rpc is subscribed to newHeads, anything else is polled. When
+the monitor falls behind it skips to the head, a change is still reported
+once. Each change goes out as a json line on stdout, and to --webhook:
+
+    {"block": 17000000, "strategy": "0x..", "lender": "0x..", "nav": 1, "apr": 2,
+     "previous": {"nav": 1, "apr": 1}}
+
+previous is null the first time a lender is read.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import urllib.request
+
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3, WebSocketProvider
+
+log = logging.getLogger("monitor")
+
+DEFAULT_MAX_AGE = 300
+REDISCOVER = 100
+# requests per json-rpc batch
+BATCH_SIZE = 500
+
+NAV = "0x" + Web3.keccak(text="nav()").hex().removeprefix("0x")[:8]
+APR = "0x" + Web3.keccak(text="apr()").hex().removeprefix("0x")[:8]
+NUM_LENDERS = "0x" + Web3.keccak(text="numLenders()").hex().removeprefix("0x")[:8]
+LENDERS = "0x" + Web3.keccak(text="lenders(uint256)").hex().removeprefix("0x")[:8]
+
+
+def _uint(data):
+    return int.from_bytes(bytes(data)[:32], "big")
+
+
+def _slot(key):
+    return "0x" + bytes(key).hex() if isinstance(key, bytes) else key
+
+
+class Watch:
+    """what is known of one lender"""
+
+    def __init__(self, strategy, lender):
+        self.strategy = strategy
+        self.lender = lender
+        # (address, slot) nav and apr read
+        self.slots = []
+        self.values = {}
+        self.nav = None
+        self.apr = None
+        self.read_at = None
+
+    def due(self, values, block, max_age):
+        if self.read_at is None or not self.slots or block - self.read_at >= max_age:
+            return True
+        return any(values.get(slot) != self.values.get(slot) for slot in self.slots)
+
+
+class Monitor:
+    # alert is called on the event loop and must not block, run() passes a
+    # queue that deliver() empties
+    def __init__(self, w3, strategies, alert, max_age=DEFAULT_MAX_AGE, rediscover=REDISCOVER):
+        self.w3 = w3
+        self.strategies = [Web3.to_checksum_address(s) for s in strategies]
+        self.alert = alert
+        self.max_age = max_age
+        self.rediscover = rediscover
+        self.watches = {}
+        self.blocks_seen = 0
+
+    async def _batch(self, requests):
+        """[(method, args)] in batches, one by one if the node does not take batches"""
+        results = []
+        for start in range(0, len(requests), BATCH_SIZE):
+            chunk = requests[start : start + BATCH_SIZE]
+            try:
+                async with self.w3.batch_requests() as batch:
+                    for method, args in chunk:
+                        batch.add(method(*args))
+                    results += await batch.async_execute()
+            except Exception as e:
+                # a reverting call fails the whole batch, one by one it only fails itself
+                log.debug("batch refused (%s), sending one by one", e)
+                results += await asyncio.gather(*[method(*args) for method, args in chunk], return_exceptions=True)
+        return results
+
+    def _call(self, to, data, block):
+        return self.w3.eth.call, ({"to": to, "data": data}, block)
+
+    async def discover(self, block):
+        counts = await self._batch([self._call(s, NUM_LENDERS, block) for s in self.strategies])
+        failed = [s for s, count in zip(self.strategies, counts) if isinstance(count, Exception)]
+        if failed:
+            raise RuntimeError(f"numLenders failed on {failed}")
+        requests, owners = [], []
+        for strategy, count in zip(self.strategies, counts):
+            for i in range(_uint(count)):
+                requests.append(self._call(strategy, LENDERS + i.to_bytes(32, "big").hex(), block))
+                owners.append(strategy)
+        lenders = [Web3.to_checksum_address(bytes(r)[12:32]) for r in await self._batch(requests)]
+
+        current = set()
+        for strategy, lender in zip(owners, lenders):
+            current.add(lender)
+            if lender not in self.watches:
+                log.info("watching %s on %s", lender, strategy)
+                self.watches[lender] = Watch(strategy, lender)
+        # a removed lender has nothing left to report
+        for lender in set(self.watches) - current:
+            log.info("%s left its strategy", lender)
+            del self.watches[lender]
+
+    async def access_list(self, lender, block):
+        slots = set()
+        for data in (NAV, APR):
+            try:
+                result = await self.w3.eth.create_access_list({"to": lender, "data": data}, block)
+            except Exception as e:
+                log.debug("no access list for %s: %s", lender, e)
+                return []
+            for item in result["accessList"]:
+                address = Web3.to_checksum_address(item["address"])
+                slots.update((address, _slot(key)) for key in item["storageKeys"])
+        return sorted(slots)
+
+    async def storage(self, slots, block):
+        requests = [(self.w3.eth.get_storage_at, (address, int(slot, 16), block)) for address, slot in slots]
+        values = await self._batch(requests)
+        # a slot that failed to read is left out, which makes its lender due
+        return {slot: bytes(value) for slot, value in zip(slots, values) if not isinstance(value, Exception)}
+
+    async def on_block(self, block):
+        if self.blocks_seen % self.rediscover == 0:
+            await self.discover(block)
+        self.blocks_seen += 1
+
+        watches = list(self.watches.values())
+        values = await self.storage(sorted({slot for w in watches for slot in w.slots}), block)
+        due = [w for w in watches if w.due(values, block, self.max_age)]
+        if not due:
+            return []
+
+        results = await self._batch([self._call(w.lender, data, block) for w in due for data in (NAV, APR)])
+        changes, relearn = [], []
+        for i, watch in enumerate(due):
+            if isinstance(results[2 * i], Exception) or isinstance(results[2 * i + 1], Exception):
+                log.warning("%s failed to read at %s", watch.lender, block)
+                continue
+            nav, apr = _uint(results[2 * i]), _uint(results[2 * i + 1])
+            watch.values = {slot: values[slot] for slot in watch.slots if slot in values}
+            watch.read_at = block
+            if (nav, apr) == (watch.nav, watch.apr):
+                continue
+            previous = None if watch.nav is None else {"nav": watch.nav, "apr": watch.apr}
+            changes.append(
+                {"block": block, "strategy": watch.strategy, "lender": watch.lender, "nav": nav, "apr": apr, "previous": previous}
+            )
+            watch.nav, watch.apr = nav, apr
+            relearn.append(watch)
+
+        for watch, slots in zip(relearn, await asyncio.gather(*[self.access_list(w.lender, block) for w in relearn])):
+            fresh = [slot for slot in slots if slot not in watch.values]
+            watch.values.update(await self.storage(fresh, block) if fresh else {})
+            watch.slots = slots
+
+        for change in changes:
+            self.alert(change)
+        return changes
+
+
+async def heads(w3, interval):
+    """new block numbers, skipping ahead to the head when behind"""
+    if isinstance(w3.provider, WebSocketProvider):
+        await w3.eth.subscribe("newHeads")
+        async for message in w3.socket.process_subscriptions():
+            yield message["result"]["number"]
+        return
+
+    last = None
+    while True:
+        number = await w3.eth.block_number
+        if last is None or number > last:
+            last = number
+            yield number
+        await asyncio.sleep(interval)
+
+
+def webhook(url):
+    def post(change):
+        request = urllib.request.Request(
+            url, json.dumps(change).encode(), {"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except Exception as e:
+            log.warning("webhook failed: %s", e)
+
+    return post
+
+
+async def deliver(queue, alert):
+    """sends the changes off the block loop, a slow webhook only delays the alerts"""
+    while True:
+        change = await queue.get()
+        await asyncio.to_thread(alert, change)
+        queue.task_done()
+
+
+def _alerts(url):
+    hook = webhook(url) if url else None
+
+    def alert(change):
+        print(json.dumps(change), flush=True)
+        if hook is not None:
+            hook(change)
+
+    return alert
+
+
+async def run(rpc, strategies, alert, max_age, interval):
+    provider = WebSocketProvider(rpc) if rpc.startswith("ws") else AsyncHTTPProvider(rpc)
+    w3 = AsyncWeb3(provider)
+    if isinstance(provider, WebSocketProvider):
+        await w3.provider.connect()
+    queue = asyncio.Queue()
+    delivery = asyncio.create_task(deliver(queue, alert))
+    monitor = Monitor(w3, strategies, queue.put_nowait, max_age)
+    try:
+        async for block in heads(w3, interval):
+            try:
+                await monitor.on_block(block)
+            except Exception as e:
+                log.warning("block %s failed: %s", block, e)
+    finally:
+        delivery.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("strategies", nargs="+")
+    parser.add_argument("--rpc", required=True, help="ws:// or wss:// subscribes, anything else is polled")
+    parser.add_argument("--webhook", help="POST every change here as json")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE, help="blocks before a lender is read anyway")
+    parser.add_argument("--interval", type=float, default=2, help="seconds between polls without a websocket")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", stream=sys.stderr)
+    asyncio.run(run(args.rpc, args.strategies, _alerts(args.webhook), args.max_age, args.interval))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
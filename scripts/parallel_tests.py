@@ -0,0 +1,161 @@
+"""
+Runs the test directories in parallel, each on the network it was written for.
+
+    python scripts/parallel_tests.py [--workers N] [--dry-run] [dir ...] [-- brownie test args]
+
+Directories are grouped by network and every group runs as its own
+`brownie test --network <id> -n <k>` process at the same time. The cores are
+split between the groups by test count. Brownie offsets the node port by the
+xdist worker id, so every worker gets its own local node. The base ports in
+brownie-config.yml are 100 apart so groups never collide.
+
+A directory whose conftest defines `base_state` builds its vault and strategy
+once per session and reverts to one snapshot. Another directory's
+module_isolation would chain.reset() that state away on a shared worker, so
+these directories always get a `brownie test` process of their own. It runs
+after the network's other process, on the same ports.
+
+optimism-main-fork is not a brownie default, add it once with
+    brownie networks add development optimism-main-fork cmd=ganache-cli host=http://127.0.0.1 fork=optimism-main
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TESTS = ROOT / "tests"
+LOGS = ROOT / "reports" / "parallel"
+
+# first matching prefix wins
+ROUTES = [
+    ("Mock", "development"),
+    ("FTM", "ftm-main-fork"),
+    ("Opt", "optimism-main-fork"),
+    ("AaveV3/V3Rewards", "avax-main-fork"),
+    # the V3 addresses are also live on fantom, see brownie-config.yml
+    ("AaveV3/V3", "ftm-main-fork"),
+    ("", "mainnet-fork"),
+]
+
+
+def network_for(directory):
+    relative = directory.relative_to(TESTS).as_posix()
+    for prefix, network in ROUTES:
+        if prefix == "" or relative == prefix or relative.startswith(prefix + "/"):
+            return network
+
+
+def test_directories(selected=()):
+    """every directory holding test files, optionally limited to `selected`"""
+    roots = [TESTS / s for s in selected] if selected else [TESTS]
+    found = {}
+    for root in roots:
+        for test in sorted(root.rglob("test_*.py")):
+            found[test.parent] = found.get(test.parent, 0) + 1
+    # tests/test_live.py talks to live contracts and is left to manual runs
+    found.pop(TESTS, None)
+    return found
+
+
+def session_scoped(directory):
+    """True if a conftest at or above `directory` snapshots session state"""
+    for parent in [directory, *directory.parents]:
+        conftest = parent / "conftest.py"
+        if parent != TESTS and conftest.exists() and "def base_state(" in conftest.read_text():
+            return True
+        if parent == TESTS:
+            return False
+
+
+def plan(directories, workers):
+    """{network: ([(group, dirs)], worker count)}, cores split by number of test files
+
+    A network's groups share its ports and run one after another, the
+    session-scoped directories each in a group of their own.
+    """
+    groups = {}
+    for directory, count in directories.items():
+        network = network_for(directory)
+        shared, isolated, total = groups.get(network, ([], [], 0))
+        if session_scoped(directory):
+            group = f"{network}-{directory.relative_to(TESTS).as_posix().replace('/', '-')}"
+            isolated = isolated + [(group, [directory])]
+        else:
+            shared = shared + [directory]
+        groups[network] = (shared, isolated, total + count)
+
+    total = sum(count for _, _, count in groups.values())
+    return {
+        network: (([(network, shared)] if shared else []) + isolated, max(1, workers * count // total))
+        for network, (shared, isolated, count) in sorted(groups.items(), key=lambda g: -g[1][2])
+    }
+
+
+def command(network, dirs, workers, extra):
+    cmd = ["brownie", "test", *[str(d.relative_to(ROOT)) for d in dirs], "--network", network]
+    if workers > 1:
+        cmd += ["-n", str(workers)]
+    return cmd + list(extra)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    extra = []
+    if "--" in argv:
+        extra = argv[argv.index("--") + 1 :]
+        argv = argv[: argv.index("--")]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dirs", nargs="*", help="test directories relative to tests/, default all")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="total xdist workers")
+    parser.add_argument("--dry-run", action="store_true", help="print the commands and exit")
+    args = parser.parse_args(argv)
+
+    groups = plan(test_directories(args.dirs), args.workers)
+    queues = {
+        network: [(group, command(network, dirs, k, extra)) for group, dirs in runs]
+        for network, (runs, k) in groups.items()
+    }
+    for runs in queues.values():
+        for group, cmd in runs:
+            print(f"{group}: {' '.join(cmd)}")
+    if args.dry_run:
+        return 0
+
+    # compile once up front so the groups don't race on build/
+    subprocess.run(["brownie", "compile"], cwd=ROOT, check=True)
+
+    LOGS.mkdir(parents=True, exist_ok=True)
+    started = time.time()
+
+    def start(network):
+        group, cmd = queues[network].pop(0)
+        log = open(LOGS / f"{group}.log", "w")
+        return group, subprocess.Popen(cmd, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT), log
+
+    running = {network: start(network) for network in queues}
+    failed = []
+    while running:
+        time.sleep(1)
+        for network, (group, process, log) in list(running.items()):
+            if process.poll() is None:
+                continue
+            log.close()
+            status = "passed" if process.returncode == 0 else f"FAILED ({process.returncode})"
+            print(f"{group}: {status}, log in {(LOGS / f'{group}.log').relative_to(ROOT)}")
+            if process.returncode != 0:
+                failed.append(group)
+            if queues[network]:
+                running[network] = start(network)
+            else:
+                del running[network]
+
+    print(f"finished in {time.time() - started:.0f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
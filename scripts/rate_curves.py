@@ -0,0 +1,499 @@
+"""
+Vectorised versions of each lender plugin's aprAfterDeposit maths.
+
+Each curve is built from a snapshot of the protocol state (see the
+`from_chain` helpers) and `apr_after_deposit(amounts)` then prices a whole
+array of deposit sizes in one numpy call instead of one eth_call per point.
+
+Everything is computed in float64 so results agree with the contracts to
+about 1e-12 relative, not to the last wei. Aprs are scaled by 1e18 like the
+plugins return them.
+"""
+import numpy as np
+
+WAD = 1e18
+RAY = 1e27
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+
+def _amounts(amounts):
+    return np.asarray(amounts, dtype=np.float64)
+
+
+class AaveV3Curve:
+    """
+    GenericAaveV3.aprAfterDeposit. Rate maths of aave's
+    DefaultReserveInterestRateStrategy, all rates in ray.
+    """
+
+    def __init__(
+        self,
+        available_liquidity,
+        unbacked,
+        total_stable_debt,
+        total_variable_debt,
+        average_stable_borrow_rate,
+        reserve_factor,
+        optimal_usage_ratio,
+        base_variable_borrow_rate,
+        variable_rate_slope1,
+        variable_rate_slope2,
+        emissions_in_want=(),
+    ):
+        self.available_liquidity = available_liquidity
+        self.unbacked = unbacked
+        self.total_stable_debt = total_stable_debt
+        self.total_variable_debt = total_variable_debt
+        self.average_stable_borrow_rate = average_stable_borrow_rate
+        self.reserve_factor = reserve_factor
+        self.optimal_usage_ratio = optimal_usage_ratio
+        self.base_variable_borrow_rate = base_variable_borrow_rate
+        self.variable_rate_slope1 = variable_rate_slope1
+        self.variable_rate_slope2 = variable_rate_slope2
+        # want per second paid out by each reward token, see GenericAaveV3._incentivesRate
+        self.emissions_in_want = list(emissions_in_want)
+
+    @classmethod
+    def from_chain(cls, lender, emissions_in_want=()):
+        from brownie import Contract, interface
+
+        want = lender.want()
+        data_provider = Contract(lender.protocolDataProvider())
+        pool = Contract(Contract(data_provider.ADDRESSES_PROVIDER()).getPool())
+        reserve = data_provider.getReserveData(want)
+        config = data_provider.getReserveConfigurationData(want)
+        # interestRateStrategyAddress in DataTypesV3.ReserveData
+        rate_strategy = Contract(pool.getReserveData(want)[11])
+
+        return cls(
+            available_liquidity=interface.ERC20(want).balanceOf(lender.aToken()),
+            unbacked=reserve[0],
+            total_stable_debt=reserve[3],
+            total_variable_debt=reserve[4],
+            average_stable_borrow_rate=reserve[8],
+            reserve_factor=config[4],
+            optimal_usage_ratio=rate_strategy.OPTIMAL_USAGE_RATIO(),
+            base_variable_borrow_rate=rate_strategy.getBaseVariableBorrowRate(),
+            variable_rate_slope1=rate_strategy.getVariableRateSlope1(),
+            variable_rate_slope2=rate_strategy.getVariableRateSlope2(),
+            emissions_in_want=emissions_in_want,
+        )
+
+    def liquidity_rate(self, amounts):
+        amounts = _amounts(amounts)
+        total_debt = self.total_stable_debt + self.total_variable_debt
+        if total_debt == 0:
+            return np.zeros_like(amounts)
+
+        liquidity_plus_debt = self.available_liquidity + amounts + total_debt
+        borrow_usage = total_debt / liquidity_plus_debt
+        supply_usage = total_debt / (liquidity_plus_debt + self.unbacked)
+
+        optimal = self.optimal_usage_ratio / RAY
+        excess = (borrow_usage - optimal) / (1 - optimal)
+        variable_rate = np.where(
+            borrow_usage > optimal,
+            self.base_variable_borrow_rate + self.variable_rate_slope1 + self.variable_rate_slope2 * excess,
+            self.base_variable_borrow_rate + self.variable_rate_slope1 * borrow_usage / optimal,
+        )
+
+        overall_borrow_rate = (
+            self.total_variable_debt * variable_rate + self.total_stable_debt * self.average_stable_borrow_rate
+        ) / total_debt
+        return overall_borrow_rate * supply_usage * (1 - self.reserve_factor / 1e4)
+
+    def apr_after_deposit(self, amounts):
+        amounts = _amounts(amounts)
+        # ray to wad
+        apr = self.liquidity_rate(amounts) / 1e9
+
+        total_liquidity = (
+            self.available_liquidity + amounts + self.unbacked + self.total_stable_debt + self.total_variable_debt
+        )
+        for emissions in self.emissions_in_want:
+            apr = apr + emissions * SECONDS_PER_YEAR * WAD / total_liquidity * 0.95
+        return apr
+
+
+class CompoundV3Curve:
+    """GenericCompoundV3.aprAfterDeposit, comet supply rate plus COMP rewards"""
+
+    def __init__(
+        self,
+        total_supply,
+        total_borrow,
+        supply_kink,
+        supply_rate_base,
+        supply_rate_slope_low,
+        supply_rate_slope_high,
+        base_tracking_supply_speed=0,
+        base_index_scale=1e15,
+        base_scale=1e6,
+        reward_price=0,
+        want_price=1,
+    ):
+        self.total_supply = total_supply
+        self.total_borrow = total_borrow
+        self.supply_kink = supply_kink
+        self.supply_rate_base = supply_rate_base
+        self.supply_rate_slope_low = supply_rate_slope_low
+        self.supply_rate_slope_high = supply_rate_slope_high
+        self.base_tracking_supply_speed = base_tracking_supply_speed
+        self.base_index_scale = base_index_scale
+        self.base_scale = base_scale
+        self.reward_price = reward_price
+        self.want_price = want_price
+
+    @classmethod
+    def from_chain(cls, lender):
+        from brownie import Contract
+
+        comet = Contract(lender.comet())
+        return cls(
+            total_supply=comet.totalSupply(),
+            total_borrow=comet.totalBorrow(),
+            supply_kink=comet.supplyKink(),
+            supply_rate_base=comet.supplyPerSecondInterestRateBase(),
+            supply_rate_slope_low=comet.supplyPerSecondInterestRateSlopeLow(),
+            supply_rate_slope_high=comet.supplyPerSecondInterestRateSlopeHigh(),
+            base_tracking_supply_speed=comet.baseTrackingSupplySpeed(),
+            base_index_scale=comet.baseIndexScale(),
+            base_scale=comet.baseScale(),
+            reward_price=lender.getCompoundPrice(lender.getPriceFeedAddress(lender.comp())),
+            want_price=lender.getCompoundPrice(comet.baseTokenPriceFeed()),
+        )
+
+    def supply_rate(self, utilization):
+        kink = self.supply_kink
+        low = self.supply_rate_base + self.supply_rate_slope_low * utilization / WAD
+        high = (
+            self.supply_rate_base
+            + self.supply_rate_slope_low * kink / WAD
+            + self.supply_rate_slope_high * (utilization - kink) / WAD
+        )
+        return np.where(utilization <= kink, low, high)
+
+    def reward_apr(self, amounts):
+        rewards_per_day = self.base_tracking_supply_speed * 86400 * (self.base_index_scale // self.base_scale)
+        return self.reward_price * rewards_per_day / ((self.total_supply + amounts) * self.want_price) * 365
+
+    def apr_after_deposit(self, amounts):
+        amounts = _amounts(amounts)
+        utilization = self.total_borrow * WAD / (self.total_supply + amounts)
+        return self.supply_rate(utilization) * SECONDS_PER_YEAR + self.reward_apr(amounts)
+
+
+class CTokenCurve:
+    """
+    GenericCream / GenericScream aprAfterDeposit. The cToken rate model is
+    compound's JumpRateModel, per block and scaled by 1e18.
+    """
+
+    def __init__(
+        self,
+        cash,
+        borrows,
+        reserves,
+        reserve_factor,
+        base_rate_per_block,
+        multiplier_per_block,
+        jump_multiplier_per_block,
+        kink,
+        blocks_per_year=2_300_000,
+        reward_per_block=0,
+        reward_price=0,
+        total_supply_underlying=0,
+    ):
+        self.cash = cash
+        self.borrows = borrows
+        self.reserves = reserves
+        self.reserve_factor = reserve_factor
+        self.base_rate_per_block = base_rate_per_block
+        self.multiplier_per_block = multiplier_per_block
+        self.jump_multiplier_per_block = jump_multiplier_per_block
+        self.kink = kink
+        self.blocks_per_year = blocks_per_year
+        # only GenericScream adds the share of the comp speed, see compBlockShareInWant
+        self.reward_per_block = reward_per_block
+        self.reward_price = reward_price
+        self.total_supply_underlying = total_supply_underlying
+
+    @classmethod
+    def from_chain(cls, lender, blocks_per_year=2_300_000, reward_per_block=0, reward_price=0):
+        from brownie import Contract, interface
+
+        ctoken = interface.CErc20I(lender.cToken())
+        model = Contract(ctoken.interestRateModel())
+        return cls(
+            cash=interface.ERC20(lender.want()).balanceOf(ctoken),
+            borrows=ctoken.totalBorrows(),
+            reserves=ctoken.totalReserves(),
+            reserve_factor=ctoken.reserveFactorMantissa(),
+            base_rate_per_block=model.baseRatePerBlock(),
+            multiplier_per_block=model.multiplierPerBlock(),
+            jump_multiplier_per_block=model.jumpMultiplierPerBlock(),
+            kink=model.kink(),
+            blocks_per_year=blocks_per_year,
+            reward_per_block=reward_per_block,
+            reward_price=reward_price,
+            total_supply_underlying=ctoken.totalSupply() * ctoken.exchangeRateStored() // 10 ** 18,
+        )
+
+    def supply_rate_per_block(self, amounts):
+        cash = self.cash + _amounts(amounts)
+        if self.borrows == 0:
+            return np.zeros_like(cash)
+
+        utilization = self.borrows * WAD / (cash + self.borrows - self.reserves)
+        normal_rate = self.kink * self.multiplier_per_block / WAD + self.base_rate_per_block
+        borrow_rate = np.where(
+            utilization <= self.kink,
+            utilization * self.multiplier_per_block / WAD + self.base_rate_per_block,
+            normal_rate + (utilization - self.kink) * self.jump_multiplier_per_block / WAD,
+        )
+        rate_to_pool = borrow_rate * (WAD - self.reserve_factor) / WAD
+        return utilization * rate_to_pool / WAD
+
+    def reward_rate_per_block(self, amounts):
+        total_supply = self.total_supply_underlying + _amounts(amounts)
+        share = np.divide(
+            self.reward_per_block * WAD,
+            total_supply,
+            out=np.zeros_like(total_supply),
+            where=total_supply > 0,
+        )
+        # 10% pessimist like the plugin
+        return share * self.reward_price * 0.9
+
+    def apr_after_deposit(self, amounts):
+        rate = self.supply_rate_per_block(amounts) + self.reward_rate_per_block(amounts)
+        return rate * self.blocks_per_year
+
+
+class DyDxCurve:
+    """
+    GenericDyDx._apr. dydx markets use either the polynomial or the double
+    exponent interest setter: borrowRate = maxApr * sum(c_i * u^e_i) / 100,
+    with e_i = i or 2^i respectively.
+
+    Two years are involved and both are kept to match the contracts: the
+    interest setter turns maxApr into a per second rate over dydx's 365 day
+    SECONDS_IN_A_YEAR, GenericDyDx annualises that rate with its own
+    secondPerYear.
+    """
+
+    # SECONDS_IN_A_YEAR of the dydx interest setters
+    SETTER_SECONDS_PER_YEAR = SECONDS_PER_YEAR
+    # secondPerYear of GenericDyDx
+    PLUGIN_SECONDS_PER_YEAR = 31_153_900
+
+    def __init__(self, borrow, supply, max_apr, coefficients, double_exponent=True):
+        self.borrow = borrow
+        self.supply = supply
+        self.max_apr = max_apr
+        self.coefficients = list(coefficients)
+        self.double_exponent = double_exponent
+
+    @classmethod
+    def from_chain(cls, lender, max_apr=None, coefficients=None, double_exponent=True):
+        """max_apr and coefficients are read from the market's interest setter when left out"""
+        from brownie import Contract, interface
+
+        solo = interface.ISoloMargin("0x1E0447b19BB6EcFdAe1e4AE1694b0C3659614e4e")
+        market = lender.dydxMarketId()
+        if max_apr is None or coefficients is None:
+            setter = Contract(solo.getMarketInterestSetter(market))
+            max_apr = setter.getMaxAPR() if max_apr is None else max_apr
+            coefficients = setter.getCoefficients() if coefficients is None else coefficients
+        par = solo.getMarketTotalPar(market)
+        index = solo.getMarketCurrentIndex(market)
+        return cls(
+            borrow=par[0] * index[0] // 10 ** 18,
+            supply=par[1] * index[1] // 10 ** 18,
+            max_apr=max_apr,
+            coefficients=coefficients,
+            double_exponent=double_exponent,
+        )
+
+    def borrow_rate_per_second(self, supply):
+        if self.borrow == 0:
+            return np.zeros_like(supply)
+
+        utilization = np.minimum(self.borrow / supply, 1)
+        polynomial = np.zeros_like(supply)
+        for i, coefficient in enumerate(self.coefficients):
+            exponent = 2 ** i if self.double_exponent else i
+            polynomial = polynomial + coefficient * utilization ** exponent
+        return self.max_apr * polynomial / 100 / self.SETTER_SECONDS_PER_YEAR
+
+    def apr_after_deposit(self, amounts):
+        supply = self.supply + _amounts(amounts)
+        lend_rate = self.borrow_rate_per_second(supply) * self.borrow / supply
+        return lend_rate * self.PLUGIN_SECONDS_PER_YEAR
+
+
+def p2p_supply_rate_per_year(
+    pool_supply_rate,
+    pool_borrow_rate,
+    p2p_index_cursor,
+    reserve_factor,
+    p2p_delta=0,
+    p2p_amount=0,
+    pool_index=RAY,
+    p2p_index=RAY,
+):
+    """Vectorised GenericAaveMorpho.computeP2PSupplyRatePerYear, rates in ray"""
+    pool_supply_rate = np.asarray(pool_supply_rate, dtype=np.float64)
+    pool_borrow_rate = np.asarray(pool_borrow_rate, dtype=np.float64)
+
+    weighted = (pool_supply_rate * (1e4 - p2p_index_cursor) + pool_borrow_rate * p2p_index_cursor) / 1e4
+    spread = weighted - (weighted - pool_supply_rate) * reserve_factor / 1e4
+    p2p_supply_rate = np.where(pool_supply_rate > pool_borrow_rate, pool_borrow_rate, spread)
+
+    if p2p_delta > 0 and p2p_amount > 0:
+        share_of_the_delta = min(p2p_delta * pool_index / (p2p_amount * p2p_index), 1)
+        p2p_supply_rate = p2p_supply_rate * (1 - share_of_the_delta) + pool_supply_rate * share_of_the_delta
+    return p2p_supply_rate
+
+
+class MorphoAaveCurve:
+    """
+    GenericAaveMorpho.aprAfterDeposit. Deposits first match the p2p borrow
+    delta, then the biggest borrower waiting on the pool, and the rest goes
+    to aave v2. Aave v2 rates follow the same two slope model as v3.
+    """
+
+    def __init__(
+        self,
+        pool,
+        p2p_index_cursor,
+        reserve_factor,
+        supplied_in_p2p=0,
+        supplied_on_pool=0,
+        p2p_borrow_delta=0,
+        first_pool_borrower=0,
+        p2p_supply_delta=0,
+        p2p_supply_amount=0,
+        pool_supply_index=RAY,
+        p2p_supply_index=RAY,
+        p2p_disabled=False,
+    ):
+        # AaveV3Curve snapshot of the underlying aave v2 market, unbacked is always 0 there
+        self.pool = pool
+        self.p2p_index_cursor = p2p_index_cursor
+        self.reserve_factor = reserve_factor
+        # our balances and the matchable amounts, all in underlying
+        self.supplied_in_p2p = supplied_in_p2p
+        self.supplied_on_pool = supplied_on_pool
+        self.p2p_borrow_delta = p2p_borrow_delta
+        self.first_pool_borrower = first_pool_borrower
+        self.p2p_supply_delta = p2p_supply_delta
+        self.p2p_supply_amount = p2p_supply_amount
+        self.pool_supply_index = pool_supply_index
+        self.p2p_supply_index = p2p_supply_index
+        self.p2p_disabled = p2p_disabled
+
+    @classmethod
+    def from_chain(cls, lender):
+        from brownie import Contract, interface
+
+        morpho = interface.IMorpho("0x777777c9898D384F785Ee44Acfe945efDFf5f3E0")
+        lens = interface.ILens("0x507fA343d0A90786d86C7cd885f5C49263A91FF4")
+        data_provider = Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
+        aave_pool = interface.ILendingPool("0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9")
+
+        want = lender.want()
+        a_token = lender.aToken()
+        reserve = data_provider.getReserveData(want)
+        # interestRateStrategyAddress in DataTypes.ReserveData
+        rate_strategy = Contract(aave_pool.getReserveData(want)[10])
+        pool = AaveV3Curve(
+            available_liquidity=reserve[0],
+            unbacked=0,
+            total_stable_debt=reserve[1],
+            total_variable_debt=reserve[2],
+            average_stable_borrow_rate=reserve[6],
+            reserve_factor=data_provider.getReserveConfigurationData(want)[4],
+            optimal_usage_ratio=rate_strategy.OPTIMAL_UTILIZATION_RATE(),
+            base_variable_borrow_rate=rate_strategy.baseVariableBorrowRate(),
+            variable_rate_slope1=rate_strategy.variableRateSlope1(),
+            variable_rate_slope2=rate_strategy.variableRateSlope2(),
+        )
+
+        indexes = lens.getIndexes(a_token)
+        market = morpho.market(a_token)
+        delta = morpho.deltas(a_token)
+        balance = morpho.supplyBalanceInOf(a_token, lender)
+        # BORROWERS_ON_POOL
+        head = morpho.getHead(a_token, 3)
+        return cls(
+            pool,
+            p2p_index_cursor=market[2],
+            reserve_factor=market[1],
+            supplied_in_p2p=balance[0] * indexes[0] / RAY,
+            supplied_on_pool=balance[1] * indexes[2] / RAY,
+            p2p_borrow_delta=delta[1] * indexes[3] / RAY,
+            first_pool_borrower=morpho.borrowBalanceInOf(a_token, head)[1] * indexes[3] / RAY,
+            p2p_supply_delta=delta[0],
+            p2p_supply_amount=delta[2],
+            pool_supply_index=indexes[2],
+            p2p_supply_index=indexes[0],
+            p2p_disabled=market[6],
+        )
+
+    def _pool_rates(self, supplied_to_pool, repaid_to_pool):
+        pool = self.pool
+        total_debt = pool.total_stable_debt + pool.total_variable_debt - repaid_to_pool
+        liquidity_plus_debt = pool.available_liquidity + supplied_to_pool + repaid_to_pool + total_debt
+        usage = total_debt / liquidity_plus_debt
+
+        optimal = pool.optimal_usage_ratio / RAY
+        variable_rate = np.where(
+            usage > optimal,
+            pool.base_variable_borrow_rate
+            + pool.variable_rate_slope1
+            + pool.variable_rate_slope2 * (usage - optimal) / (1 - optimal),
+            pool.base_variable_borrow_rate + pool.variable_rate_slope1 * usage / optimal,
+        )
+        overall_borrow_rate = (
+            (pool.total_variable_debt - repaid_to_pool) * variable_rate
+            + pool.total_stable_debt * pool.average_stable_borrow_rate
+        ) / total_debt
+        supply_rate = overall_borrow_rate * usage * (1 - pool.reserve_factor / 1e4)
+        return supply_rate, variable_rate
+
+    def apr_after_deposit(self, amounts):
+        remaining = _amounts(amounts)
+        in_p2p = np.full_like(remaining, self.supplied_in_p2p)
+        repaid_to_pool = np.zeros_like(remaining)
+
+        if not self.p2p_disabled:
+            for matchable in (self.p2p_borrow_delta, self.first_pool_borrower):
+                matched = np.minimum(matchable, remaining)
+                in_p2p = in_p2p + matched
+                repaid_to_pool = repaid_to_pool + matched
+                remaining = remaining - matched
+
+        on_pool = self.supplied_on_pool + remaining
+        pool_supply_rate, variable_borrow_rate = self._pool_rates(remaining, repaid_to_pool)
+
+        p2p_rate = p2p_supply_rate_per_year(
+            pool_supply_rate,
+            variable_borrow_rate,
+            self.p2p_index_cursor,
+            self.reserve_factor,
+            self.p2p_supply_delta,
+            self.p2p_supply_amount,
+            self.pool_supply_index,
+            self.p2p_supply_index,
+        )
+
+        total = in_p2p + on_pool
+        weighted = np.divide(
+            p2p_rate * in_p2p + pool_supply_rate * on_pool,
+            total,
+            out=np.zeros_like(total),
+            where=total > 0,
+        )
+        # ray to wad
+        return weighted / 1e9
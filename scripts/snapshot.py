@@ -0,0 +1,154 @@
+"""
+Reads the state of a strategy, its vault entry and every lender in a single
+Multicall3 aggregate3 request pinned to one block.
+
+    brownie run snapshot main <strategy> [amount ...] --network mainnet
+
+Lender addresses are resolved once and cached. Every snapshot re-reads
+numLenders and lenders(i) in the same batch, and resolves again if the
+lender set has changed.
+"""
+import json
+
+from brownie import Contract, Strategy, interface, web3
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# 1m gas at 30 gwei, same guess as genericStateOfStrat
+DEFAULT_CALL_COST = 1000000 * 30 * 10 ** 9
+
+# the parts of a 0.4.x vault we read
+VAULT_ABI = [
+    {
+        "name": "strategies",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "arg0", "type": "address"}],
+        "outputs": [
+            {
+                "name": "",
+                "type": "tuple",
+                "components": [
+                    {"name": "performanceFee", "type": "uint256"},
+                    {"name": "activation", "type": "uint256"},
+                    {"name": "debtRatio", "type": "uint256"},
+                    {"name": "minDebtPerHarvest", "type": "uint256"},
+                    {"name": "maxDebtPerHarvest", "type": "uint256"},
+                    {"name": "lastReport", "type": "uint256"},
+                    {"name": "totalDebt", "type": "uint256"},
+                    {"name": "totalGain", "type": "uint256"},
+                    {"name": "totalLoss", "type": "uint256"},
+                ],
+            }
+        ],
+    },
+    {
+        "name": "debtOutstanding",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "strategy", "type": "address"}],
+        "outputs": [{"name": "", "type": "uint256"}],
+    },
+]
+
+STRATEGY_PARAMS = [
+    "performanceFee",
+    "activation",
+    "debtRatio",
+    "minDebtPerHarvest",
+    "maxDebtPerHarvest",
+    "lastReport",
+    "totalDebt",
+    "totalGain",
+    "totalLoss",
+]
+
+
+class SnapshotReader:
+    def __init__(self, strategy, amounts=(), call_cost=DEFAULT_CALL_COST, multicall=MULTICALL3):
+        self.strategy = Contract.from_abi("Strategy", str(strategy), Strategy.abi)
+        self.amounts = [int(a) for a in amounts]
+        self.call_cost = int(call_cost)
+        self.multicall = interface.IMulticall3(multicall)
+        self.vault = None
+        self.want = None
+        self.lenders = None
+
+    def _aggregate(self, calls, block):
+        """
+        calls is a list of (key, method, args). Failing calls come back as
+        None so one broken plugin does not hide the rest of the snapshot.
+        """
+        payload = [(str(method._address), True, method.encode_input(*args)) for _, method, args in calls]
+        results = self.multicall.aggregate3.call(payload, block_identifier=block)
+
+        decoded = []
+        for (key, method, _), (success, data) in zip(calls, results):
+            decoded.append((key, method.decode_output(data) if success else None))
+        return decoded
+
+    def resolve(self, block=None):
+        s = self.strategy
+        head = dict(self._aggregate([("vault", s.vault, ()), ("want", s.want, ()), ("numLenders", s.numLenders, ())], block))
+        self.vault = Contract.from_abi("Vault", head["vault"], VAULT_ABI)
+        self.want = interface.ERC20(head["want"])
+
+        lenders = self._aggregate([(i, s.lenders, (i,)) for i in range(head["numLenders"])], block)
+        self.lenders = [interface.IGenericLender(address) for _, address in lenders]
+
+    def _calls(self):
+        s = self.strategy
+        calls = [
+            ("numLenders", s.numLenders, ()),
+            ("want", self.want.balanceOf, (s.address,)),
+            ("estimatedTotalAssets", s.estimatedTotalAssets, ()),
+            ("estimatedAPR", s.estimatedAPR, ()),
+            ("harvestTrigger", s.harvestTrigger, (self.call_cost,)),
+            ("tendTrigger", s.tendTrigger, (self.call_cost,)),
+            ("emergencyExit", s.emergencyExit, ()),
+            ("strategies", self.vault.strategies, (s.address,)),
+            ("debtOutstanding", self.vault.debtOutstanding, (s.address,)),
+        ]
+        for i, lender in enumerate(self.lenders):
+            calls.append((("lenderAddress", i), s.lenders, (i,)))
+            for name in ["lenderName", "nav", "apr", "weightedApr", "hasAssets"]:
+                calls.append(((name, i), getattr(lender, name), ()))
+            for amount in self.amounts:
+                calls.append(((("aprAfterDeposit", amount), i), lender.aprAfterDeposit, (amount,)))
+        return calls
+
+    def read(self, block=None, _retry=True):
+        if block is None:
+            block = web3.eth.block_number
+        if self.lenders is None:
+            self.resolve(block)
+
+        results = self._aggregate(self._calls(), block)
+
+        snapshot = {"block": block, "strategy": str(self.strategy), "lenders": [{} for _ in self.lenders]}
+        for key, value in results:
+            if isinstance(key, tuple):
+                name, i = key
+                if isinstance(name, tuple):
+                    snapshot["lenders"][i].setdefault("aprAfterDeposit", {})[name[1]] = value
+                else:
+                    snapshot["lenders"][i][name] = value
+            elif key == "strategies":
+                snapshot[key] = dict(zip(STRATEGY_PARAMS, value)) if value is not None else None
+            else:
+                snapshot[key] = value
+
+        # lenders were added or removed since we resolved them
+        addresses = [lender["lenderAddress"] for lender in snapshot["lenders"]]
+        if _retry and (snapshot["numLenders"] != len(self.lenders) or addresses != [str(l) for l in self.lenders]):
+            self.resolve(block)
+            return self.read(block, _retry=False)
+
+        for lender in snapshot["lenders"]:
+            lender["address"] = lender.pop("lenderAddress")
+        return snapshot
+
+
+def main(strategy, *amounts):
+    snapshot = SnapshotReader(strategy, amounts).read()
+    print(json.dumps(snapshot, indent=2, default=str))
@@ -0,0 +1,13 @@
+import pytest
+
+from scripts.rate_curves import AaveV3Curve
+
+
+def test_aave_v3_curve(v3Plugin):
+    curve = AaveV3Curve.from_chain(v3Plugin)
+
+    amounts = [0, 1e18, 500_000 * 1e18, 50_000_000 * 1e18]
+    aprs = curve.apr_after_deposit(amounts)
+
+    for amount, apr in zip(amounts, aprs):
+        assert apr == pytest.approx(v3Plugin.aprAfterDeposit(amount), rel=1e-6)
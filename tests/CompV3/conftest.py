@@ -34,17 +34,27 @@ def live_GenericDyDx_usdc_1(GenericDyDx):
     yield GenericDyDx.at("0x6C842746F21Ca34542EDC6895dFfc8D4e7D2bC1c")
 
 # change these fixtures for generic tests
-@pytest.fixture
+@pytest.fixture(scope="session")
 def currency(dai, usdc, weth):
     yield usdc
 
 
+# the whale funding and deployments below are session scoped and built once.
+# base_state snapshots the chain after them and every test reverts to it,
+# instead of fn_isolation redeploying everything per test
+@pytest.fixture(scope="session")
+def base_state(chain, whale, strategist, vault, strategy):
+    chain.snapshot()
+    yield
+
+
 @pytest.fixture(autouse=True)
-def isolation(fn_isolation):
-    pass
+def isolation(base_state, chain):
+    yield
+    chain.revert()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def whale(accounts, web3, weth):
     # big binance7 wallet
     # acc = accounts.at('0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8', force=True)
@@ -60,7 +70,7 @@ def whale(accounts, web3, weth):
     yield acc
 
 
-@pytest.fixture()
+@pytest.fixture(scope="session")
 def strategist(accounts, whale, currency):
     decimals = currency.decimals()
     currency.transfer(accounts[1], 100_000 * (10 ** decimals), {"from": whale})
@@ -72,29 +82,29 @@ def samdev(accounts):
     yield accounts.at("0xC3D6880fD95E06C816cB030fAc45b3ffe3651Cb0", force=True)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def gov(accounts):
     yield accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rewards(gov):
     yield gov  # TODO: Add rewards contract
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian(accounts):
     # YFI Whale, probably
     yield accounts[2]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper(accounts):
     # This is our trusty bot!
     yield accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rando(accounts):
     yield accounts[9]
 
@@ -112,47 +122,62 @@ def trade_factory():
     yield Contract("0xd6a8ae62f4d593DAf72E2D7c9f7bDB89AB069F06")
 
 # specific addresses
-@pytest.fixture
+@pytest.fixture(scope="session")
 def usdc(interface):
     yield interface.ERC20("0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def dai(interface):
     yield interface.ERC20("0x6b175474e89094c44da98b954eedeac495271d0f")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def weth(interface):
     yield interface.IWETH("0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def cdai(interface):
     yield interface.CErc20I("0x5d3a536e4d6dbd6114cc1ead35777bab948e3643")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def cUsdc(interface):
     yield interface.Comet("0xc3d688B66703497DAA19211EEdff47f25384cdc3")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def crUsdc(interface):
     yield interface.CErc20I("0x44fbeBd2F576670a6C33f6Fc0B00aA8c5753b322")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def aUsdc(interface):
     yield interface.IAToken("0xBcca60bB61934080951369a648Fb03DF4F96263C")
 
 
+# module_isolation would reset the chain and throw away base_state
 @pytest.fixture(scope="module", autouse=True)
-def shared_setup(module_isolation):
+def shared_setup():
     pass
 
 
+# brownie's own isolation fixtures call chain.reset(), which wipes the session
+# deployments and the base_state snapshot. isolation above replaces both.
+# another directory's module_isolation would do the same, so this directory
+# needs a process of its own, see scripts/parallel_tests.py
+@pytest.fixture(scope="module")
+def module_isolation():
+    yield
+
+
 @pytest.fixture
+def fn_isolation():
+    yield
+
+
+@pytest.fixture(scope="session")
 def vault(gov, rewards, guardian, currency, pm):
     Vault = pm(config["dependencies"][0]).Vault
     vault = Vault.deploy({"from": guardian})
@@ -161,7 +186,7 @@ def vault(gov, rewards, guardian, currency, pm):
     yield vault
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategy(
     strategist,
     gov,
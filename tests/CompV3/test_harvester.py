@@ -0,0 +1,41 @@
+import brownie
+from brownie import interface
+
+
+def test_batch_harvest(
+    usdc, whale, gov, strategist, rando, keeper, vault, strategy, GenericCompoundV3, LenderHarvester, gasOracle, strategist_ms
+):
+    plugin = GenericCompoundV3.at(strategy.lenders(0))
+    gasOracle.setMaxAcceptableBaseFee(10000 * 1e9, {"from": strategist_ms})
+    plugin.setUniFees(3000, 500, {"from": strategist})
+
+    harvester = strategist.deploy(LenderHarvester)
+    harvester.setKeeper(keeper, True, {"from": strategist})
+    strategy.setKeeper(harvester, {"from": strategist})
+    plugin.setKeep3r(harvester, {"from": strategist})
+
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 500, {"from": gov})
+    usdc.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(100_000 * 1e6, {"from": whale})
+
+    # nothing due on the plugin, only the strategy report runs
+    assert harvester.duePlugins(strategy, 0) == []
+    tx = harvester.harvest(strategy, 0, {"from": keeper})
+    assert tx.events["BatchHarvested"]["strategy"] == strategy
+    assert tx.events["BatchHarvested"]["plugins"] == []
+    assert "Harvested" in tx.events
+    assert strategy.estimatedTotalAssets() > 0
+
+    comp = interface.ERC20(plugin.comp())
+    comp.transfer(plugin, 10 * 10 ** 18, {"from": whale})
+    assert harvester.duePlugins(strategy, 0) == [plugin]
+
+    with brownie.reverts("!keepers"):
+        harvester.harvest(strategy, 0, {"from": rando})
+
+    # the comp is sold and the strategy reports the proceeds in the same tx
+    before = vault.strategies(strategy).dict()["totalGain"]
+    tx = harvester.harvest(strategy, 0, {"from": keeper})
+    assert tx.events["BatchHarvested"]["plugins"] == [plugin]
+    assert comp.balanceOf(plugin) == 0
+    assert vault.strategies(strategy).dict()["totalGain"] > before
@@ -0,0 +1,15 @@
+import pytest
+from brownie import GenericCompoundV3
+
+from scripts.rate_curves import CompoundV3Curve
+
+
+def test_compound_v3_curve(strategy):
+    plugin = GenericCompoundV3.at(strategy.lenders(0))
+    curve = CompoundV3Curve.from_chain(plugin)
+
+    amounts = [0, 1e6, 100_000 * 1e6, 10_000_000 * 1e6, 500_000_000 * 1e6]
+    aprs = curve.apr_after_deposit(amounts)
+
+    for amount, apr in zip(amounts, aprs):
+        assert apr == pytest.approx(plugin.aprAfterDeposit(amount), rel=1e-6)
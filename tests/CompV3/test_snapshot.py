@@ -0,0 +1,33 @@
+from brownie import chain
+
+from scripts.snapshot import SnapshotReader
+
+
+def test_snapshot_matches_direct_calls(strategy, vault, usdc, whale, gov, GenericCompoundV3):
+    usdc.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 500, {"from": gov})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.deposit(1_000_000 * 1e6, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    amounts = [0, 10_000 * 1e6]
+    reader = SnapshotReader(strategy, amounts)
+    snapshot = reader.read()
+
+    assert snapshot["block"] == chain.height
+    assert snapshot["estimatedTotalAssets"] == strategy.estimatedTotalAssets()
+    assert snapshot["strategies"] == vault.strategies(strategy).dict()
+
+    plugin = GenericCompoundV3.at(strategy.lenders(0))
+    lender = snapshot["lenders"][0]
+    assert lender["address"] == plugin.address
+    assert lender["nav"] == plugin.nav()
+    assert lender["apr"] == plugin.apr()
+    assert lender["weightedApr"] == plugin.weightedApr()
+    for amount in amounts:
+        assert lender["aprAfterDeposit"][amount] == plugin.aprAfterDeposit(amount)
+
+    # a new lender is picked up without rebuilding the reader
+    clone = plugin.cloneCompoundV3Lender(strategy, "Clone", plugin.comet(), {"from": gov}).return_value
+    strategy.addLender(clone, {"from": gov})
+    assert len(reader.read()["lenders"]) == 2
@@ -6,7 +6,7 @@ import brownie
 
 
 def test_good_migration(
-    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy, fn_isolation
+    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy
 ):
     currency = usdc
 
@@ -64,7 +64,6 @@ def test_normal_activity(
     rando,
     vault,
     strategy,
-    fn_isolation,
     aUsdc,
 ):
     starting_balance = usdc.balanceOf(strategist)
@@ -169,7 +168,7 @@ def test_normal_activity(
 
 
 def test_debt_increase(
-    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy, fn_isolation
+    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy
 ):
 
     currency = usdc
@@ -232,7 +231,6 @@ def test_vault_shares(
     interface,
     whale,
     strategist,
-    fn_isolation,
 ):
     deposit_limit = 100_000_000 * 1e6
     debt_ratio = 10_000
@@ -341,7 +339,6 @@ def test_apr(
     interface,
     whale,
     strategist,
-    fn_isolation,
 ):
     decimals = currency.decimals()
     deposit_limit = 100_000_000 * 1e6
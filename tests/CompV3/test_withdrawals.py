@@ -19,7 +19,6 @@ def test_withdrawals_work(
     rando,
     vault,
     strategy,
-    fn_isolation,
 ):
     starting_balance = usdc.balanceOf(strategist)
     currency = usdc
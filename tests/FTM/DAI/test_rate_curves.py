@@ -0,0 +1,23 @@
+import pytest
+from brownie import GenericScream, interface
+
+from scripts.rate_curves import CTokenCurve
+
+
+def test_scream_curve(strategy, ftm_dai):
+    plugin = GenericScream.at(strategy.lenders(0))
+    cToken = plugin.cToken()
+    curve = CTokenCurve.from_chain(
+        plugin,
+        blocks_per_year=3154 * 10 ** 4,
+        reward_per_block=interface.ComptrollerI(plugin.unitroller()).compSpeeds(cToken),
+        # want per scream off the same spooky route compBlockShareInWant prices with
+        reward_price=plugin.priceCheck(plugin.scream(), ftm_dai, 10 ** 18) / 1e18,
+    )
+
+    amounts = [0, 1e18, 100_000 * 1e18, 5_000_000 * 1e18]
+    aprs = curve.apr_after_deposit(amounts)
+
+    # the reward leg is a spot price, so a little looser than the rate maths
+    for amount, apr in zip(amounts, aprs):
+        assert apr == pytest.approx(plugin.aprAfterDeposit(amount), rel=1e-4)
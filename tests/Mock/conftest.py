@@ -0,0 +1,122 @@
+import pytest
+from brownie import config
+
+# markets for the mock lenders: (externalSupply, borrows, baseRate, multiplier)
+MARKETS = [
+    (1_000_000 * 10 ** 18, 600_000 * 10 ** 18, 2 * 10 ** 16, 10 * 10 ** 16),
+    (300_000 * 10 ** 18, 250_000 * 10 ** 18, 0, 8 * 10 ** 16),
+    (5_000_000 * 10 ** 18, 2_000_000 * 10 ** 18, 1 * 10 ** 16, 20 * 10 ** 16),
+]
+
+# jump rate markets for MockKinkedLender:
+# (externalSupply, borrows, baseRate, multiplier, jumpMultiplier, kink, reserveFactor)
+KINKED_MARKETS = {
+    # sits just under an 80% kink, deposits pull it further down the gentle slope
+    "compound": (1_000_000 * 10 ** 18, 780_000 * 10 ** 18, 0, 5 * 10 ** 16, 109 * 10 ** 16, 80 * 10 ** 16, 10 * 10 ** 16),
+    # above a 90% kink, the first deposits drop the apr fast
+    "stressed": (1_000_000 * 10 ** 18, 950_000 * 10 ** 18, 0, 4 * 10 ** 16, 300 * 10 ** 16, 90 * 10 ** 16, 10 * 10 ** 16),
+    # borrows exceed everyone else's supply so our funds are partly lent out
+    "illiquid": (200_000 * 10 ** 18, 300_000 * 10 ** 18, 2 * 10 ** 16, 20 * 10 ** 16, 100 * 10 ** 16, 80 * 10 ** 16, 0),
+}
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+@pytest.fixture
+def whale(accounts, currency):
+    currency.mint(accounts[0], 100_000_000 * 10 ** 18, {"from": accounts[0]})
+    yield accounts[0]
+
+
+@pytest.fixture
+def strategist(accounts):
+    yield accounts[1]
+
+
+@pytest.fixture
+def guardian(accounts):
+    yield accounts[2]
+
+
+@pytest.fixture
+def gov(accounts):
+    yield accounts[3]
+
+
+@pytest.fixture
+def rewards(gov):
+    yield gov
+
+
+@pytest.fixture
+def keeper(accounts):
+    yield accounts[4]
+
+
+@pytest.fixture
+def rando(accounts):
+    yield accounts[9]
+
+
+@pytest.fixture
+def currency(MockToken, accounts):
+    yield accounts[0].deploy(MockToken, "Mock Dollar", "mUSD", 18)
+
+
+@pytest.fixture
+def vault(gov, rewards, guardian, currency, pm):
+    Vault = pm(config["dependencies"][0]).Vault
+    vault = Vault.deploy({"from": guardian})
+    vault.initialize(currency, gov, rewards, "", "")
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.setManagementFee(0, {"from": gov})
+    yield vault
+
+
+@pytest.fixture
+def bare_strategy(strategist, gov, keeper, vault, Strategy, EthToEthOracle):
+    strategy = strategist.deploy(Strategy, vault)
+    strategy.setKeeper(keeper, {"from": gov})
+    # keeps ethToWant off the mainnet uniswap router
+    strategy.setPriceOracle(strategist.deploy(EthToEthOracle), {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    yield strategy
+
+
+@pytest.fixture
+def add_lender(strategist, gov, MockLender, MockKinkedLender):
+    """
+    add_lender(strategy, name, market) docks a mock lender. A 4 value market
+    gives a MockLender, a 7 value market a MockKinkedLender.
+    """
+
+    def add(strategy, name, market):
+        container = MockLender if len(market) == 4 else MockKinkedLender
+        lender = strategist.deploy(container, strategy, name, *market)
+        strategy.addLender(lender, {"from": gov})
+        return lender
+
+    yield add
+
+
+@pytest.fixture
+def strategy(bare_strategy, add_lender):
+    for i, market in enumerate(MARKETS):
+        add_lender(bare_strategy, f"Mock{i}", market)
+    yield bare_strategy
+
+
+@pytest.fixture
+def kinked_markets():
+    yield KINKED_MARKETS
+
+
+@pytest.fixture
+def kinked_strategy(bare_strategy, add_lender):
+    for name, market in KINKED_MARKETS.items():
+        add_lender(bare_strategy, name, market)
+    add_lender(bare_strategy, "linear", MARKETS[0])
+    yield bare_strategy
@@ -0,0 +1,48 @@
+from scripts.apr_recorder import STRATEGY, AprStore
+
+
+def snapshot(block, apr, lender_apr=None):
+    lenders = [{"address": "0xLender", "lenderName": "Mock", "nav": 10 ** 21, "apr": lender_apr}]
+    return {"strategy": "0xStrategy", "block": block, "estimatedTotalAssets": 10 ** 24, "estimatedAPR": apr, "lenders": lenders}
+
+
+def test_series_are_append_only_and_sliced_by_block(tmp_path):
+    store = AprStore(str(tmp_path))
+    for block in range(100, 110):
+        store.record(snapshot(block, None if block == 107 else block * 10 ** 15, None if block == 105 else block))
+    # already recorded, ignored
+    store.record(snapshot(104, 1, 1))
+
+    reopened = AprStore(str(tmp_path))
+    assert reopened.last_block("0xStrategy") == 109
+    window = reopened.series("0xStrategy", STRATEGY, start=102, end=105)
+    assert list(window["block"]) == [102, 103, 104]
+    assert list(window["apr"]) == [102 * 10 ** 15, 103 * 10 ** 15, 104 * 10 ** 15]
+
+    # the failed reads are gaps, not zeros
+    assert 107 not in reopened.series("0xStrategy")["block"]
+    lender = reopened.series("0xStrategy", "0xLender")
+    assert 105 not in lender["block"]
+    assert len(lender["apr"]) == 9
+    assert reopened.lenders("0xStrategy") == {"0xLender": "Mock"}
+
+
+def test_torn_append_is_dropped(tmp_path):
+    store = AprStore(str(tmp_path))
+    store.record(snapshot(1, 5, 5))
+    # a crash after writing one column of the next row
+    with open(tmp_path / "0xStrategy" / STRATEGY / "block.u8", "ab") as f:
+        f.write((2).to_bytes(8, "little"))
+
+    reopened = AprStore(str(tmp_path))
+    assert list(reopened.series("0xStrategy")["block"]) == [1]
+    reopened.record(snapshot(2, 6, 6))
+    assert list(reopened.series("0xStrategy")["apr"]) == [5, 6]
+
+
+def test_apr_past_uint64(tmp_path):
+    store = AprStore(str(tmp_path))
+    # 5000%, more than a uint64 holds at 1e18 = 100%
+    store.record(snapshot(1, 50 * 10 ** 18, 50 * 10 ** 18))
+    assert AprStore(str(tmp_path)).series("0xStrategy", "0xLender")["apr"][0] == 5e19
+
@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pytest
+
+from scripts.apr_recorder import AprStore
+from scripts.attribution import ZERO_ADDRESS, Accumulator, attribute
+from scripts.indexer import EventStore
+
+STRATEGY, VAULT, WANT, REWARD, ROUTER, CTOKEN, ATOKEN = "0xS", "0xV", "0xW", "0xR", "0xX", "0xC", "0xQ"
+A, B = "0xA", "0xB"
+
+
+def _transfer(block, index, tx, token, sender, receiver, value, subject):
+    args = {"from": sender, "to": receiver, "value": value}
+    return (block, index, tx, token, "Transfer", subject, json.dumps(args))
+
+
+def _reported(block, gain):
+    return (block, 99, f"0xr{block}", VAULT, "StrategyReported", STRATEGY, json.dumps({"strategy": STRATEGY, "gain": gain, "loss": 0}))
+
+
+@pytest.fixture
+def stores(tmpdir):
+    events = EventStore(str(tmpdir.join("events.sqlite")))
+    events.add_contracts([(STRATEGY, "strategy", STRATEGY), (VAULT, "vault", STRATEGY), (A, "lender", STRATEGY), (B, "lender", STRATEGY)])
+    events.write(
+        [
+            # first harvest, everything into A
+            _transfer(10, 0, "0x1", WANT, VAULT, STRATEGY, 1000, STRATEGY),
+            _transfer(10, 1, "0x1", WANT, STRATEGY, A, 1000, A),
+            _reported(10, 0),
+            # A sells its reward token for 30 want
+            _transfer(20, 0, "0x2", REWARD, A, ROUTER, 5, A),
+            _transfer(20, 1, "0x2", WANT, ROUTER, A, 30, A),
+            # moved to B. the burns are not reward sales and A keeps 5 as a fee
+            _transfer(30, 0, "0x3", CTOKEN, A, CTOKEN, 900, A),
+            _transfer(30, 1, "0x3", WANT, CTOKEN, A, 1075, A),
+            _transfer(30, 2, "0x3", ATOKEN, A, ZERO_ADDRESS, 1, A),
+            _transfer(30, 3, "0x3", WANT, A, STRATEGY, 1075, STRATEGY),
+            _transfer(30, 4, "0x4", WANT, STRATEGY, B, 1075, B),
+            # 2 short of what the lenders earned
+            _reported(40, 93),
+            _reported(60, 10),
+        ],
+        [(10, "0xh10", 0), (60, "0xh60", 0)],
+    )
+
+    aprs = AprStore(str(tmpdir.join("aprs")))
+    for block, a, b in ((10, 1000, 0), (40, 0, 1095), (60, 0, 1105)):
+        aprs.append(STRATEGY, A, block, a, 0)
+        aprs.append(STRATEGY, B, block, b, 0)
+    yield events, aprs
+
+
+def test_attribution_by_lender(stores):
+    result = attribute(*stores, STRATEGY)
+    assert result["lenders"] == [A, B]
+    assert list(result["block"]) == [40, 60]
+    assert list(result["profit"]) == [93, 10]
+
+    # A earned 50, lost 5 leaving and sold rewards for 30
+    assert result["flow"][0].tolist() == [-1075, 1075]
+    assert result["rewards"][0].tolist() == [30, 0]
+    assert result["interest"][0].tolist() == [45, 20]
+    assert result["slippage"][0] == -2
+
+    assert result["interest"][1].tolist() == [0, 10]
+    assert result["slippage"][1] == 0
+
+
+def test_unrecorded_lender_is_nan(stores, tmpdir):
+    events, _ = stores
+    result = attribute(events, AprStore(str(tmpdir.join("empty"))), STRATEGY, WANT)
+    assert np.isnan(result["interest"]).all()
+    # nothing explained, the whole profit is left over less the rewards
+    assert result["slippage"].tolist() == [63, 10]
+
+
+def test_accumulator_matches_a_loop():
+    rng = np.random.default_rng(3)
+    blocks = rng.integers(0, 10_000, 5_000)
+    values = rng.normal(size=5_000)
+    starts = np.sort(rng.integers(0, 10_000, 2_000))
+    ends = starts + rng.integers(0, 500, 2_000)
+
+    summed = Accumulator(blocks, values).between(starts, ends)
+    expected = [values[(blocks > s) & (blocks <= e)].sum() for s, e in zip(starts, ends)]
+    assert np.allclose(summed, expected)
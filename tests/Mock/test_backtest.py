@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from scripts.backtest import Backtest, LenderHistory, RecordedApr, StrategyPolicy, ThresholdPolicy, water_fill
+from scripts.rate_curves import CompoundV3Curve
+
+DAY = 86400
+
+
+def flat(name, aprs):
+    return LenderHistory(name, RecordedApr(np.asarray(aprs, dtype=np.float64)), len(aprs))
+
+
+def test_policies_follow_the_better_lender_and_pay_gas():
+    # hourly samples for 20 days, the lenders swap places between two harvests
+    samples = 20 * 24
+    timestamps = np.arange(samples) * 3600.0
+    swap = np.arange(samples) >= 250
+    lenders = [flat("a", np.where(swap, 2e16, 5e16)), flat("b", np.where(swap, 6e16, 1e16))]
+    total = 10_000_000 * 1e18
+
+    bt = Backtest(timestamps, lenders, total, gas_price=30e9, gas={"harvest": 700_000, "tend": 450_000})
+    for policy in [StrategyPolicy(), ThresholdPolicy()]:
+        result = bt.run(policy)
+        assert result["tends"] == 1
+        assert result["actions"][0] == (0, "harvest")
+        assert (250, "tend") in result["actions"]
+
+        # 5% then 6%, tend at the swap
+        assert result["gross_apr"] == pytest.approx(0.055, rel=1e-2)
+        gas = 0.45e6 * 30e9 * result["tends"] + 0.7e6 * 30e9 * result["harvests"]
+        assert result["gas"] == pytest.approx(gas)
+        assert result["net_apr"] < result["gross_apr"]
+
+    # moving is not worth it when gas costs more than the extra interest
+    assert bt.run(StrategyPolicy(profit_factor=10 ** 9))["tends"] == 0
+
+
+def test_float_water_fill_equalises_aprs():
+    curves = [
+        CompoundV3Curve(50e12, 40e12, 0.8e18, 0, 1.5e9, 1e10),
+        CompoundV3Curve(20e12, 17e12, 0.9e18, 0, 1.2e9, 2e10),
+        CompoundV3Curve(80e12, 30e12, 0.8e18, 0, 1.0e9, 1e10),
+    ]
+    total = 10e12
+    amounts = water_fill(curves, total)
+    assert amounts.sum() == pytest.approx(total)
+
+    aprs = [float(c.apr_after_deposit(a)) for c, a in zip(curves, amounts) if a > 0]
+    assert max(aprs) - min(aprs) < 1e15
+    for c, a in zip(curves, amounts):
+        if a == 0:
+            assert float(c.apr_after_deposit(0)) <= max(aprs)
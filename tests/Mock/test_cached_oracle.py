@@ -0,0 +1,44 @@
+import brownie
+from brownie import ZERO_ADDRESS
+
+
+def test_cached_price_until_ttl_or_deviation(CachedWantToEthOracle, MockWantToEth, strategy, gov, rando, chain):
+    source = gov.deploy(MockWantToEth, 2000 * 10 ** 6)
+    # one hour, 1%
+    oracle = gov.deploy(CachedWantToEthOracle, source, ZERO_ADDRESS, [], 3600, 100)
+
+    # nothing cached yet, reads through
+    assert not oracle.isFresh()
+    assert oracle.needsUpdate()
+    assert oracle.ethToWant(10 ** 18) == 2000 * 10 ** 6
+
+    with brownie.reverts("!keepers"):
+        oracle.update({"from": rando})
+    oracle.setKeeper(rando, True, {"from": gov})
+    oracle.update({"from": rando})
+    assert oracle.wantPerEth() == 2000 * 10 ** 6
+
+    strategy.setPriceOracle(oracle, {"from": gov})
+
+    # small moves keep the cached price
+    source.setPrice(2010 * 10 ** 6, {"from": gov})
+    assert not oracle.needsUpdate()
+    assert strategy.ethToWant(10 ** 18) == 2000 * 10 ** 6
+    assert oracle.wantToEth(2000 * 10 ** 6) == 10 ** 18
+
+    source.setPrice(2100 * 10 ** 6, {"from": gov})
+    assert oracle.needsUpdate()
+    assert strategy.ethToWant(10 ** 18) == 2000 * 10 ** 6
+
+    # past the ttl the live price is used until the next update
+    chain.sleep(3601)
+    chain.mine()
+    assert not oracle.isFresh()
+    assert strategy.ethToWant(10 ** 18) == 2100 * 10 ** 6
+
+
+def test_needs_a_source(CachedWantToEthOracle, gov):
+    with brownie.reverts("!source"):
+        gov.deploy(CachedWantToEthOracle, ZERO_ADDRESS, ZERO_ADDRESS, [], 3600, 100)
+    with brownie.reverts("!deviation"):
+        gov.deploy(CachedWantToEthOracle, gov, ZERO_ADDRESS, [], 3600, 10_001)
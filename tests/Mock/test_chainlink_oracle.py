@@ -0,0 +1,52 @@
+import brownie
+import pytest
+from brownie import ZERO_ADDRESS
+
+DAY = 86400
+
+
+@pytest.mark.parametrize("want_decimals", [6, 8, 18])
+@pytest.mark.parametrize("feed_decimals", [8, 18])
+def test_decimals_matrix(ChainlinkWantToEthOracle, MockAggregator, MockToken, gov, want_decimals, feed_decimals):
+    want = gov.deploy(MockToken, "Mock", "M", want_decimals)
+    # want at $1.25 and eth at $2000, the eth feed always has 8 decimals
+    want_feed = gov.deploy(MockAggregator, feed_decimals, 125 * 10 ** (feed_decimals - 2))
+    eth_feed = gov.deploy(MockAggregator, 8, 2000 * 10 ** 8)
+    oracle = gov.deploy(ChainlinkWantToEthOracle, want, want_feed, DAY, eth_feed, 3600)
+
+    # 1 eth is 1600 want
+    assert oracle.ethToWant(10 ** 18) == 1600 * 10 ** want_decimals
+    assert oracle.wantToEth(1600 * 10 ** want_decimals) == 10 ** 18
+
+
+def test_single_want_eth_feed(ChainlinkWantToEthOracle, MockAggregator, MockToken, gov):
+    want = gov.deploy(MockToken, "Mock Bitcoin", "mBTC", 8)
+    # 1 btc is 16 eth
+    feed = gov.deploy(MockAggregator, 18, 16 * 10 ** 18)
+    oracle = gov.deploy(ChainlinkWantToEthOracle, want, feed, DAY, ZERO_ADDRESS, 0)
+
+    assert oracle.ethToWant(16 * 10 ** 18) == 10 ** 8
+    assert oracle.wantToEth(10 ** 8) == 16 * 10 ** 18
+
+
+def test_stale_or_broken_feeds_revert(ChainlinkWantToEthOracle, MockAggregator, currency, strategy, gov, chain):
+    want_feed = gov.deploy(MockAggregator, 8, 10 ** 8)
+    eth_feed = gov.deploy(MockAggregator, 8, 2000 * 10 ** 8)
+    oracle = gov.deploy(ChainlinkWantToEthOracle, currency, want_feed, DAY, eth_feed, 3600)
+    strategy.setPriceOracle(oracle, {"from": gov})
+    assert strategy.ethToWant(10 ** 18) == 2000 * 10 ** 18
+
+    # the eth feed has the shorter heartbeat
+    chain.sleep(3601)
+    chain.mine()
+    with brownie.reverts("STALE"):
+        strategy.ethToWant(10 ** 18)
+    eth_feed.setAnswer(2000 * 10 ** 8, {"from": gov})
+    assert oracle.ethToWant(10 ** 18) == 2000 * 10 ** 18
+
+    want_feed.setAnswer(-1, {"from": gov})
+    with brownie.reverts("!answer"):
+        oracle.ethToWant(10 ** 18)
+    want_feed.setAnswer(0, {"from": gov})
+    with brownie.reverts("!answer"):
+        oracle.wantToEth(10 ** 18)
@@ -0,0 +1,12 @@
+from scripts.clone_planner import EIP1167_PREFIX, EIP1167_SUFFIX, eip1167_target, find_implementation
+
+
+def test_find_implementation_skips_other_code(MockToken, currency, strategy):
+    assert find_implementation(MockToken, [strategy.address, currency.address]) == currency.address
+    assert find_implementation(MockToken, [strategy.address]) is None
+
+
+def test_proxies_point_at_their_implementation(currency):
+    proxy = EIP1167_PREFIX + bytes.fromhex(currency.address[2:]) + EIP1167_SUFFIX
+    assert eip1167_target(proxy) == currency.address
+    assert eip1167_target(proxy[:-1]) is None
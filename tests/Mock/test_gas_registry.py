@@ -0,0 +1,71 @@
+from brownie import web3
+
+from scripts import gas_registry
+from scripts.backtest import tend_gas_from_registry
+from scripts.gas_calibration import calibrate
+
+DEPOSIT = 2_000_000 * 10 ** 18
+
+
+def _registry():
+    registry = gas_registry.empty()
+    gas = {"deposit": {100: 150_000, 10_000: 160_000}, "withdrawAll": {100: 90_000, 10_000: 95_000}, "harvest": {}}
+    gas_registry.record_lender(registry, 1, 100, "0x01", "GenericAaveV3", "AaveV3", "0xS", gas)
+    gas = {"deposit": {100: 170_000}, "withdrawAll": {100: 80_000}, "harvest": {100: 400_000}}
+    gas_registry.record_lender(registry, 1, 200, "0x02", "GenericAaveV3", "AaveV3", "0xS2", gas)
+    gas_registry.record_strategy(registry, 1, "0xS", 60_000)
+    return registry
+
+
+def test_gas_at_nearest_size():
+    registry = _registry()
+    assert registry["chains"]["1"]["block"] == 200
+    assert registry["chains"]["1"]["sizes"] == [100, 10_000]
+
+    assert gas_registry.gas_at(registry, 1, "0x01", "deposit", 50) == 150_000
+    assert gas_registry.gas_at(registry, 1, "0x01", "deposit", 5_000) == 160_000
+    assert gas_registry.gas_at(registry, 1, "0x01", "deposit") == 160_000
+    # nothing for the lender itself, the plugin has it from the other one
+    assert gas_registry.gas_at(registry, 1, "0x01", "harvest") == 400_000
+    # the plugin keeps the most any lender used
+    assert gas_registry.gas_at(registry, 1, "0x03", "deposit", 100, "GenericAaveV3") == 170_000
+    assert gas_registry.gas_at(registry, 1, "0x03", "deposit", 100, "GenericCream") is None
+    assert gas_registry.gas_at(registry, 10, "0x01", "deposit") is None
+
+    assert gas_registry.tend_base_gas(registry, 1, "0xS") == 60_000
+    assert gas_registry.tend_base_gas(registry, 1, "0xS3") == 60_000
+    assert gas_registry.tend_base_gas(registry, 10, "0xS") is None
+
+
+def test_registry_round_trip(tmpdir):
+    path = str(tmpdir.join("gas", "registry.json"))
+    assert gas_registry.load(path) == gas_registry.empty()
+    gas_registry.save(_registry(), path)
+    assert gas_registry.load(path) == _registry()
+
+    # base + the dearest withdrawAll + the dearest deposit
+    assert tend_gas_from_registry(path, 1, "0xS", ["0x01", "0x02"]) == 60_000 + 95_000 + 170_000
+    assert tend_gas_from_registry(path, 10, "0xS", ["0x01"]) is None
+
+
+def test_calibrate_mock_strategy(strategy, currency, vault, whale, gov):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(DEPOSIT, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    registry = gas_registry.empty()
+    calibrate(registry, strategy, sizes=(100, 1_000_000, 10 ** 9))
+    measured = registry["chains"][str(web3.eth.chain_id)]
+    assert measured["sizes"] == [100, 1_000_000]
+    assert strategy.address in measured["strategies"]
+
+    assert len(measured["lenders"]) == 3
+    for lender in measured["lenders"].values():
+        assert lender["plugin"] == "MockLender"
+        for op in ["deposit", "withdraw", "withdrawAll", "aprAfterDeposit"]:
+            # every size but the one there was not enough for
+            assert set(lender["gas"][op]) == {"100", "1000000"}
+            assert all(0 < used < 300_000 for used in lender["gas"][op].values())
+        # MockLender has nothing to harvest
+        assert lender["gas"]["harvest"] == {}
+    assert set(measured["plugins"]) == {"MockLender"}
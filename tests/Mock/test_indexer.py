@@ -0,0 +1,73 @@
+import json
+
+from brownie import chain, web3
+
+from scripts.indexer import EventStore, Indexer
+
+DEPOSIT = 100_000 * 10 ** 18
+
+
+def _index(strategy, tmpdir):
+    store = EventStore(str(tmpdir.join("events.sqlite")))
+    # small ranges so a sync takes several
+    return store, Indexer(web3, store, [strategy.address], batch=2)
+
+
+def test_indexes_a_harvest(strategy, currency, vault, whale, gov, tmpdir):
+    start = web3.eth.block_number
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(DEPOSIT, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    store, indexer = _index(strategy, tmpdir)
+    assert indexer.sync(start) == web3.eth.block_number
+    assert store.checkpoint() == web3.eth.block_number
+    assert len(store.contracts("lender")) == 3
+
+    deposit = store.events(subject=vault.address, event="Deposit")
+    assert [e["args"]["amount"] for e in deposit] == [DEPOSIT]
+    reported = store.events(subject=strategy.address, event="StrategyReported")
+    assert len(reported) == 1 and reported[0]["args"]["debtAdded"] == DEPOSIT
+    assert len(store.events(subject=strategy.address, event="Harvested")) == 1
+
+    # vault to strategy, then strategy to the lender it picked
+    transfers = [e for e in store.events(event="Transfer") if e["block"] == reported[0]["block"]]
+    assert [(e["args"]["from"], e["args"]["value"]) for e in transfers][0] == (vault.address, DEPOSIT)
+    assert transfers[1]["args"]["from"] == strategy.address
+    assert transfers[1]["subject"] in store.contracts("lender")
+
+    # a restart picks up after the checkpoint
+    strategy.harvest({"from": gov})
+    assert indexer.sync() == web3.eth.block_number
+    assert len(store.events(subject=strategy.address, event="StrategyReported")) == 2
+
+
+def test_reorg_is_rolled_back(strategy, currency, vault, whale, gov, rando, tmpdir):
+    start = web3.eth.block_number
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(DEPOSIT, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    store, indexer = _index(strategy, tmpdir)
+    indexer.sync(start)
+    harvest_block = web3.eth.block_number
+
+    # the harvest block is replaced by one without it
+    chain.undo()
+    currency.transfer(rando, 1, {"from": whale})
+    assert web3.eth.block_number == harvest_block
+
+    indexer.sync()
+    assert store.events(event="StrategyReported") == []
+    assert store.events(event="Harvested") == []
+    assert len(store.events(event="Deposit")) == 1
+    assert store.checkpoint() == harvest_block
+
+
+def test_transfer_values_keep_full_precision(tmpdir):
+    store = EventStore(str(tmpdir.join("events.sqlite")))
+    # past 2**63, where sqlite's json_extract returns a float
+    value = 123456789012345678901234
+    args = json.dumps({"from": "0xFrom", "to": "0xLender", "value": value})
+    store.write([(1, 0, "0xtx", "0xToken", "Transfer", "0xLender", args)], [(1, "0xhash", 0)])
+    assert store.transfers(["0xLender"]) == [(1, "0xtx", "0xToken", "0xFrom", "0xLender", value)]
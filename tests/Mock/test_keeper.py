@@ -0,0 +1,91 @@
+import asyncio
+import logging
+
+from brownie import accounts, web3
+
+from scripts.keeper import ChainKeeper
+
+DEPOSIT = 100_000 * 10 ** 18
+# callCost the triggers are priced at. enough for the deposit and a better
+# lender, far more than a few seconds of interest
+CALL_COST = 10 ** 15
+
+
+async def _once(keeper):
+    """sends what poll queued like run(once=True), then waits for the receipts"""
+    sender = asyncio.create_task(keeper.sender())
+    await keeper.queue.join()
+    while keeper.in_flight:
+        await asyncio.sleep(0.1)
+    sender.cancel()
+
+
+def test_poll_and_send(strategy, currency, vault, whale, gov, monkeypatch, caplog):
+    account = accounts.add()
+    whale.transfer(account, 10 ** 18)
+    strategy.setKeeper(account, {"from": gov})
+    monkeypatch.setenv("TEST_KEEPER_KEY", account.private_key)
+    settings = {
+        "rpc": web3.provider.endpoint_uri,
+        "key_env": "TEST_KEEPER_KEY",
+        "trigger_gas": max(CALL_COST // web3.eth.gas_price, 1),
+        "strategies": [{"address": strategy.address}],
+    }
+    keeper = ChainKeeper("dev", settings)
+    key = (strategy.address, "harvest")
+
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(DEPOSIT, {"from": whale})
+
+    async def run():
+        # a tendTrigger that is always true, the harvest still wins
+        trigger = keeper._trigger
+
+        async def tend_too(contract, name, call_cost, plugin=False):
+            if contract.address == strategy.address and name == "tendTrigger":
+                return True
+            return await trigger(contract, name, call_cost, plugin)
+
+        keeper._trigger = tend_too
+        await keeper.poll()
+        keeper._trigger = trigger
+        # polled again before the sender ran, nothing is queued twice
+        await keeper.poll()
+        assert keeper.queue.qsize() == 1
+        assert keeper.in_flight == {key}
+        await _once(keeper)
+
+        assert vault.strategies(strategy).dict()["totalDebt"] == DEPOSIT
+        assert keeper.nonce == web3.eth.get_transaction_count(account.address) == 1
+        assert keeper.unconfirmed == 0
+
+        # everything in one lender so a better one is out there
+        strategy.manualAllocation([[strategy.lenders(1), 1000]], {"from": gov})
+        assert not strategy.harvestTrigger(CALL_COST) and strategy.tendTrigger(CALL_COST)
+        before = strategy.lendStatuses()
+        await keeper.poll()
+        assert keeper.in_flight == {(strategy.address, "tend")}
+        await _once(keeper)
+        assert strategy.lendStatuses() != before
+        assert keeper.nonce == web3.eth.get_transaction_count(account.address) == 2
+
+    # the mock lenders have no harvestTrigger, which is not worth a warning
+    with caplog.at_level(logging.WARNING, logger="keeper"):
+        asyncio.run(run())
+    assert caplog.records == []
+
+
+def test_strategy_trigger_failure_is_a_warning(strategy, gov, monkeypatch, caplog):
+    account = accounts.add()
+    monkeypatch.setenv("TEST_KEEPER_KEY", account.private_key)
+    # a lender rather than a strategy, both triggers revert
+    settings = {
+        "rpc": web3.provider.endpoint_uri,
+        "key_env": "TEST_KEEPER_KEY",
+        "strategies": [{"address": strategy.lenders(0), "plugins": []}],
+    }
+    keeper = ChainKeeper("dev", settings)
+    with caplog.at_level(logging.WARNING, logger="keeper"):
+        asyncio.run(keeper.poll())
+    assert keeper.queue.qsize() == 0
+    assert sum("Trigger failed" in record.getMessage() for record in caplog.records) == 2
@@ -0,0 +1,65 @@
+import brownie
+import pytest
+from brownie import chain
+
+from scripts.allocation_model import KinkedRateModel, Lender
+from useful_methods import assert_matches, mirror
+
+
+@pytest.mark.parametrize("name", ["compound", "stressed", "illiquid"])
+@pytest.mark.parametrize("amount", [0, 10 ** 18, 50_000 * 10 ** 18, 2_000_000 * 10 ** 18])
+def test_apr_matches_model(bare_strategy, add_lender, kinked_markets, name, amount):
+    lender = add_lender(bare_strategy, name, kinked_markets[name])
+    model = Lender(name, KinkedRateModel(*kinked_markets[name]))
+
+    assert lender.aprAfterDeposit(amount) == model.apr_after_deposit(amount)
+
+
+def test_jump_above_kink(bare_strategy, add_lender, kinked_markets):
+    lender = add_lender(bare_strategy, "stressed", kinked_markets["stressed"])
+    external_supply, borrows = kinked_markets["stressed"][:2]
+
+    # deposit just enough to bring utilization down to the kink
+    to_kink = borrows * 10 ** 18 // (90 * 10 ** 16) - external_supply
+    above = lender.apr() - lender.aprAfterDeposit(to_kink // 2)
+    below = lender.aprAfterDeposit(to_kink) - lender.aprAfterDeposit(to_kink + to_kink // 2)
+    assert above > 5 * below
+
+
+def test_illiquid_withdrawal(bare_strategy, add_lender, kinked_markets, currency, whale, gov):
+    lender = add_lender(bare_strategy, "illiquid", kinked_markets["illiquid"])
+    currency.transfer(lender, 1_000_000 * 10 ** 18, {"from": whale})
+
+    assert lender.liquidity() == 900_000 * 10 ** 18
+    with brownie.reverts("WITHDRAW FAILED"):
+        bare_strategy.safeRemoveLender(lender, {"from": gov})
+
+    bare_strategy.forceRemoveLender(lender, {"from": gov})
+    assert lender.nav() == 100_000 * 10 ** 18
+    assert lender.liquidity() == 0
+
+
+def test_harvest_cycles(kinked_strategy, vault, currency, whale, gov, MockLender, MockKinkedLender):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(1_500_000 * 10 ** 18, {"from": whale})
+
+    model = mirror(kinked_strategy, vault, currency, MockLender, MockKinkedLender)
+    for i in range(4):
+        if i == 2:
+            vault.updateStrategyDebtRatio(kinked_strategy, 2_000, {"from": gov})
+
+        debt_outstanding = vault.debtOutstanding(kinked_strategy)
+        debt_before = vault.strategies(kinked_strategy).dict()["totalDebt"]
+        model.total_debt = debt_before
+
+        profit, loss, debt_payment = model.prepare_return(debt_outstanding)
+        chain.sleep(3600)
+        event = kinked_strategy.harvest({"from": gov}).events["Harvested"]
+        assert (profit, loss, debt_payment) == (event["profit"], event["loss"], event["debtPayment"])
+
+        debt_after = vault.strategies(kinked_strategy).dict()["totalDebt"]
+        model.loose += debt_after - debt_before + loss - profit
+        model.total_debt = debt_after
+        model.adjust_position(event["debtOutstanding"])
+
+        assert_matches(model, kinked_strategy, currency)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from scripts.allocation_model import KinkedRateModel, Lender, StrategyModel
+from scripts.liquidity_stress import StressTest, drain
+
+# (external supply, borrows), the second is lent out past our deposit
+MARKETS = [
+    (1_000_000 * 10 ** 18, 780_000 * 10 ** 18),
+    (200_000 * 10 ** 18, 300_000 * 10 ** 18),
+    (5_000_000 * 10 ** 18, 1_000_000 * 10 ** 18),
+]
+
+
+def build(stressed=False):
+    lenders = []
+    for i, (supply, borrows) in enumerate(MARKETS):
+        if stressed:
+            # a utilization spike leaves 40k of each 400k position in cash
+            borrows = supply + 360_000 * 10 ** 18
+        rate_model = KinkedRateModel(supply, borrows, 0, 5 * 10 ** 16, 109 * 10 ** 16, 80 * 10 ** 16)
+        lenders.append(Lender(f"L{i}", rate_model, 400_000 * 10 ** 18))
+    return StrategyModel(lenders, loose=20_000 * 10 ** 18, withdrawal_threshold=10 ** 16)
+
+
+# inside loose, dust past loose, one lender, several, more than there is cash
+NEEDED = [10 ** 18, 20_000 * 10 ** 18 + 10 ** 15, 300_000 * 10 ** 18, 900_000 * 10 ** 18, 1_300_000 * 10 ** 18]
+
+
+@pytest.mark.parametrize("stressed", [False, True])
+@pytest.mark.parametrize("needed", NEEDED)
+def test_drain_matches_the_model(needed, stressed):
+    model = build(stressed)
+    available = [l.rate_model.liquidity(l.nav()) for l in model.lenders]
+    aprs = [l.apr() for l in model.lenders]
+    received, calls = drain([needed], available, aprs, [True] * 3, model.loose, model.withdrawal_threshold)
+
+    expected, _ = build(stressed).liquidate_position(needed)
+    assert received[0] == pytest.approx(expected, rel=1e-12)
+
+    # the same lenders drained by withdraw_some, counting its withdraw calls
+    model = build(stressed)
+    called = []
+    for lender in model.lenders:
+        lender.withdraw = lambda amount, withdraw=lender.withdraw: called.append(amount) or withdraw(amount)
+    loose = model.loose
+    withdrawn = model.withdraw_some(needed - loose) if needed > loose else 0
+    assert received[0] == pytest.approx(min(needed, loose) + withdrawn, rel=1e-12)
+    assert calls[0] == len(called)
+
+
+def test_shortfall_only_in_stressed_markets():
+    spec = {
+        "withdrawal": [2, 2],
+        "lenders": [
+            {"nav": 1e24, "apr": 2e16, "supply": 1e25, "utilization": [10, 90], "stressed_utilization": [1000, 1]},
+            {"nav": 1e24, "apr": 3e16, "supply": 1e25, "utilization": [10, 90], "stressed_utilization": [1000, 1]},
+        ],
+    }
+    shortfall, calls = StressTest(dict(spec, event_probability=0), seed=1).run(100_000)
+    assert (shortfall == 0).all()
+    assert set(np.unique(calls)) <= {1, 2}
+
+    shortfall, _ = StressTest(dict(spec, event_probability=1), seed=1).run(100_000)
+    assert (shortfall > 0).mean() > 0.9
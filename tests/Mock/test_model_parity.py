@@ -0,0 +1,74 @@
+import pytest
+from brownie import chain
+
+from useful_methods import assert_matches, mirror
+
+
+@pytest.mark.parametrize("amount", [0, 10 ** 18, 250_000 * 10 ** 18, 5_000_000 * 10 ** 18])
+def test_estimate_adjust_position(strategy, vault, currency, whale, MockLender, amount):
+    currency.transfer(strategy, amount, {"from": whale})
+
+    model = mirror(strategy, vault, currency, MockLender)
+    assert model.estimate_adjust_position() == strategy.estimateAdjustPosition()
+
+
+def test_harvest_cycles(strategy, vault, currency, whale, gov, MockLender):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(1_000_000 * 10 ** 18, {"from": whale})
+
+    model = mirror(strategy, vault, currency, MockLender)
+
+    for i in range(6):
+        # interest lands on whichever lender holds funds
+        for j in range(strategy.numLenders()):
+            lender = MockLender.at(strategy.lenders(j))
+            if lender.hasAssets():
+                currency.transfer(lender, 1_000 * 10 ** 18, {"from": whale})
+                model.lenders[j].deposit(1_000 * 10 ** 18)
+
+        if i == 3:
+            vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+
+        debt_outstanding = vault.debtOutstanding(strategy)
+        debt_before = vault.strategies(strategy).dict()["totalDebt"]
+        model.total_debt = debt_before
+
+        profit, loss, debt_payment = model.prepare_return(debt_outstanding)
+        chain.sleep(3600)
+        tx = strategy.harvest({"from": gov})
+        event = tx.events["Harvested"]
+        assert (profit, loss, debt_payment) == (
+            event["profit"],
+            event["loss"],
+            event["debtPayment"],
+        )
+
+        debt_after = vault.strategies(strategy).dict()["totalDebt"]
+        credit = debt_after - debt_before + loss + debt_payment
+        model.loose += credit - profit - debt_payment
+        model.total_debt = debt_after
+        model.adjust_position(event["debtOutstanding"])
+
+        assert_matches(model, strategy, currency)
+
+
+def test_withdrawals(strategy, vault, currency, whale, gov, MockLender):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(3_000_000 * 10 ** 18, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    # spread the funds so withdrawals have to walk several lenders
+    positions = [[strategy.lenders(i), share] for i, share in enumerate([200, 300, 500])]
+    strategy.manualAllocation(positions, {"from": gov})
+
+    model = mirror(strategy, vault, currency, MockLender)
+    for shares in [10 ** 18, 400_000 * 10 ** 18, 1_500_000 * 10 ** 18]:
+        # no profit reported yet so shares are worth exactly one want each
+        freed, _ = model.liquidate_position(shares)
+        model.loose -= freed
+
+        before = currency.balanceOf(whale)
+        vault.withdraw(shares, {"from": whale})
+        assert currency.balanceOf(whale) - before == freed
+
+        assert_matches(model, strategy, currency)
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from brownie import web3
+from web3 import AsyncHTTPProvider, AsyncWeb3
+
+from scripts.monitor import APR, NAV, Monitor
+
+DEPOSIT = 100_000 * 10 ** 18
+
+
+def test_only_changes_are_sent(strategy, currency, vault, whale, gov):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(DEPOSIT, {"from": whale})
+    strategy.harvest({"from": gov})
+    lenders = [strategy.lenders(i) for i in range(3)]
+
+    # the gating needs the storage slots from eth_createAccessList
+    probe = web3.provider.make_request("eth_createAccessList", [{"to": lenders[0], "data": NAV}, "latest"])
+    if "error" in probe:
+        pytest.skip("node has no eth_createAccessList")
+
+    sent = []
+    monitor = Monitor(AsyncWeb3(AsyncHTTPProvider(web3.provider.endpoint_uri)), [strategy.address], sent.append)
+
+    # the nav and apr calls, the storage reads pass no call dict
+    calls = []
+    batch = monitor._batch
+
+    async def counting(requests):
+        calls.extend(args[0]["data"] for _, args in requests if isinstance(args[0], dict))
+        return await batch(requests)
+
+    monitor._batch = counting
+
+    async def watch():
+        await monitor.on_block(web3.eth.block_number)
+        # the first read of every lender
+        assert sorted(change["lender"] for change in sent) == sorted(lenders)
+        assert all(change["previous"] is None for change in sent)
+        assert all(watch.slots for watch in monitor.watches.values())
+        sent.clear()
+        calls.clear()
+
+        # nothing touched our lenders, so none is due and none is called
+        currency.transfer(gov, 1, {"from": whale})
+        await monitor.on_block(web3.eth.block_number)
+        assert sent == []
+        assert NAV not in calls and APR not in calls
+
+        currency.transfer(lenders[2], 5 * 10 ** 18, {"from": whale})
+        await monitor.on_block(web3.eth.block_number)
+        assert [change["lender"] for change in sent] == [lenders[2]]
+        assert sent[0]["nav"] - sent[0]["previous"]["nav"] == 5 * 10 ** 18
+        # only the lender whose balance slot changed
+        assert calls == [NAV, APR]
+
+    asyncio.run(watch())
@@ -0,0 +1,69 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hexbytes import HexBytes
+
+from scripts.rpc_cache import CachingProxy, ResponseCache
+
+
+def test_pinned_reads_are_served_from_cache(currency, whale, web3, chain):
+    upstream = web3.provider.endpoint_uri
+    cache = ResponseCache(":memory:")
+    proxy = CachingProxy(upstream, cache)
+
+    block = hex(chain.height)
+    requests = [
+        {"jsonrpc": "2.0", "id": 1, "method": "eth_getCode", "params": [currency.address, block]},
+        {"jsonrpc": "2.0", "id": 2, "method": "eth_getStorageAt", "params": [currency.address, "0x0", block]},
+        {"jsonrpc": "2.0", "id": 3, "method": "eth_call", "params": [{"to": currency.address, "data": currency.totalSupply.encode_input()}, block]},
+    ]
+    first = proxy.handle(requests)
+    forwarded = proxy.forwarded
+    assert HexBytes(first[0]["result"]) == web3.eth.get_code(currency.address)
+
+    # state moves on but the pinned block does not
+    currency.mint(whale, 10 ** 18, {"from": whale})
+    assert proxy.handle(requests) == first
+    assert proxy.forwarded == forwarded
+
+    offline = CachingProxy(upstream, cache, offline=True)
+    assert offline.handle(requests) == first
+    latest = {"jsonrpc": "2.0", "id": 4, "method": "eth_getCode", "params": [currency.address, "latest"]}
+    assert "error" in offline.handle([latest])[0]
+
+
+def _upstream(status, body):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_upstream_failures_answer_every_request():
+    requests = [
+        {"jsonrpc": "2.0", "id": 7, "method": "eth_blockNumber"},
+        {"jsonrpc": "2.0", "id": 8, "method": "eth_getCode", "params": ["0x" + "11" * 20, "0x10"]},
+    ]
+    refused = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch too large"}}
+    for status, body in ((429, {"message": "rate limited"}), (200, refused)):
+        server = _upstream(status, body)
+        proxy = CachingProxy(f"http://127.0.0.1:{server.server_address[1]}", ResponseCache(":memory:"), chain_id=1)
+        try:
+            responses = proxy.handle(requests)
+        finally:
+            server.shutdown()
+        assert [r["id"] for r in responses] == [7, 8]
+        assert all("error" in r and "result" not in r for r in responses)
+    assert responses[0]["error"]["message"] == "batch too large"
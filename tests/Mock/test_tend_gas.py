@@ -0,0 +1,61 @@
+import brownie
+
+DEPOSIT = 100_000 * 10 ** 18
+CALL_COST = 10 ** 6 * 10 ** 9
+
+
+def test_tend_call_cost_needs_both_lenders(strategy, gov, rando):
+    lenders = [strategy.lenders(i) for i in range(3)]
+    with brownie.reverts("NOT LENDER"):
+        strategy.setLenderGas(rando, 1, 1, {"from": gov})
+    with brownie.reverts():
+        strategy.setLenderGas(lenders[0], 1, 1, {"from": rando})
+    with brownie.reverts("GAS TOO HIGH"):
+        strategy.setLenderGas(lenders[0], 2 ** 128, 1, {"from": gov})
+    with brownie.reverts("GAS TOO HIGH"):
+        strategy.setLenderGas(lenders[0], 1, 2 ** 128, {"from": gov})
+
+    # not switched on yet
+    strategy.setLenderGas(lenders[0], 120_000, 150_000, {"from": gov})
+    assert strategy.tendCallCost(CALL_COST, 0, 1) == CALL_COST
+
+    strategy.setTendGas(100_000, 10 ** 6, {"from": gov})
+    # the deposit side is still unknown
+    assert strategy.tendCallCost(CALL_COST, 0, 1) == CALL_COST
+
+    strategy.setLenderGas(lenders[1], 90_000, 200_000, {"from": gov})
+    # 100k base + 120k out of lender 0 + 200k into lender 1
+    assert strategy.tendCallCost(CALL_COST, 0, 1) == CALL_COST * 420_000 // 10 ** 6
+    # 100k base + 90k out of lender 1 + 150k into lender 0
+    assert strategy.tendCallCost(CALL_COST, 1, 0) == CALL_COST * 340_000 // 10 ** 6
+
+    strategy.safeRemoveLender(lenders[1], {"from": gov})
+    assert strategy.lenderGasCosts(lenders[1]) == (0, 0)
+
+
+def test_tend_trigger_prices_the_move(strategy, currency, vault, whale, gov):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(DEPOSIT, {"from": whale})
+    strategy.harvest({"from": gov})
+    lenders = [strategy.lenders(i) for i in range(3)]
+
+    # everything in one lender so a better one is out there
+    strategy.manualAllocation([[lenders[1], 1000]], {"from": gov})
+    lowest, lowest_apr, highest, potential = strategy.estimateAdjustPosition()
+    assert potential > lowest_apr
+
+    # a call cost just too high for the profit factor
+    cost = 10 ** 9
+    assert strategy.tendTrigger(cost)
+    while strategy.tendTrigger(cost * 2):
+        cost *= 2
+    assert strategy.tendTrigger(cost) and not strategy.tendTrigger(cost * 2)
+    cost *= 2
+
+    # the move is calibrated at half the gas the keeper prices callCost with
+    for lender in lenders:
+        strategy.setLenderGas(lender, 200_000, 200_000, {"from": gov})
+    strategy.setTendGas(100_000, 10 ** 6, {"from": gov})
+    assert strategy.tendCallCost(cost, lowest, highest) == cost // 2
+    assert strategy.tendTrigger(cost)
+
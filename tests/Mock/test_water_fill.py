@@ -0,0 +1,85 @@
+import brownie
+import pytest
+
+from scripts.allocation_model import optimal_allocation
+from useful_methods import assert_matches, mirror
+
+
+def test_target_allocation_equalises_aprs(strategy, vault, currency, whale, gov, MockLender):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(2_000_000 * 10 ** 18, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    model = mirror(strategy, vault, currency, MockLender)
+    ratios = optimal_allocation(model)
+    assert len(ratios) > 1
+
+    strategy.setTargetAllocation([[strategy.lenders(i), share] for i, share in ratios], {"from": gov})
+    model.set_target_allocation(ratios)
+    strategy.tend({"from": gov})
+    model.adjust_position()
+
+    assert_matches(model, strategy, currency)
+
+    # funded lenders end up within a rounding step of each other
+    aprs = [status[2] for status in strategy.lendStatuses() if status[1] > 0]
+    assert max(aprs) - min(aprs) < 10 ** 15
+    # and nothing left out could beat them
+    for status in strategy.lendStatuses():
+        if status[1] == 0:
+            assert MockLender.at(status[3]).aprAfterDeposit(10 ** 18) <= max(aprs)
+
+
+def test_rebalance_only_moves_the_difference(strategy, vault, currency, whale, gov, MockLender):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(1_000_000 * 10 ** 18, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    lenders = [strategy.lenders(i) for i in range(3)]
+    strategy.setTargetAllocation([[lenders[0], 400], [lenders[1], 600]], {"from": gov})
+    strategy.tend({"from": gov})
+
+    strategy.setTargetAllocation([[lenders[0], 500], [lenders[1], 500]], {"from": gov})
+    model = mirror(strategy, vault, currency, MockLender)
+    model.set_target_allocation([(0, 500), (1, 500)])
+    tx = strategy.tend({"from": gov})
+    model.adjust_position()
+
+    assert_matches(model, strategy, currency)
+    # a tenth of the funds moved rather than everything
+    assert tx.events["Transfer"][0]["value"] == 100_000 * 10 ** 18
+
+
+def test_set_target_allocation(strategy, gov, rando, strategist, MockLender):
+    lenders = [strategy.lenders(i) for i in range(3)]
+
+    with brownie.reverts("SHARE!=1000"):
+        strategy.setTargetAllocation([[lenders[0], 400], [lenders[1], 500]], {"from": gov})
+    with brownie.reverts("NOT LENDER"):
+        strategy.setTargetAllocation([[rando, 1000]], {"from": gov})
+    with brownie.reverts("DUPLICATE LENDER"):
+        strategy.setTargetAllocation([[lenders[0], 400], [lenders[1], 300], [lenders[0], 300]], {"from": gov})
+    with brownie.reverts():
+        strategy.setTargetAllocation([[lenders[0], 1000]], {"from": rando})
+
+    strategy.setTargetAllocation([[lenders[0], 1000]], {"from": strategist})
+    assert strategy.numTargets() == 1
+    # tending to a target is left to whoever set it
+    assert not strategy.tendTrigger(0)
+
+    # removing a lender falls back to the default algorithm
+    strategy.safeRemoveLender(lenders[2], {"from": gov})
+    assert strategy.numTargets() == 0
+
+    strategy.setTargetAllocation([[lenders[1], 1000]], {"from": gov})
+    strategy.setTargetAllocation([], {"from": gov})
+    assert strategy.numTargets() == 0
+
+
+@pytest.mark.parametrize("total", [10 ** 18, 750_000 * 10 ** 18, 20_000_000 * 10 ** 18])
+def test_solver_ratios_add_up(strategy, vault, currency, whale, MockLender, total):
+    currency.transfer(strategy, total, {"from": whale})
+    model = mirror(strategy, vault, currency, MockLender)
+
+    ratios = optimal_allocation(model)
+    assert sum(share for _, share in ratios) == 1000
@@ -0,0 +1,45 @@
+import pytest
+from brownie import chain
+
+DEPOSIT = 100_000 * 10 ** 18
+
+
+@pytest.fixture
+def harness(strategist, vault, WithdrawHarness):
+    yield strategist.deploy(WithdrawHarness, vault)
+
+
+def add_lenders(harness, count, currency, whale, strategist, gov, MockLender):
+    for i in range(count):
+        # spread the external supply so every lender quotes a different apr
+        market = ((i + 1) * 500_000 * 10 ** 18, 300_000 * 10 ** 18, 10 ** 16, 10 * 10 ** 16)
+        lender = strategist.deploy(MockLender, harness, f"Mock{i}", *market)
+        harness.addLender(lender, {"from": gov})
+        currency.transfer(lender, DEPOSIT, {"from": whale})
+
+
+@pytest.mark.parametrize("count", [2, 5, 10])
+def test_sorted_withdraw_is_cheaper(harness, currency, whale, strategist, gov, MockLender, count):
+    add_lenders(harness, count, currency, whale, strategist, gov, MockLender)
+
+    # spans half the lenders so the legacy 6 pass cap never kicks in
+    amount = DEPOSIT * ((count + 1) // 2)
+
+    legacy = harness.legacyWithdrawSome(amount, {"from": gov})
+    legacy_navs = [status[1] for status in harness.lendStatuses()]
+    chain.undo()
+
+    sorted_ = harness.withdrawSome(amount, {"from": gov})
+    assert [status[1] for status in harness.lendStatuses()] == legacy_navs
+    assert sorted_.return_value == legacy.return_value == amount
+
+    assert sorted_.gas_used < legacy.gas_used
+
+
+def test_drains_every_lender(harness, currency, whale, strategist, gov, MockLender):
+    # the legacy loop gives up after 6 lenders
+    add_lenders(harness, 8, currency, whale, strategist, gov, MockLender)
+
+    tx = harness.withdrawSome(8 * DEPOSIT, {"from": gov})
+    assert tx.return_value == 8 * DEPOSIT
+    assert harness.lentTotalAssets() == 0
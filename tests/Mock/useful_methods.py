@@ -0,0 +1,35 @@
+from scripts.allocation_model import KinkedRateModel, Lender, LinearRateModel, StrategyModel
+
+
+def rate_model(lender):
+    """The allocation_model rate model matching a deployed mock lender"""
+    market = [lender.externalSupply(), lender.borrows(), lender.baseRate(), lender.multiplier()]
+    if hasattr(lender, "kink"):
+        return KinkedRateModel(*market, lender.jumpMultiplier(), lender.kink(), lender.reserveFactor())
+    return LinearRateModel(*market)
+
+
+def mirror(strategy, vault, currency, MockLender, MockKinkedLender=None):
+    lenders = []
+    for i in range(strategy.numLenders()):
+        address = strategy.lenders(i)
+        if MockKinkedLender is not None and address in MockKinkedLender:
+            lender = MockKinkedLender.at(address)
+        else:
+            lender = MockLender.at(address)
+        lenders.append(Lender(lender.lenderName(), rate_model(lender), lender.nav()))
+
+    return StrategyModel(
+        lenders,
+        loose=currency.balanceOf(strategy),
+        total_debt=vault.strategies(strategy).dict()["totalDebt"],
+        withdrawal_threshold=strategy.withdrawalThreshold(),
+    )
+
+
+def assert_matches(model, strategy, currency):
+    assert model.loose == currency.balanceOf(strategy)
+    for i, lender in enumerate(model.lenders):
+        assert lender.nav() == strategy.lendStatuses()[i][1]
+        assert lender.apr() == strategy.lendStatuses()[i][2]
+    assert model.estimated_apr() == strategy.estimatedAPR()
@@ -0,0 +1,34 @@
+import brownie
+
+
+def test_batch_harvest_without_trigger(
+    currency, whale, gov, strategist, rando, keeper, vault, strategy, GenericAaveMorpho, LenderHarvester, amount
+):
+    plugin = GenericAaveMorpho.at(strategy.lenders(0))
+
+    harvester = strategist.deploy(LenderHarvester)
+    harvester.setKeeper(keeper, True, {"from": strategist})
+    strategy.setKeeper(harvester, {"from": strategist})
+    plugin.setKeep3r(harvester, {"from": strategist})
+
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 500, {"from": gov})
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(amount // 2, {"from": whale})
+
+    # no harvestTrigger, so not due until it is on the list
+    assert harvester.duePlugins(strategy, 0) == []
+    with brownie.reverts("!owner"):
+        harvester.setAlwaysHarvest(plugin, True, {"from": rando})
+    harvester.setAlwaysHarvest(plugin, True, {"from": strategist})
+    assert harvester.duePlugins(strategy, 0) == [plugin]
+
+    # the plugin's harvest supplies its loose want to morpho
+    currency.transfer(plugin, amount // 100, {"from": whale})
+    nav = plugin.nav()
+    tx = harvester.harvest(strategy, 0, {"from": keeper})
+    assert tx.events["BatchHarvested"]["plugins"] == [plugin]
+    assert currency.balanceOf(plugin) == 0
+    assert plugin.nav() >= nav - 1
+
+    harvester.setAlwaysHarvest(plugin, False, {"from": strategist})
+    assert harvester.duePlugins(strategy, 0) == []
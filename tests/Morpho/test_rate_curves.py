@@ -0,0 +1,21 @@
+import pytest
+from brownie import GenericAaveMorpho
+
+from scripts.rate_curves import MorphoAaveCurve
+
+
+def test_morpho_aave_curve(strategy, vault, currency, whale, gov, amount):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 500, {"from": gov})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.deposit(amount, {"from": whale})
+    strategy.harvest({"from": gov})
+
+    plugin = GenericAaveMorpho.at(strategy.lenders(0))
+    curve = MorphoAaveCurve.from_chain(plugin)
+
+    amounts = [0, amount // 100, amount, amount * 10]
+    aprs = curve.apr_after_deposit(amounts)
+
+    for extra, apr in zip(amounts, aprs):
+        assert apr == pytest.approx(plugin.aprAfterDeposit(extra), rel=1e-4)
@@ -0,0 +1,21 @@
+import pytest
+
+from scripts.rate_curves import CTokenCurve, DyDxCurve
+
+AMOUNTS = [0, 1e6, 100_000 * 1e6, 10_000_000 * 1e6, 500_000_000 * 1e6]
+
+
+def test_cream_curve(strategist, strategy, crUsdc, GenericCream):
+    plugin = strategist.deploy(GenericCream, strategy, "Cream", crUsdc)
+    aprs = CTokenCurve.from_chain(plugin).apr_after_deposit(AMOUNTS)
+
+    for amount, apr in zip(AMOUNTS, aprs):
+        assert apr == pytest.approx(plugin.aprAfterDeposit(amount), rel=1e-6)
+
+
+def test_dydx_curve(strategist, strategy, GenericDyDx):
+    plugin = strategist.deploy(GenericDyDx, strategy, "DyDx")
+    aprs = DyDxCurve.from_chain(plugin).apr_after_deposit(AMOUNTS)
+
+    for amount, apr in zip(AMOUNTS, aprs):
+        assert apr == pytest.approx(plugin.aprAfterDeposit(amount), rel=1e-6)
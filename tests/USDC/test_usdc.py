@@ -6,7 +6,7 @@ import brownie
 
 
 def test_good_migration(
-    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy, fn_isolation
+    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy
 ):
     currency = usdc
 
@@ -65,7 +65,6 @@ def test_normal_activity(
     rando,
     vault,
     strategy,
-    fn_isolation,
     aUsdc,
 ):
     starting_balance = usdc.balanceOf(strategist)
@@ -171,7 +170,7 @@ def test_normal_activity(
 
 
 def test_debt_increase(
-    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy, fn_isolation
+    usdc, Strategy, chain, whale, gov, strategist, rando, vault, strategy
 ):
 
     currency = usdc
@@ -234,7 +233,6 @@ def test_vault_shares(
     interface,
     whale,
     strategist,
-    fn_isolation,
 ):
     deposit_limit = 100_000_000 * 1e6
     debt_ratio = 10_000
@@ -345,7 +343,6 @@ def test_apr(
     interface,
     whale,
     strategist,
-    fn_isolation,
 ):
     decimals = currency.decimals()
     deposit_limit = 100_000_000 * 1e6
@@ -412,7 +409,6 @@ def test_manual_override(
     gov,
     GenericCompound,
     GenericCream,
-    fn_isolation,
     GenericDyDx,
     interface,
     whale,